@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import AIUsageRecord
+
+
+@admin.register(AIUsageRecord)
+class AIUsageRecordAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'endpoint', 'node', 'model', 'prompt_tokens', 'completion_tokens', 'created_at')
+    list_filter = ('endpoint', 'node')
+    search_fields = ('subject',)
+    date_hierarchy = 'created_at'
@@ -8,12 +8,14 @@ from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph
 from langgraph.graph.message import add_messages
 from langchain.schema import SystemMessage, HumanMessage, AIMessage
+from .usage import usage_callback
+from .tracing import tracing_callback
 
 # .env 파일에서 API 키를 불러옵니다.
 load_dotenv()
 
 # 1. AI 모델 준비
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.7)
+llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.7, callbacks=[usage_callback, tracing_callback])
 
 # 2. 대화 상태를 저장할 데이터 구조 정의
 class State(TypedDict):
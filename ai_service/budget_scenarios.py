@@ -0,0 +1,179 @@
+# ai_service/budget_scenarios.py
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# 파티 종류별 비용 배율 (목록에 없으면 1.0)
+PARTY_TYPE_MULTIPLIERS = {
+    "생일파티": 1.0,
+    "결혼기념일": 1.5,
+    "회사파티": 1.2,
+    "졸업파티": 0.8,
+}
+TAX_RATE = 0.1
+
+# 비용 항목을 지정하지 않았을 때의 기본값 (인원 기준)
+DEFAULT_VENUE_COST_PER_GUEST = 5000
+DEFAULT_CATERING_COST_PER_GUEST = 25000
+DEFAULT_DECORATION_COST_PER_GUEST = 2000
+MAX_DEFAULT_DECORATION_COST = 100000
+
+# 에이전트 비용 추정용 1인당 기본 비용과 인원 구간별 장소비 (인원 상한, 장소비)
+BASE_COST_PER_PERSON = {
+    '생일파티': 25000,
+    '결혼기념일': 60000,
+    '회사파티': 45000,
+    '졸업파티': 20000,
+    '기타': 30000,
+}
+DEFAULT_BASE_COST_PER_PERSON = 30000
+VENUE_COST_TIERS = ((10, 100000), (30, 300000), (50, 500000))
+LARGE_VENUE_COST = 1000000
+
+
+def _costs(values: Optional[Sequence[Optional[float]]]) -> np.ndarray:
+    """비용 축 값 배열 (None과 0은 인원 기준 기본값을 뜻하는 NaN)
+
+    기존 calculate_budget 도구처럼 0은 "지정하지 않음"으로 봅니다.
+    """
+    if not values:
+        values = [None]
+    return np.array([float(v) if v else np.nan for v in values], dtype=np.float64)
+
+
+@dataclass
+class BudgetMatrix:
+    """예산 시나리오 행렬
+
+    각 필드는 (인원, 파티 종류, 장소비, 케이터링비, 장식비) 순서의 5차원 배열이며,
+    축 값 None은 인원 기준 기본값을 사용한 경우입니다.
+    """
+    axes: Dict[str, List]
+    values: Dict[str, np.ndarray]
+
+    @property
+    def shape(self) -> tuple:
+        return self.values['total'].shape
+
+    @property
+    def size(self) -> int:
+        return int(self.values['total'].size)
+
+    def scenario(self, index: tuple) -> Dict:
+        """시나리오 하나를 calculate_budget 도구와 같은 형식으로 반환"""
+        value = {name: float(array[index]) for name, array in self.values.items()}
+        return {
+            "breakdown": {
+                "venue": value['venue'],
+                "catering": value['catering'],
+                "decoration": value['decoration'],
+                "subtotal": value['subtotal'],
+                "tax": value['tax'],
+                "total": value['total']
+            },
+            "per_person": value['per_person']
+        }
+
+    def to_dict(self, budget: Optional[float] = None, decimals: int = 2) -> Dict:
+        """API 응답 형식 (축 값과 총액 요약, 전체 행렬은 page로 나눠 조회)"""
+        total = self.values['total']
+        cheapest = np.unravel_index(np.argmin(total), total.shape)
+        priciest = np.unravel_index(np.argmax(total), total.shape)
+        result = {
+            "axes": self.axes,
+            "shape": list(self.shape),
+            "count": self.size,
+            "summary": {
+                "min_total": {"total": round(float(total[cheapest]), decimals), "index": [int(i) for i in cheapest]},
+                "max_total": {"total": round(float(total[priciest]), decimals), "index": [int(i) for i in priciest]},
+                "mean_total": round(float(total.mean()), decimals),
+            },
+        }
+        if budget is not None:
+            result["summary"]["within_budget_count"] = int(np.count_nonzero(total <= budget))
+        return result
+
+    def page(self, page: int, page_size: int, budget: Optional[float] = None, decimals: int = 2) -> Dict:
+        """행렬을 펼친 순서(인원 → 파티 종류 → 장소비 → 케이터링비 → 장식비)로 시나리오 한 페이지"""
+        start = (page - 1) * page_size
+        scenarios = []
+        for flat in range(start, min(start + page_size, self.size)):
+            index = np.unravel_index(flat, self.shape)
+            scenario = self.scenario(index)
+            scenario["breakdown"] = {name: round(value, decimals) for name, value in scenario["breakdown"].items()}
+            scenario["per_person"] = round(scenario["per_person"], decimals)
+            scenario["index"] = [int(i) for i in index]
+            if budget is not None:
+                scenario["within_budget"] = bool(self.values['total'][index] <= budget)
+            scenarios.append(scenario)
+        return {"page": page, "page_size": page_size, "scenarios": scenarios}
+
+
+def budget_scenarios(guest_counts: Sequence[int], party_types: Optional[Sequence[Optional[str]]] = None,
+                     venue_costs: Optional[Sequence[Optional[float]]] = None,
+                     catering_costs: Optional[Sequence[Optional[float]]] = None,
+                     decoration_costs: Optional[Sequence[Optional[float]]] = None) -> BudgetMatrix:
+    """파라미터 격자의 모든 조합에 대한 예산 내역을 한 번에 계산
+
+    축마다 길이 1인 배열을 만들어 브로드캐스팅하므로 조합 수와 관계없이 NumPy 연산 몇 번으로
+    끝납니다. 비용 축을 생략하거나 값이 None 또는 0이면 인원 기준 기본값을 사용합니다.
+    """
+    party_types = list(party_types) if party_types else [None]
+    guests = np.asarray(guest_counts, dtype=np.float64).reshape(-1, 1, 1, 1, 1)
+    if not guests.size or (guests <= 0).any():
+        raise ValueError("guest_counts must contain positive integers")
+    multiplier = np.array([PARTY_TYPE_MULTIPLIERS.get(t, 1.0) for t in party_types],
+                          dtype=np.float64).reshape(1, -1, 1, 1, 1)
+
+    venue = _costs(venue_costs).reshape(1, 1, -1, 1, 1)
+    catering = _costs(catering_costs).reshape(1, 1, 1, -1, 1)
+    decoration = _costs(decoration_costs).reshape(1, 1, 1, 1, -1)
+    venue = np.where(np.isnan(venue), guests * DEFAULT_VENUE_COST_PER_GUEST, venue)
+    catering = np.where(np.isnan(catering), guests * DEFAULT_CATERING_COST_PER_GUEST, catering)
+    decoration = np.where(np.isnan(decoration),
+                          np.minimum(MAX_DEFAULT_DECORATION_COST, guests * DEFAULT_DECORATION_COST_PER_GUEST),
+                          decoration)
+
+    shape = np.broadcast_shapes(guests.shape, multiplier.shape, venue.shape, catering.shape, decoration.shape)
+    venue = np.broadcast_to(venue * multiplier, shape)
+    catering = np.broadcast_to(catering * multiplier, shape)
+    decoration = np.broadcast_to(decoration * multiplier, shape)
+    subtotal = venue + catering + decoration
+    tax = subtotal * TAX_RATE
+    total = subtotal + tax
+
+    return BudgetMatrix(
+        axes={
+            'guest_count': [int(g) for g in guests.ravel().tolist()],
+            'party_type': party_types,
+            'venue_cost': list(venue_costs) if venue_costs else [None],
+            'catering_cost': list(catering_costs) if catering_costs else [None],
+            'decoration_cost': list(decoration_costs) if decoration_costs else [None],
+        },
+        values={
+            'venue': venue,
+            'catering': catering,
+            'decoration': decoration,
+            'multiplier': np.broadcast_to(multiplier, shape),
+            'subtotal': subtotal,
+            'tax': tax,
+            'total': total,
+            'per_person': total / guests,
+        },
+    )
+
+
+def calculate_budget(guest_count: int, party_type: Optional[str] = None, venue_cost: Optional[float] = None,
+                     catering_cost: Optional[float] = None, decoration_cost: Optional[float] = None) -> Dict:
+    """시나리오 하나의 예산 내역 (calculate_budget 도구)"""
+    return budget_scenarios([guest_count], [party_type], [venue_cost], [catering_cost],
+                            [decoration_cost]).scenario((0, 0, 0, 0, 0))
+
+
+def estimate_party_cost(party_type: str, guest_count: int) -> int:
+    """1인당 기본 비용과 인원 구간별 장소비로 계산한 대략적인 총비용"""
+    base_cost = BASE_COST_PER_PERSON.get(party_type, DEFAULT_BASE_COST_PER_PERSON) * guest_count
+    venue_cost = next((cost for limit, cost in VENUE_COST_TIERS if guest_count <= limit), LARGE_VENUE_COST)
+    return base_cost + venue_cost
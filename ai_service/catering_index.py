@@ -0,0 +1,151 @@
+# ai_service/catering_index.py
+
+import os
+import json
+import hashlib
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+
+from .quantization import top_k_indices
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(__file__), 'data', 'catering.json')
+
+SORT_OPTIONS = ('price', 'rating')
+DIETARY_MATCH_OPTIONS = ('any', 'all')
+
+
+def _normalize(value: str) -> str:
+    return value.strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def _as_list(value) -> List[str]:
+    if not value:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+class CateringIndex:
+    """비트마스크 기반 케이터링 옵션 인덱스
+
+    식단 옵션과 음식 종류를 각각 uint64 비트마스크로, 인당 가격과 최소 주문 수량을
+    타입 배열로 저장합니다. 모든 조건은 배열 마스크 연산으로 한 번에 계산하고,
+    가격순/평점순 순위는 미리 계산해 상위 k개만 부분 정렬합니다.
+    """
+
+    def __init__(self, options: List[Dict], version: Optional[str] = None):
+        # 카탈로그 파일 내용 해시 (리소스 응답의 ETag 등에 사용)
+        self.version = version
+        self.records = list(options)
+        self.dietary_bits = self._assign_bits(o.get('dietary_options') for o in self.records)
+        self.cuisine_bits = self._assign_bits(o.get('cuisine') for o in self.records)
+
+        self.dietary = np.array([self._mask(o.get('dietary_options'), self.dietary_bits) for o in self.records],
+                                dtype=np.uint64)
+        self.cuisine = np.array([self._mask(o.get('cuisine'), self.cuisine_bits) for o in self.records],
+                                dtype=np.uint64)
+        self.price = np.array([o['price_per_person'] for o in self.records], dtype=np.float32)
+        self.minimum_order = np.array([o.get('minimum_order', 1) for o in self.records], dtype=np.int32)
+        self.rating = np.array([o.get('rating', 0.0) for o in self.records], dtype=np.float32)
+
+        # 순위 점수 (클수록 앞): 가격순은 동률이면 평점 높은 순, 평점순은 동률이면 가격 낮은 순
+        self._ranks = {
+            'price': self._rank(np.lexsort((-self.rating, self.price))),
+            'rating': self._rank(np.lexsort((self.price, -self.rating))),
+        }
+
+    @classmethod
+    def from_file(cls, path: str) -> 'CateringIndex':
+        with open(path, 'rb') as f:
+            raw = f.read()
+        return cls(json.loads(raw)['catering_options'], version=hashlib.sha256(raw).hexdigest()[:16])
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @staticmethod
+    def _assign_bits(values) -> Dict[str, int]:
+        bits: Dict[str, int] = {}
+        for value in values:
+            for name in map(_normalize, _as_list(value)):
+                if name not in bits:
+                    bits[name] = len(bits)
+        if len(bits) > 64:
+            raise ValueError("비트마스크로 표현할 수 있는 값은 최대 64개입니다")
+        return bits
+
+    @staticmethod
+    def _mask(value, bits: Dict[str, int]) -> int:
+        mask = 0
+        for name in map(_normalize, _as_list(value)):
+            mask |= 1 << bits[name]
+        return mask
+
+    @staticmethod
+    def _rank(order: np.ndarray) -> np.ndarray:
+        score = np.empty(len(order), dtype=np.int64)
+        score[order] = np.arange(len(order), 0, -1)
+        return score
+
+    def _query_mask(self, names: List[str], bits: Dict[str, int]) -> Optional[int]:
+        """조회 값들의 비트마스크 (알려지지 않은 값이 있으면 None)"""
+        mask = 0
+        for name in map(_normalize, names):
+            if name not in bits:
+                return None
+            mask |= 1 << bits[name]
+        return mask
+
+    def search(self, guest_count: int, cuisine_type: Optional[str] = None,
+               budget_per_person: Optional[float] = None, dietary_restrictions: Optional[List[str]] = None,
+               dietary_match: str = 'any', sort_by: str = 'price', limit: int = 10) -> Dict:
+        """조건에 맞는 케이터링 옵션 검색
+
+        dietary_match가 'any'이면 식단 제한 중 하나라도 지원하는 옵션, 'all'이면 모두 지원하는
+        옵션을 찾습니다.
+        """
+        if sort_by not in SORT_OPTIONS:
+            raise ValueError(f"sort_by must be one of {SORT_OPTIONS}")
+        if dietary_match not in DIETARY_MATCH_OPTIONS:
+            raise ValueError(f"dietary_match must be one of {DIETARY_MATCH_OPTIONS}")
+
+        mask = self.minimum_order <= guest_count
+        if budget_per_person:
+            mask &= self.price <= budget_per_person
+
+        if cuisine_type:
+            cuisine = self._query_mask([cuisine_type], self.cuisine_bits)
+            if cuisine is None:
+                return {"catering_options": [], "total": 0}
+            mask &= (self.cuisine & np.uint64(cuisine)) != 0
+
+        if dietary_restrictions:
+            if dietary_match == 'all':
+                dietary = self._query_mask(dietary_restrictions, self.dietary_bits)
+                if dietary is None:
+                    return {"catering_options": [], "total": 0}
+                mask &= (self.dietary & np.uint64(dietary)) == np.uint64(dietary)
+            else:
+                known = [d for d in dietary_restrictions if _normalize(d) in self.dietary_bits]
+                if not known:
+                    return {"catering_options": [], "total": 0}
+                mask &= (self.dietary & np.uint64(self._query_mask(known, self.dietary_bits))) != 0
+
+        rows = np.flatnonzero(mask)
+        top = rows[top_k_indices(self._ranks[sort_by][rows], limit)]
+        return {
+            "catering_options": [dict(self.records[row]) for row in top.tolist()],
+            "total": int(len(rows)),
+        }
+
+
+@lru_cache(maxsize=None)
+def load_catering_index(path: str) -> CateringIndex:
+    """케이터링 카탈로그 로드 (경로별로 프로세스당 한 번)"""
+    return CateringIndex.from_file(path)
+
+
+def get_catering_index() -> CateringIndex:
+    return load_catering_index(getattr(settings, 'MCP_CATERING_CATALOG_PATH', DEFAULT_CATALOG_PATH))
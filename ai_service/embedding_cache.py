@@ -0,0 +1,176 @@
+# ai_service/embedding_cache.py
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite 기반 임베딩 캐시
+
+    (model, sha256(text)) 키로 float32 벡터를 저장합니다. WAL 모드를 사용하므로
+    여러 gunicorn 워커가 같은 파일을 동시에 읽을 수 있습니다.
+    항목 수가 max_entries를 넘으면 가장 오래 사용되지 않은 항목부터 삭제합니다(LRU).
+    """
+
+    # 조회 시각 갱신 최소 간격 (초) - 읽기 경로에서 쓰기를 줄이기 위함
+    TOUCH_INTERVAL = 3600
+    # 몇 번 저장할 때마다 크기를 확인할지
+    EVICT_CHECK_EVERY = 100
+    # SQLite 파라미터 개수 제한을 피하기 위한 조회 단위
+    QUERY_CHUNK = 500
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._puts_since_check = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """캐시된 벡터 조회 (없는 항목은 None)"""
+        hashes = [text_hash(t) for t in texts]
+        found: Dict[str, List[float]] = {}
+        stale: List[str] = []
+        now = time.time()
+
+        try:
+            conn = self._connection()
+            unique = list(dict.fromkeys(hashes))
+            for i in range(0, len(unique), self.QUERY_CHUNK):
+                chunk = unique[i:i + self.QUERY_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector, last_used FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk]
+                )
+                for h, blob, last_used in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+                    if now - last_used > self.TOUCH_INTERVAL:
+                        stale.append(h)
+
+            if stale:
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, h) for h in stale]
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"임베딩 캐시 조회 오류: {e}")
+
+        return [found.get(h) for h in hashes]
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        """벡터 저장 (필요하면 오래된 항목 정리)"""
+        now = time.time()
+        rows = [
+            (model, text_hash(t), np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        try:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"임베딩 캐시 저장 오류: {e}")
+            return
+
+        with self._lock:
+            self._puts_since_check += len(rows)
+            should_check = self._puts_since_check >= self.EVICT_CHECK_EVERY
+            if should_check:
+                self._puts_since_check = 0
+        if should_check:
+            self.evict()
+
+    def evict(self):
+        """최대 항목 수를 넘는 만큼 가장 오래 사용되지 않은 항목 삭제"""
+        try:
+            conn = self._connection()
+            (count,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            overflow = count - self.max_entries
+            if overflow <= 0:
+                return
+            # 매번 정리하지 않도록 10% 여유를 두고 삭제
+            overflow += self.max_entries // 10
+            conn.execute(
+                "DELETE FROM embeddings WHERE (model, text_hash) IN "
+                "(SELECT model, text_hash FROM embeddings ORDER BY last_used LIMIT ?)",
+                (overflow,)
+            )
+            conn.commit()
+            logger.info(f"임베딩 캐시 항목 {overflow}개 정리")
+        except sqlite3.Error as e:
+            logger.warning(f"임베딩 캐시 정리 오류: {e}")
+
+
+class CachedEmbeddings(Embeddings):
+    """임베딩 캐시를 거쳐 실제 임베딩 모델을 호출하는 래퍼"""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_name: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.cache.get_many(self.model_name, texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            # 같은 텍스트가 여러 번 있어도 한 번만 임베딩
+            missing_texts = list(dict.fromkeys(texts[i] for i in missing))
+            embedded = self.embeddings.embed_documents(missing_texts)
+            self.cache.put_many(self.model_name, missing_texts, embedded)
+            by_text = dict(zip(missing_texts, embedded))
+            for i in missing:
+                vectors[i] = by_text[texts[i]]
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        cached = self.cache.get_many(self.model_name, [text])[0]
+        if cached is not None:
+            return cached
+        vector = self.embeddings.embed_query(text)
+        self.cache.put_many(self.model_name, [text], [vector])
+        return vector
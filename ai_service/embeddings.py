@@ -0,0 +1,118 @@
+# ai_service/embeddings.py
+
+import os
+import hashlib
+import threading
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OPENAI_MODEL = "text-embedding-3-small"
+# 한국어를 지원하는 다국어 모델
+DEFAULT_LOCAL_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+
+class LocalSentenceTransformerEmbeddings(Embeddings):
+    """sentence-transformers 기반 로컬(오프라인) 임베딩
+
+    모델은 프로세스당 한 번만 로드해 모든 스레드가 공유합니다.
+    CPU 스레드 수를 고정하고, 인코딩은 모델별 락으로 직렬화해
+    동시 요청이 코어를 과점유하지 않도록 합니다.
+    """
+
+    _models: Dict[str, Any] = {}
+    _encode_locks: Dict[str, threading.Lock] = {}
+    _load_lock = threading.Lock()
+
+    def __init__(self, model_name: str = DEFAULT_LOCAL_MODEL, batch_size: int = 32,
+                 num_threads: Optional[int] = None, device: str = 'cpu'):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.device = device
+
+    def _get_model(self):
+        model = self._models.get(self.model_name)
+        if model is not None:
+            return model
+
+        with self._load_lock:
+            model = self._models.get(self.model_name)
+            if model is None:
+                if self.num_threads:
+                    # torch 임포트 전에 설정해야 OpenMP 스레드 풀에 반영됨
+                    os.environ.setdefault('OMP_NUM_THREADS', str(self.num_threads))
+                    os.environ.setdefault('MKL_NUM_THREADS', str(self.num_threads))
+                import torch
+                from sentence_transformers import SentenceTransformer
+
+                if self.num_threads:
+                    torch.set_num_threads(self.num_threads)
+                logger.info(f"로컬 임베딩 모델 로드: {self.model_name}")
+                model = SentenceTransformer(self.model_name, device=self.device)
+                self._models[self.model_name] = model
+                self._encode_locks[self.model_name] = threading.Lock()
+        return model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        model = self._get_model()
+        with self._encode_locks[self.model_name]:
+            vectors = model.encode(
+                texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def create_embeddings(backend: Optional[str] = None, model: Optional[str] = None) -> Tuple[Embeddings, str]:
+    """설정에 따른 임베딩 모델 생성
+
+    Returns:
+        (임베딩 객체, 모델 식별자) - 모델 식별자는 캐시 키와 인덱스 버전에 사용됩니다.
+    """
+    backend = backend or getattr(settings, 'RAG_EMBEDDING_BACKEND', 'openai')
+    model = model or getattr(settings, 'RAG_EMBEDDING_MODEL', '') or None
+
+    if backend == 'local':
+        model = model or DEFAULT_LOCAL_MODEL
+        embeddings = LocalSentenceTransformerEmbeddings(
+            model_name=model,
+            batch_size=getattr(settings, 'RAG_LOCAL_EMBEDDING_BATCH_SIZE', 32),
+            num_threads=getattr(settings, 'RAG_LOCAL_EMBEDDING_THREADS', 2),
+        )
+        return embeddings, f"local:{model}"
+
+    if backend == 'openai':
+        from langchain_openai import OpenAIEmbeddings
+
+        model = model or DEFAULT_OPENAI_MODEL
+        # text-embedding-3 계열은 더 적은 차원으로 줄여 받을 수 있음 (0이면 모델 기본값)
+        dimensions = getattr(settings, 'RAG_EMBEDDING_DIMENSIONS', 0)
+        if dimensions:
+            return OpenAIEmbeddings(model=model, dimensions=dimensions), f"openai:{model}@{dimensions}"
+        return OpenAIEmbeddings(model=model), f"openai:{model}"
+
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def index_namespace(model_id: str) -> str:
+    """임베딩 모델별 인덱스 이름 접미사
+
+    모델이 바뀌면 다른 컬렉션을 사용하므로, 벡터 공간이 다른 임베딩이 섞이지 않고
+    새 모델로 자동으로 다시 적재됩니다.
+    """
+    backend = model_id.split(':', 1)[0]
+    digest = hashlib.sha1(model_id.encode('utf-8')).hexdigest()[:8]
+    return f"{backend}_{digest}"
@@ -0,0 +1,176 @@
+# ai_service/geo.py
+
+import math
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# 지역 이름 끝의 행정구역 단위 (강남구 → 강남)
+REGION_SUFFIXES = ('시', '구', '군', '동')
+# 여러 지명이 함께 오면 더 좁은 단위를 기준으로 사용
+_LEVEL_PRIORITY = {'landmark': 0, 'neighborhood': 1, 'district': 2, 'city': 3}
+
+
+def normalize_location(name: str) -> str:
+    return ''.join(name.split()).lower()
+
+
+def strip_region_suffix(name: str) -> Optional[str]:
+    """행정구역 단위를 뺀 이름 ('중구'처럼 한 글자가 되면 None)"""
+    if len(name) > 2 and name.endswith(REGION_SUFFIXES):
+        return name[:-1]
+    return None
+
+
+def haversine_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """한 지점에서 여러 지점까지의 대원 거리 (km)"""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """위경도 격자 버킷 기반 공간 인덱스
+
+    각 격자는 남북/동서 모두 cell_km 이상 크기가 되도록 잡으므로, 질의 지점의 격자에서
+    r칸 밖에 있는 점은 모두 r * cell_km 이상 떨어져 있습니다. 반경 검색은 해당 범위의
+    격자만, k-최근접 검색은 안쪽 고리부터 필요한 만큼만 거리를 계산합니다.
+    좌표가 없는(NaN) 행은 인덱스에서 제외됩니다.
+    """
+
+    def __init__(self, lats, lngs, cell_km: float = 1.0):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lngs = np.asarray(lngs, dtype=np.float64)
+        self.cell_km = cell_km
+
+        valid = np.flatnonzero(~(np.isnan(self.lats) | np.isnan(self.lngs)))
+        max_abs_lat = float(np.abs(self.lats[valid]).max()) if len(valid) else 0.0
+        self.lat_step = cell_km / KM_PER_DEGREE
+        self.lng_step = cell_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(max_abs_lat, 89.0))), 1e-6))
+
+        self._cells: Dict[Tuple[int, int], np.ndarray] = {}
+        if len(valid):
+            rows_i = np.floor(self.lats[valid] / self.lat_step).astype(np.int64)
+            rows_j = np.floor(self.lngs[valid] / self.lng_step).astype(np.int64)
+            order = np.lexsort((rows_j, rows_i))
+            keys = np.stack([rows_i[order], rows_j[order]], axis=1)
+            starts = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+            for group_keys, group_rows in zip(np.split(keys, starts), np.split(valid[order], starts)):
+                self._cells[(int(group_keys[0, 0]), int(group_keys[0, 1]))] = group_rows
+            self._bounds = (int(rows_i.min()), int(rows_i.max()), int(rows_j.min()), int(rows_j.max()))
+        else:
+            self._bounds = None
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self._cells.values())
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.lat_step), math.floor(lng / self.lng_step)
+
+    def _gather(self, cells) -> np.ndarray:
+        found = [self._cells[cell] for cell in cells if cell in self._cells]
+        return np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+    def _ring(self, ci: int, cj: int, r: int):
+        if r == 0:
+            yield ci, cj
+            return
+        for j in range(cj - r, cj + r + 1):
+            yield ci - r, j
+            yield ci + r, j
+        for i in range(ci - r + 1, ci + r):
+            yield i, cj - r
+            yield i, cj + r
+
+    def within(self, lat: float, lng: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """반경 radius_km 이내의 (행 번호, 거리) - 정렬되지 않음"""
+        ci, cj = self._cell(lat, lng)
+        reach = math.ceil(radius_km / self.cell_km)
+        rows = self._gather(
+            (i, j) for i in range(ci - reach, ci + reach + 1) for j in range(cj - reach, cj + reach + 1)
+        )
+        distances = haversine_km(lat, lng, self.lats[rows], self.lngs[rows])
+        keep = distances <= radius_km
+        return rows[keep], distances[keep]
+
+    def nearest(self, lat: float, lng: float, k: int,
+                allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """가까운 순 k개의 (행 번호, 거리)
+
+        allowed는 행별 bool 마스크로, False인 행은 건너뜁니다.
+        """
+        if k <= 0 or self._bounds is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        ci, cj = self._cell(lat, lng)
+        min_i, max_i, min_j, max_j = self._bounds
+        # 이 고리까지 보면 모든 격자를 본 것
+        last_ring = max(abs(ci - min_i), abs(ci - max_i), abs(cj - min_j), abs(cj - max_j))
+
+        rows_found: List[np.ndarray] = []
+        distances_found: List[np.ndarray] = []
+        count = 0
+        r = 0
+        while r <= last_ring:
+            rows = self._gather(self._ring(ci, cj, r))
+            if allowed is not None and len(rows):
+                rows = rows[allowed[rows]]
+            if len(rows):
+                rows_found.append(rows)
+                distances_found.append(haversine_km(lat, lng, self.lats[rows], self.lngs[rows]))
+                count += len(rows)
+            # r칸 밖의 점은 r * cell_km 이상 떨어져 있으므로, k번째 거리가 그보다 작으면 종료
+            if count >= k:
+                distances = np.concatenate(distances_found)
+                if np.partition(distances, k - 1)[k - 1] <= r * self.cell_km:
+                    break
+            r += 1
+
+        if not count:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        rows = np.concatenate(rows_found)
+        distances = np.concatenate(distances_found)
+        order = np.argsort(distances, kind='stable')[:k]
+        return rows[order], distances[order]
+
+
+class Gazetteer:
+    """지명 → 중심 좌표 사전 (외부 지오코딩 없이 로컬 데이터로 조회)"""
+
+    def __init__(self, places: List[Dict]):
+        self._places: Dict[str, Dict] = {}
+        # 정확한 이름/별칭을 먼저 등록하고, 단위를 뺀 이름은 겹치지 않을 때만 추가
+        for place in places:
+            for name in [place['name'], *place.get('aliases', [])]:
+                self._places.setdefault(normalize_location(name), place)
+        for place in places:
+            for name in [place['name'], *place.get('aliases', [])]:
+                stripped = strip_region_suffix(normalize_location(name))
+                if stripped:
+                    self._places.setdefault(stripped, place)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'Gazetteer':
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f)['places'])
+
+    def lookup(self, location: Optional[str]) -> Optional[Dict]:
+        """지명 조회 ('서울 강남역'처럼 여러 단어이면 가장 좁은 단위의 지명)"""
+        if not location or not location.strip():
+            return None
+        place = self._places.get(normalize_location(location))
+        if place is not None:
+            return place
+        matches = [self._places[token] for token in map(normalize_location, location.split())
+                   if token in self._places]
+        if not matches:
+            return None
+        return min(matches, key=lambda p: _LEVEL_PRIORITY.get(p.get('level'), len(_LEVEL_PRIORITY)))
+
+    def resolve(self, location: Optional[str]) -> Optional[Tuple[float, float]]:
+        place = self.lookup(location)
+        return (place['lat'], place['lng']) if place else None
@@ -0,0 +1,387 @@
+# ai_service/ingestion.py
+
+import os
+import csv
+import json
+import time
+import hashlib
+import logging
+from collections import Counter, OrderedDict
+from itertools import islice
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .vector_index import MAX_ID_BYTES
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ('json', 'jsonl', 'csv', 'text')
+
+# 파일 읽기 단위 (JSON 배열 스트리밍 파싱용)
+READ_CHUNK_SIZE = 1 << 16
+
+# 청크 ID 접미사(":<청크 번호>")에 남겨 둘 길이
+CHUNK_SUFFIX_BYTES = 8
+# 이전 적재의 남은 청크를 찾을 때 한 번에 확인할 청크 번호 수
+STALE_CHUNK_PROBE = 64
+
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    if ext in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if ext in ('json', 'csv'):
+        return ext
+    return 'text'
+
+
+# ---- 1단계: 파싱 (레코드 번호, 레코드) ----
+
+def _iter_json_array(f) -> Iterator[Dict]:
+    """최상위 JSON 배열을 원소 단위로 파싱 (파일 전체를 메모리에 올리지 않음)"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if not started:
+            if not buffer and not eof:
+                chunk = f.read(READ_CHUNK_SIZE)
+                eof = not chunk
+                buffer += chunk
+                continue
+            if not buffer.startswith('['):
+                raise ValueError("JSON 파일은 최상위 배열이어야 합니다.")
+            buffer = buffer[1:]
+            started = True
+            continue
+
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except ValueError:
+            if eof:
+                raise ValueError("JSON 배열이 올바르게 끝나지 않았습니다.")
+            chunk = f.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def _iter_text_paragraphs(f, max_chars: int = 20000) -> Iterator[Dict]:
+    """빈 줄로 구분된 문단 단위 레코드 (빈 줄 없이 긴 텍스트는 max_chars 근처에서 끊음)"""
+    lines: List[str] = []
+    size = 0
+    for line in f:
+        if line.strip():
+            lines.append(line.rstrip('\n'))
+            size += len(line)
+            if size < max_chars:
+                continue
+        if lines:
+            yield {'content': '\n'.join(lines)}
+            lines = []
+            size = 0
+    if lines:
+        yield {'content': '\n'.join(lines)}
+
+
+def iter_records(path: str, fmt: str) -> Iterator[Tuple[int, Dict]]:
+    with open(path, encoding='utf-8', newline='' if fmt == 'csv' else None) as f:
+        if fmt == 'json':
+            records = _iter_json_array(f)
+        elif fmt == 'jsonl':
+            records = (json.loads(line) for line in f if line.strip())
+        elif fmt == 'csv':
+            records = csv.DictReader(f)
+        elif fmt == 'text':
+            records = _iter_text_paragraphs(f)
+        else:
+            raise ValueError(f"Unsupported format: {fmt}")
+
+        for record_no, record in enumerate(records):
+            yield record_no, record
+
+
+# ---- 2단계: 문서 변환 + 청크 분할 ----
+
+def _to_metadata_value(value):
+    """벡터 DB 메타데이터는 스칼라 값만 지원"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _to_document(record, content_field: str):
+    """레코드를 (본문, 메타데이터)로 변환
+
+    content_field가 없는 레코드는 나머지 필드를 "키: 값" 형태로 이어 본문으로 사용합니다.
+    """
+    if not isinstance(record, dict):
+        record = {content_field: str(record)}
+
+    content = record.get(content_field)
+    metadata = {
+        k: _to_metadata_value(v) for k, v in record.items()
+        if k != content_field and v not in (None, '')
+    }
+    if not content:
+        content = '\n'.join(f"{k}: {v}" for k, v in metadata.items())
+    return str(content).strip(), metadata
+
+
+def chunk_id(record_id: str, chunk_no: Optional[int] = None) -> str:
+    """레코드 id로 만든 청크 문서 ID (청크가 하나면 None)
+
+    접미사를 붙여도 ID 길이 제한을 넘지 않도록 긴 레코드 id는 해시로 줄입니다. 레코드 id만으로
+    결정되므로 청크 번호와 관계없이 같은 레코드의 청크는 같은 접두사를 가집니다.
+    """
+    if chunk_no is None:
+        return record_id
+    if len(record_id.encode('utf-8')) > MAX_ID_BYTES - CHUNK_SUFFIX_BYTES:
+        record_id = hashlib.sha256(record_id.encode('utf-8')).hexdigest()[:32]
+    return f"{record_id}:{chunk_no}"
+
+
+def iter_chunks(records: Iterable[Tuple[int, Dict]], split_texts: Callable[[List[str]], List[List[str]]],
+                content_field: str = 'content', batch_size: int = 64) -> Iterator[Tuple[int, Dict]]:
+    """레코드를 (레코드 번호, 문서) 청크로 변환 (분할기는 batch_size 레코드씩 묶어 호출)"""
+    for group in _grouped(records, batch_size):
+        converted = [
+            (record_no, *_to_document(record, content_field)) for record_no, record in group
+        ]
+        converted = [item for item in converted if item[1]]
+        if not converted:
+            continue
+
+        split = split_texts([content for _, content, _ in converted])
+        for (record_no, _, metadata), chunks in zip(converted, split):
+            # 레코드의 id는 청크마다 다른 문서 ID로 바꾸고, 원래 값은 source_id로 남김
+            record_id = metadata.pop('id', None)
+            if record_id is not None:
+                metadata['source_id'] = str(record_id)
+            for chunk_no, chunk in enumerate(chunks):
+                doc = {'content': chunk, **metadata}
+                if len(chunks) > 1:
+                    doc['chunk'] = chunk_no
+                if record_id is not None:
+                    doc['id'] = chunk_id(str(record_id), chunk_no if len(chunks) > 1 else None)
+                yield record_no, doc
+
+
+def _grouped(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        group = list(islice(iterator, size))
+        if not group:
+            return
+        yield group
+
+
+# ---- 3단계: 중복 제거 ----
+
+def dedupe(chunks: Iterable[Tuple[int, Dict]], window: int = 100000,
+           stats: Optional['IngestionStats'] = None) -> Iterator[Tuple[int, Dict]]:
+    """같은 내용의 청크 제거 (id가 없는 청크만)
+
+    최근 window개 해시만 기억하므로 메모리는 파일 크기와 무관합니다.
+    그보다 멀리 떨어진 중복은 적재 단계의 내용 해시 ID 확인에서 걸러집니다.
+    """
+    seen: 'OrderedDict[bytes, None]' = OrderedDict()
+    for record_no, doc in chunks:
+        # id가 있는 문서는 내용이 같아도 각자 ID로 조회/삭제되므로 합치지 않음
+        if 'id' in doc:
+            yield record_no, doc
+            continue
+        digest = hashlib.sha256(doc['content'].encode('utf-8')).digest()
+        if digest in seen:
+            seen.move_to_end(digest)
+            if stats:
+                stats.duplicates += 1
+            continue
+        seen[digest] = None
+        if len(seen) > window:
+            seen.popitem(last=False)
+        yield record_no, doc
+
+
+# ---- 4단계: 배치 구성 ----
+
+def batched_by_record(chunks: Iterable[Tuple[int, Dict]], batch_size: int) -> Iterator[Tuple[int, List[Dict]]]:
+    """청크를 batch_size 이상씩 묶되 레코드 경계에서만 자름
+
+    (마지막 레코드 번호, 문서 목록)을 반환하므로 배치가 저장되면 그 레코드까지
+    완료된 것으로 체크포인트할 수 있습니다.
+    """
+    batch: List[Dict] = []
+    current_record = None
+    for record_no, doc in chunks:
+        if record_no != current_record and len(batch) >= batch_size:
+            yield current_record, batch
+            batch = []
+        current_record = record_no
+        batch.append(doc)
+    if batch:
+        yield current_record, batch
+
+
+# ---- 체크포인트 / 진행 상황 ----
+
+@dataclass
+class IngestionStats:
+    records: int = 0
+    chunks: int = 0
+    duplicates: int = 0
+    embedded: int = 0
+    updated: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+
+    def throughput(self) -> Dict[str, float]:
+        elapsed = self.elapsed or 1e-9
+        return {
+            'records_per_sec': round(self.records / elapsed, 1),
+            'chunks_per_sec': round(self.chunks / elapsed, 1),
+            'embedded_per_sec': round(self.embedded / elapsed, 1),
+        }
+
+
+class Checkpoint:
+    """파일별 적재 진행 위치 (완료된 레코드 수)
+
+    원본 파일의 크기/수정 시각과 컬렉션이 같을 때만 이어서 진행합니다.
+    """
+
+    def __init__(self, checkpoint_dir: str, source_path: str, collection_type: str):
+        source_path = os.path.abspath(source_path)
+        stat = os.stat(source_path)
+        self.identity = {
+            'source': source_path,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'collection_type': collection_type,
+        }
+        key = hashlib.sha1(f"{source_path}:{collection_type}".encode('utf-8')).hexdigest()[:16]
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.path = os.path.join(checkpoint_dir, f"{key}.json")
+
+    def load(self) -> int:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if data.get('identity') != self.identity:
+            return 0
+        return int(data.get('records_done', 0))
+
+    def save(self, records_done: int, stats: IngestionStats):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'identity': self.identity, 'records_done': records_done, 'stats': asdict(stats)}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class IngestionPipeline:
+    """대용량 지식 파일 스트리밍 적재
+
+    파싱 → 청크 분할 → 중복 제거 → 배치 → 임베딩/upsert 단계를 제너레이터로 연결하므로
+    한 번에 메모리에 올라가는 것은 배치 하나뿐입니다. 배치가 저장될 때마다
+    체크포인트를 남기므로 중단된 적재는 마지막 배치 다음 레코드부터 이어집니다.
+    """
+
+    def __init__(self, rag, collection_type: str, batch_size: Optional[int] = None,
+                 content_field: str = 'content', checkpoint_dir: Optional[str] = None,
+                 progress: Optional[Callable[[IngestionStats], None]] = None):
+        if collection_type not in rag.collections:
+            raise ValueError(f"Unknown collection type: {collection_type}")
+        self.rag = rag
+        self.collection_type = collection_type
+        self.batch_size = batch_size or rag.embed_batch_size * rag.embed_concurrency
+        self.content_field = content_field
+        self.checkpoint_dir = checkpoint_dir or os.path.join(rag.persist_dir, 'ingest_checkpoints')
+        self.progress = progress
+
+    def run(self, path: str, fmt: Optional[str] = None, resume: bool = True) -> IngestionStats:
+        fmt = fmt or detect_format(path)
+        checkpoint = Checkpoint(self.checkpoint_dir, path, self.collection_type)
+        start_record = checkpoint.load() if resume else 0
+        if start_record:
+            logger.info(f"체크포인트에서 이어서 적재: {path} (레코드 {start_record}부터)")
+
+        stats = IngestionStats()
+        started_at = time.monotonic()
+
+        records = (
+            (record_no, record) for record_no, record in iter_records(path, fmt)
+            if record_no >= start_record
+        )
+        chunks = iter_chunks(self._count_records(records, stats), self.rag.text_splitter.split_texts,
+                             self.content_field)
+        batches = batched_by_record(dedupe(chunks, stats=stats), self.batch_size)
+
+        for last_record, batch in batches:
+            self._delete_stale_chunks(batch)
+            result = self.rag.ingest_documents(self.collection_type, batch)
+            stats.chunks += result['received']
+            stats.embedded += result['embedded']
+            stats.updated += result['updated']
+            stats.batches += 1
+            stats.elapsed = time.monotonic() - started_at
+            checkpoint.save(last_record + 1, stats)
+            if self.progress:
+                self.progress(stats)
+
+        stats.elapsed = time.monotonic() - started_at
+        checkpoint.clear()
+        logger.info(f"지식 적재 완료: {path} {asdict(stats)} {stats.throughput()}")
+        return stats
+
+    def _delete_stale_chunks(self, batch: List[Dict]) -> int:
+        """id가 있는 레코드를 다시 적재할 때 이번 분할에 없는 이전 청크 삭제
+
+        청크 수가 줄었거나 단일/여러 청크가 바뀌면 이전 ID의 문서가 남아 검색되므로 지웁니다.
+        청크 ID는 0번부터 이어지므로 메타데이터 전체를 훑지 않고 source_id로 만든 ID만 확인합니다.
+        배치는 레코드 경계에서만 나뉘므로 한 레코드의 청크는 모두 같은 배치에 있습니다.
+        """
+        counts = Counter(doc['source_id'] for doc in batch if 'id' in doc and 'source_id' in doc)
+        if not counts:
+            return 0
+        # 여러 청크가 되었으면 단일 청크 ID를, 단일 청크가 되었으면 0번부터의 청크 ID를 확인
+        single_ids = [source_id for source_id, count in counts.items() if count > 1]
+        stale = list(self.rag.index.existing_ids(self.collection_type, single_ids)) if single_ids else []
+        next_chunk = {source_id: count if count > 1 else 0 for source_id, count in counts.items()}
+        while next_chunk:
+            probes = {
+                source_id: [chunk_id(source_id, n) for n in range(start, start + STALE_CHUNK_PROBE)]
+                for source_id, start in next_chunk.items()
+            }
+            found = self.rag.index.existing_ids(
+                self.collection_type, [doc_id for ids in probes.values() for doc_id in ids]
+            )
+            stale.extend(doc_id for ids in probes.values() for doc_id in ids if doc_id in found)
+            # 확인한 범위가 모두 있으면 그 다음 범위도 확인
+            next_chunk = {
+                source_id: next_chunk[source_id] + STALE_CHUNK_PROBE
+                for source_id, ids in probes.items() if all(doc_id in found for doc_id in ids)
+            }
+        if not stale:
+            return 0
+        return self.rag.delete_documents(self.collection_type, ids=stale)
+
+    @staticmethod
+    def _count_records(records: Iterable[Tuple[int, Dict]], stats: IngestionStats) -> Iterator[Tuple[int, Dict]]:
+        for item in records:
+            stats.records += 1
+            yield item
@@ -0,0 +1,131 @@
+# ai_service/knowledge_service.py
+
+import time
+import threading
+import logging
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from .rag_system import PartyPlanningRAG, get_rag
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeServiceUnavailable(RuntimeError):
+    """RAG 시스템이 아직 준비되지 않음"""
+
+
+class KnowledgeService:
+    """지식 베이스 관리 (upsert / 삭제 / 압축 / 통계)
+
+    삭제 표시가 쌓이면 검색 시 스캔량과 디스크 사용량이 늘어나므로,
+    삭제 비율이 RAG_COMPACT_DELETED_RATIO를 넘으면 백그라운드에서 압축합니다.
+    자동 압축은 삭제 표시를 남기는 numpy 백엔드에만 적용되며, chroma는 압축 API로 직접 실행합니다.
+    압축은 프로세스당 한 번에 하나만 실행됩니다.
+    """
+
+    def __init__(self):
+        self._compaction_lock = threading.Lock()
+        self._compaction_thread: Optional[threading.Thread] = None
+        self.last_compaction: Optional[Dict] = None
+
+    def _rag(self) -> PartyPlanningRAG:
+        rag = get_rag()
+        if rag is None:
+            raise KnowledgeServiceUnavailable("RAG 시스템을 초기화하는 중입니다. 잠시 후 다시 시도해주세요.")
+        return rag
+
+    def _check_collection(self, rag: PartyPlanningRAG, collection_type: str):
+        if collection_type not in rag.collections:
+            raise ValueError(f"알 수 없는 컬렉션입니다: {collection_type}")
+
+    def upsert(self, collection_type: str, documents: List[Dict]) -> Dict[str, int]:
+        """문서 추가/교체 (id가 있으면 그 ID로, 없으면 내용 해시 ID로 저장)"""
+        rag = self._rag()
+        self._check_collection(rag, collection_type)
+        result = rag.ingest_documents(collection_type, [
+            {**doc.get('metadata', {}), 'content': doc['content'], **({'id': doc['id']} if doc.get('id') else {})}
+            for doc in documents
+        ])
+        self.maybe_compact(rag)
+        return result
+
+    def delete(self, collection_type: str, ids: Optional[List[str]] = None,
+               where: Optional[Dict] = None) -> int:
+        rag = self._rag()
+        self._check_collection(rag, collection_type)
+        deleted = rag.delete_documents(collection_type, ids=ids, where=where)
+        if deleted:
+            self.maybe_compact(rag)
+        return deleted
+
+    def stats(self) -> Dict:
+        stats = self._rag().index_stats()
+        stats['compaction'] = {
+            'running': self.is_compacting(),
+            'last': self.last_compaction,
+        }
+        return stats
+
+    def is_compacting(self) -> bool:
+        return self._compaction_thread is not None and self._compaction_thread.is_alive()
+
+    def compact(self, background: bool = True) -> Optional[Dict]:
+        """인덱스 압축 (background=True이면 스레드를 시작하고 즉시 None 반환)
+
+        이미 압축 중이면 아무 작업도 하지 않습니다.
+        """
+        rag = self._rag()
+        if not background:
+            with self._compaction_lock:
+                return self._run_compaction(rag)
+
+        if not self._compaction_lock.acquire(blocking=False):
+            return None
+        try:
+            self._compaction_thread = threading.Thread(
+                target=self._compact_in_background, args=(rag,), name='rag-compaction', daemon=True
+            )
+            self._compaction_thread.start()
+        except Exception:
+            self._compaction_lock.release()
+            raise
+        return None
+
+    def _compact_in_background(self, rag: PartyPlanningRAG):
+        try:
+            self._run_compaction(rag)
+        except Exception as e:
+            logger.error(f"지식 베이스 압축 오류: {e}")
+        finally:
+            self._compaction_lock.release()
+
+    def _run_compaction(self, rag: PartyPlanningRAG) -> Dict:
+        started_at = time.monotonic()
+        result = rag.compact_index()
+        result['elapsed_seconds'] = round(time.monotonic() - started_at, 3)
+        result['finished_at'] = time.time()
+        self.last_compaction = result
+        logger.info(f"지식 베이스 압축 완료: {result}")
+        return result
+
+    def maybe_compact(self, rag: PartyPlanningRAG):
+        """삭제 표시 비율이 기준을 넘으면 백그라운드 압축 시작"""
+        try:
+            stats = rag.index.stats()
+        except Exception as e:
+            logger.warning(f"인덱스 통계 조회 오류: {e}")
+            return
+        deleted = stats.get('deleted')
+        if deleted is None:
+            return
+        total = deleted + sum(stats.get('documents', {}).values())
+        if deleted < getattr(settings, 'RAG_COMPACT_MIN_DELETED', 1000):
+            return
+        if total and deleted / total >= getattr(settings, 'RAG_COMPACT_DELETED_RATIO', 0.2):
+            self.compact(background=True)
+
+
+# 전역 지식 베이스 관리 서비스
+knowledge_service = KnowledgeService()
@@ -0,0 +1,178 @@
+# ai_service/lexical_index.py
+
+import re
+import math
+import threading
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r'[가-힣]+|[a-z0-9]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """한국어 검색용 토큰화
+
+    형태소 분석기 없이 동작하도록 한글 어절은 어절 자체와 글자 bigram으로 나눕니다.
+    ("연회장에서" → "연회장에서", "연회", "회장", "장에", "에서")
+    조사가 붙어도 어간 bigram이 겹치므로 "연회장"으로 검색할 수 있습니다.
+    영문/숫자는 소문자 단어 단위로 사용합니다.
+    """
+    tokens = []
+    for word in _TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(word)
+        if len(word) > 2 and '가' <= word[0] <= '힣':
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+class BM25Index:
+    """메모리 역색인 기반 BM25 검색
+
+    임베딩 호출 없이 동작하므로 "뷔페", "호텔 연회장" 같은 정확한 용어 검색과
+    임베딩 API 장애 시의 대체 검색에 사용합니다.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.documents: List[Dict] = []
+        self.collection_types: List[str] = []
+        self._codes = np.zeros(0, dtype=np.uint8)
+        self._postings: Dict[str, tuple] = {}
+        self._idf: Dict[str, float] = {}
+        self._norms = np.zeros(0, dtype=np.float32)
+
+    @classmethod
+    def build(cls, documents: Iterable[Dict], **kwargs) -> 'BM25Index':
+        """{'id', 'content', 'metadata', 'collection'} 문서들로 색인 생성"""
+        index = cls(**kwargs)
+        postings = defaultdict(lambda: ([], []))
+        lengths, codes = [], []
+
+        for doc in documents:
+            row = len(index.ids)
+            collection_type = doc['collection']
+            if collection_type not in index.collection_types:
+                index.collection_types.append(collection_type)
+            codes.append(index.collection_types.index(collection_type))
+            index.ids.append(doc['id'])
+            index.documents.append(doc)
+
+            term_counts = Counter(tokenize(doc['content']))
+            lengths.append(sum(term_counts.values()))
+            for term, tf in term_counts.items():
+                rows, tfs = postings[term]
+                rows.append(row)
+                tfs.append(tf)
+
+        n_docs = len(index.ids)
+        index._codes = np.asarray(codes, dtype=np.uint8)
+        lengths = np.asarray(lengths, dtype=np.float32)
+        avg_length = float(lengths.mean()) if n_docs else 0.0
+        # 문서 길이 정규화 항은 질의와 무관하므로 미리 계산
+        index._norms = index.k1 * (1 - index.b + index.b * lengths / (avg_length or 1.0))
+
+        for term, (rows, tfs) in postings.items():
+            index._postings[term] = (np.asarray(rows, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            df = len(rows)
+            index._idf[term] = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, collection_types: Optional[List[str]] = None, top_k: int = 5) -> List[Dict]:
+        """BM25 점수 상위 top_k 문서 (점수 내림차순, 일치하는 용어가 없는 문서는 제외)"""
+        if not self.ids or top_k <= 0:
+            return []
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term, qtf in Counter(tokenize(query)).items():
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            rows, tfs = posting
+            scores[rows] += qtf * self._idf[term] * tfs * (self.k1 + 1) / (tfs + self._norms[rows])
+
+        if collection_types is not None and set(collection_types) != set(self.collection_types):
+            codes = [self.collection_types.index(t) for t in collection_types if t in self.collection_types]
+            scores[~np.isin(self._codes, codes)] = 0
+
+        matched = np.count_nonzero(scores)
+        if matched == 0:
+            return []
+        k = min(top_k, matched)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [{**self.documents[row], 'score': float(scores[row])} for row in top.tolist()]
+
+
+class LexicalIndexHolder:
+    """벡터 인덱스 세대(generation)가 바뀌면 BM25 색인을 백그라운드에서 다시 만드는 홀더
+
+    재생성이 끝날 때까지 검색은 기존 색인(첫 생성 전에는 None)을 그대로 사용하므로
+    요청 처리 중에 색인을 만들지 않습니다.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._index: Optional[BM25Index] = None
+        self._generation = None
+        self._building = None
+        self._failed = None
+        self._lock = threading.Lock()
+
+    def get(self, generation) -> Optional[BM25Index]:
+        if self._generation != generation:
+            self.refresh(generation)
+        return self._index
+
+    def refresh(self, generation):
+        """generation의 색인 생성을 백그라운드에서 시작 (최신이거나 생성 중이거나 실패한 세대면 무시)"""
+        with self._lock:
+            if self._building is not None or generation in (self._generation, self._failed):
+                return
+            self._building = generation
+        threading.Thread(target=self._build, args=(generation,), name='bm25-rebuild', daemon=True).start()
+
+    def _build(self, generation):
+        try:
+            index = BM25Index.build(self._loader())
+            logger.info(f"BM25 색인 생성: 문서 {len(index)}개")
+            with self._lock:
+                self._index, self._generation = index, generation
+        except Exception as e:
+            logger.error(f"BM25 색인 생성 오류: {e}")
+            # 같은 세대로 매 검색마다 재시도하지 않음 (다음 세대에서 다시 시도)
+            self._failed = generation
+        finally:
+            with self._lock:
+                self._building = None
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict]], k: int = 60) -> List[Dict]:
+    """여러 검색 결과를 순위 기반(RRF)으로 결합
+
+    점수 척도가 다른 BM25와 코사인 유사도를 정규화 없이 합칠 수 있습니다.
+    결과의 'score'는 RRF 점수이며, 원래 점수는 'vector_score'/'lexical_score'에 남깁니다.
+    """
+    # 같은 ID가 여러 컬렉션에 있을 수 있으므로 (컬렉션, ID)로 구분
+    fused: Dict[tuple, Dict] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results):
+            key = (result['collection'], result['id'])
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = {**result, 'score': 0.0}
+            else:
+                for field, value in result.items():
+                    entry.setdefault(field, value)
+            entry['score'] += 1.0 / (k + rank + 1)
+    return sorted(fused.values(), key=lambda x: x['score'], reverse=True)
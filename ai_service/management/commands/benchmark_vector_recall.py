@@ -0,0 +1,66 @@
+# ai_service/management/commands/benchmark_vector_recall.py
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_service.quantization import measure_recall
+from ai_service.reranking import normalize_rows
+from ai_service.vector_index import NumpyVectorIndex
+
+
+class Command(BaseCommand):
+    help = "int8 양자화 검색의 recall@k를 float32 전수 검색과 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--index-path',
+                            help="numpy 벡터 인덱스 디렉터리 (없으면 합성 데이터 사용)")
+        parser.add_argument('--vectors', type=int, default=20000, help="합성 벡터 수")
+        parser.add_argument('--dim', type=int, default=1536, help="합성 벡터 차원")
+        parser.add_argument('--queries', type=int, default=200, help="질의 수")
+        parser.add_argument('--top-k', type=int, default=10)
+        parser.add_argument('--rescore-factors', default='1,2,4,8',
+                            help="비교할 재채점 후보 배수 (쉼표로 구분)")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+
+        if options['index_path']:
+            vectors = self._load_index_vectors(options['index_path'])
+        else:
+            vectors = self._synthetic_vectors(rng, options['vectors'], options['dim'])
+        if len(vectors) < options['top_k']:
+            raise CommandError("벡터 수가 top-k보다 적습니다.")
+
+        # 저장된 벡터 근처의 질의 (실제 질의처럼 관련 문서가 존재하는 분포)
+        sample = vectors[rng.integers(0, len(vectors), options['queries'])]
+        queries = normalize_rows(sample + rng.normal(0, 0.5 / np.sqrt(vectors.shape[1]), sample.shape))
+
+        try:
+            factors = [int(f) for f in options['rescore_factors'].split(',')]
+        except ValueError:
+            raise CommandError("--rescore-factors는 정수 목록이어야 합니다.")
+
+        self.stdout.write(f"벡터 {len(vectors)}개 x {vectors.shape[1]}차원, 질의 {len(queries)}개, top-{options['top_k']}")
+        for factor in factors:
+            result = measure_recall(vectors, queries, options['top_k'], factor)
+            self.stdout.write(
+                f"rescore x{factor}: recall(int8만)={result['recall_int8_only']:.4f} "
+                f"recall(재채점)={result['recall_int8_rescored']:.4f} "
+                f"float32 {result['float32_ms_per_query']:.2f}ms/질의, int8 {result['int8_ms_per_query']:.2f}ms/질의"
+            )
+        self.stdout.write(
+            f"메모리: float32 {result['float32_bytes'] / 2**20:.1f}MB → int8 {result['int8_bytes'] / 2**20:.1f}MB"
+        )
+
+    def _load_index_vectors(self, path: str) -> np.ndarray:
+        view = NumpyVectorIndex(path)._load_view()
+        if not view or view['count'] == 0:
+            raise CommandError(f"벡터가 없는 인덱스입니다: {path}")
+        return np.array(view['vectors'][view['deleted'] == 0], dtype=np.float32)
+
+    def _synthetic_vectors(self, rng, count: int, dim: int) -> np.ndarray:
+        # 임베딩처럼 군집을 이루는 분포
+        centers = rng.normal(size=(max(1, count // 50), dim))
+        vectors = centers[rng.integers(0, len(centers), count)] + rng.normal(0, 0.6, (count, dim))
+        return normalize_rows(vectors)
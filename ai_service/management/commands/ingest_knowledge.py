@@ -0,0 +1,59 @@
+# ai_service/management/commands/ingest_knowledge.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_service.ingestion import SUPPORTED_FORMATS, IngestionPipeline
+
+
+class Command(BaseCommand):
+    help = "JSON/JSONL/CSV/텍스트 파일을 RAG 지식 베이스에 스트리밍 방식으로 적재합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="적재할 파일 경로")
+        parser.add_argument('--collection', required=True,
+                            help="컬렉션 종류 (party_ideas, venues, catering, decorations, activities)")
+        parser.add_argument('--format', choices=SUPPORTED_FORMATS,
+                            help="파일 형식 (기본: 확장자로 판단)")
+        parser.add_argument('--content-field', default='content',
+                            help="본문으로 사용할 필드 이름 (JSON/JSONL/CSV)")
+        parser.add_argument('--batch-size', type=int,
+                            help="한 번에 임베딩/저장할 청크 수 (기본: RAG_EMBED_BATCH_SIZE x RAG_EMBED_CONCURRENCY)")
+        parser.add_argument('--restart', action='store_true',
+                            help="체크포인트를 무시하고 처음부터 다시 적재")
+
+    def handle(self, *args, **options):
+        from ai_service.rag_system import PartyPlanningRAG
+
+        rag = PartyPlanningRAG()
+        try:
+            pipeline = IngestionPipeline(
+                rag,
+                collection_type=options['collection'],
+                batch_size=options['batch_size'],
+                content_field=options['content_field'],
+                progress=self._report_progress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for path in options['paths']:
+            self.stdout.write(f"적재 시작: {path}")
+            try:
+                stats = pipeline.run(path, fmt=options['format'], resume=not options['restart'])
+            except (OSError, ValueError) as e:
+                raise CommandError(f"{path}: {e}")
+
+            throughput = stats.throughput()
+            self.stdout.write(self.style.SUCCESS(
+                f"적재 완료: {path} - 레코드 {stats.records}개, 청크 {stats.chunks}개 "
+                f"(신규 임베딩 {stats.embedded}, 메타데이터 갱신 {stats.updated}, 중복 {stats.duplicates}), "
+                f"{stats.elapsed:.1f}초, {throughput['records_per_sec']} 레코드/초, "
+                f"{throughput['embedded_per_sec']} 임베딩/초"
+            ))
+
+    def _report_progress(self, stats):
+        throughput = stats.throughput()
+        self.stdout.write(
+            f"  배치 {stats.batches}: 레코드 {stats.records}개, 청크 {stats.chunks}개, "
+            f"{throughput['chunks_per_sec']} 청크/초"
+        )
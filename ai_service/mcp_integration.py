@@ -3,19 +3,104 @@
 import asyncio
 import json
 import logging
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+import threading
+from typing import Dict, List, Any, Optional, Callable, Awaitable
+from dataclasses import dataclass, field
 from abc import ABC, abstractmethod
 
+from django.conf import settings
+from jsonschema import FormatChecker
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+from .tracing import tracer
+from .tool_cache import FRESH, LOCAL_PROVIDER, STALE, ToolResultCache
+from .budget_scenarios import calculate_budget
+from .resource_cache import ResourceSnapshot, ResourceSnapshotCache, build_snapshot
+from .venue_catalog import SORT_OPTIONS as VENUE_SORT_OPTIONS, get_venue_catalog
+from .catering_index import (
+    SORT_OPTIONS as CATERING_SORT_OPTIONS, DIETARY_MATCH_OPTIONS, get_catering_index
+)
+
 logger = logging.getLogger(__name__)
 
 @dataclass
 class MCPTool:
-    """MCP 도구 정의"""
+    """MCP 도구 정의
+
+    handler가 있으면 ToolRegistry로 바로 호출할 수 있으며, 인자 JSON Schema
+    (parameters + required)는 생성 시 한 번만 검증기로 컴파일됩니다.
+    """
     name: str
     description: str
     parameters: Dict[str, Any]
     required: List[str]
+    handler: Optional[Callable[..., Awaitable[Any]]] = field(default=None, repr=False, compare=False)
+    _validator: Any = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        schema = {"additionalProperties": False, **self.parameters, "required": list(self.required)}
+        validator_cls = validator_for(schema)
+        validator_cls.check_schema(schema)
+        self._validator = validator_cls(schema, format_checker=FormatChecker())
+    
+    @property
+    def defaults(self) -> Dict[str, Any]:
+        """인자 스키마에 정의된 기본값"""
+        return {
+            name: spec["default"]
+            for name, spec in self.parameters.get("properties", {}).items()
+            if "default" in spec
+        }
+    
+    def validate(self, arguments: Dict[str, Any]) -> Optional[str]:
+        """인자 검증 (문제가 없으면 None, 있으면 가장 관련 있는 오류 메시지)"""
+        error = best_match(self._validator.iter_errors(arguments))
+        if error is None:
+            return None
+        location = ".".join(str(p) for p in error.absolute_path)
+        return f"{location}: {error.message}" if location else error.message
+
+class ToolRegistry:
+    """이름으로 도구를 찾아 검증 후 핸들러를 호출하는 레지스트리"""
+    
+    def __init__(self, tools: Optional[List[MCPTool]] = None):
+        self._tools: Dict[str, MCPTool] = {}
+        for tool in tools or []:
+            self.register(tool)
+    
+    def register(self, tool: MCPTool):
+        if tool.handler is None:
+            raise ValueError(f"Tool '{tool.name}' has no handler")
+        if tool.name in self._tools:
+            raise ValueError(f"Tool '{tool.name}' is already registered")
+        self._tools[tool.name] = tool
+    
+    @property
+    def tools(self) -> List[MCPTool]:
+        return list(self._tools.values())
+    
+    def get(self, name: str) -> Optional[MCPTool]:
+        return self._tools.get(name)
+    
+    async def dispatch(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """도구 호출 (알 수 없는 도구나 잘못된 인자는 핸들러를 실행하지 않고 오류 반환)"""
+        tool = self._tools.get(name)
+        if tool is None:
+            return {"error": f"Unknown tool: {name}"}
+        
+        # 값이 없는(None) 선택 인자는 생략한 것으로 처리
+        arguments = {k: v for k, v in (arguments or {}).items() if v is not None}
+        error = tool.validate(arguments)
+        if error:
+            logger.warning(f"Invalid arguments ({name}): {error}")
+            return {"error": f"Invalid arguments: {error}"}
+        
+        try:
+            return await tool.handler(**arguments)
+        except Exception as e:
+            logger.error(f"Tool call error ({name}): {e}")
+            return {"error": str(e)}
 
 @dataclass
 class MCPResource:
@@ -47,24 +132,38 @@ class MCPProvider(ABC):
     async def read_resource(self, uri: str) -> str:
         """리소스 읽기"""
         pass
+    
+    def resource_snapshot(self, uri: str, page: Optional[int] = None,
+                          page_size: Optional[int] = None) -> Optional[ResourceSnapshot]:
+        """미리 직렬화된 리소스 응답 (지원하지 않거나 없는 리소스이면 None)"""
+        return None
+    
+    def tool_defaults(self, name: str) -> Dict[str, Any]:
+        """도구 인자의 스키마 기본값 (알 수 없으면 빈 dict)"""
+        return {}
 
 class PartyPlanningMCPProvider(MCPProvider):
     """파티 플래닝을 위한 MCP 프로바이더"""
     
     def __init__(self):
-        self.tools = [
+        self.registry = ToolRegistry([
             MCPTool(
                 name="search_venues",
                 description="특정 지역에서 파티 장소를 검색합니다",
                 parameters={
                     "type": "object",
                     "properties": {
-                        "location": {"type": "string", "description": "검색할 지역"},
-                        "capacity": {"type": "integer", "description": "최소 수용 인원"},
-                        "budget_max": {"type": "number", "description": "최대 예산"}
+                        "location": {"type": "string", "description": "검색할 지역 (시/구/동네, 예: 강남구, 홍대)"},
+                        "capacity": {"type": "integer", "minimum": 1, "description": "최소 수용 인원"},
+                        "budget_max": {"type": "number", "minimum": 0, "description": "최대 시간당 대관료"},
+                        "radius_km": {"type": "number", "exclusiveMinimum": 0, "maximum": 50, "description": "location 지점에서의 검색 반경 (km)"},
+                        "sort_by": {"type": "string", "enum": list(VENUE_SORT_OPTIONS), "default": "rating", "description": "정렬 기준 (rating: 평점순, price: 가격순, capacity: 인원에 맞는 순, distance: 가까운 순)"},
+                        "offset": {"type": "integer", "minimum": 0, "default": 0, "description": "건너뛸 결과 수"},
+                        "limit": {"type": "integer", "minimum": 1, "maximum": 50, "default": 10, "description": "반환할 결과 수 (기본 10)"}
                     }
                 },
-                required=["location", "capacity"]
+                required=["location", "capacity"],
+                handler=self._search_venues
             ),
             MCPTool(
                 name="get_catering_options",
@@ -73,12 +172,16 @@ class PartyPlanningMCPProvider(MCPProvider):
                     "type": "object",
                     "properties": {
                         "cuisine_type": {"type": "string", "description": "음식 종류"},
-                        "guest_count": {"type": "integer", "description": "참석자 수"},
+                        "guest_count": {"type": "integer", "minimum": 1, "description": "참석자 수"},
                         "budget_per_person": {"type": "number", "description": "인당 예산"},
-                        "dietary_restrictions": {"type": "array", "items": {"type": "string"}, "description": "식단 제한사항"}
+                        "dietary_restrictions": {"type": "array", "items": {"type": "string"}, "description": "식단 제한사항 (vegetarian, vegan, halal, gluten_free 등)"},
+                        "dietary_match": {"type": "string", "enum": list(DIETARY_MATCH_OPTIONS), "default": "any", "description": "식단 제한사항 중 하나라도(any) 또는 모두(all) 지원"},
+                        "sort_by": {"type": "string", "enum": list(CATERING_SORT_OPTIONS), "default": "price", "description": "정렬 기준 (price: 가격순, rating: 평점순)"},
+                        "limit": {"type": "integer", "minimum": 1, "maximum": 50, "default": 10, "description": "반환할 결과 수 (기본 10)"}
                     }
                 },
-                required=["guest_count"]
+                required=["guest_count"],
+                handler=self._get_catering_options
             ),
             MCPTool(
                 name="check_weather",
@@ -86,11 +189,12 @@ class PartyPlanningMCPProvider(MCPProvider):
                 parameters={
                     "type": "object",
                     "properties": {
-                        "date": {"type": "string", "description": "날짜 (YYYY-MM-DD)"},
+                        "date": {"type": "string", "format": "date", "description": "날짜 (YYYY-MM-DD)"},
                         "location": {"type": "string", "description": "지역"}
                     }
                 },
-                required=["date", "location"]
+                required=["date", "location"],
+                handler=self._check_weather
             ),
             MCPTool(
                 name="calculate_budget",
@@ -99,13 +203,14 @@ class PartyPlanningMCPProvider(MCPProvider):
                     "type": "object",
                     "properties": {
                         "party_type": {"type": "string", "description": "파티 종류"},
-                        "guest_count": {"type": "integer", "description": "참석자 수"},
+                        "guest_count": {"type": "integer", "minimum": 1, "description": "참석자 수"},
                         "venue_cost": {"type": "number", "description": "장소 비용"},
                         "catering_cost": {"type": "number", "description": "음식 비용"},
                         "decoration_cost": {"type": "number", "description": "장식 비용"}
                     }
                 },
-                required=["guest_count"]
+                required=["guest_count"],
+                handler=self._calculate_budget
             ),
             MCPTool(
                 name="generate_timeline",
@@ -113,13 +218,14 @@ class PartyPlanningMCPProvider(MCPProvider):
                 parameters={
                     "type": "object",
                     "properties": {
-                        "party_date": {"type": "string", "description": "파티 날짜 (YYYY-MM-DD)"},
-                        "complexity": {"type": "string", "enum": ["simple", "moderate", "complex"], "description": "파티 복잡도"}
+                        "party_date": {"type": "string", "format": "date", "description": "파티 날짜 (YYYY-MM-DD)"},
+                        "complexity": {"type": "string", "enum": ["simple", "moderate", "complex"], "default": "moderate", "description": "파티 복잡도"}
                     }
                 },
-                required=["party_date"]
+                required=["party_date"],
+                handler=self._generate_timeline
             )
-        ]
+        ])
         
         self.resources = [
             MCPResource(
@@ -142,143 +248,85 @@ class PartyPlanningMCPProvider(MCPProvider):
             )
         ]
     
+        # 카탈로그 리소스: URI → (응답 키, 카탈로그 로더)
+        self._catalog_resources = {
+            "party://venues/database": ("venues", get_venue_catalog),
+            "party://catering/menu": ("catering_options", get_catering_index),
+        }
+        self._snapshots = ResourceSnapshotCache()
+    
+    @property
+    def tools(self) -> List[MCPTool]:
+        return self.registry.tools
+    
     async def get_tools(self) -> List[MCPTool]:
         """사용 가능한 도구 목록 반환"""
         return self.tools
     
     async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
-        """도구 호출 처리"""
-        try:
-            if name == "search_venues":
-                return await self._search_venues(**arguments)
-            elif name == "get_catering_options":
-                return await self._get_catering_options(**arguments)
-            elif name == "check_weather":
-                return await self._check_weather(**arguments)
-            elif name == "calculate_budget":
-                return await self._calculate_budget(**arguments)
-            elif name == "generate_timeline":
-                return await self._generate_timeline(**arguments)
-            else:
-                raise ValueError(f"Unknown tool: {name}")
-        except Exception as e:
-            logger.error(f"Tool call error ({name}): {e}")
-            return {"error": str(e)}
+        """도구 호출 처리 (레지스트리에서 찾아 인자 검증 후 실행)"""
+        return await self.registry.dispatch(name, arguments)
+    
+    def tool_defaults(self, name: str) -> Dict[str, Any]:
+        tool = self.registry.get(name)
+        return tool.defaults if tool is not None else {}
     
     async def get_resources(self) -> List[MCPResource]:
         """사용 가능한 리소스 목록 반환"""
         return self.resources
     
+    def resource_snapshot(self, uri: str, page: Optional[int] = None,
+                          page_size: Optional[int] = None) -> Optional[ResourceSnapshot]:
+        """카탈로그 리소스 (카탈로그 버전과 페이지별로 한 번만 직렬화/압축)"""
+        entry = self._catalog_resources.get(uri)
+        if entry is None:
+            return None
+        if page is not None and (page < 1 or not page_size or page_size < 1):
+            raise ValueError("page와 page_size는 1 이상이어야 합니다")
+        
+        key, load_catalog = entry
+        catalog = load_catalog()
+        
+        def build() -> ResourceSnapshot:
+            if page is None:
+                return build_snapshot({key: catalog.records, "version": catalog.version})
+            start = (page - 1) * page_size
+            return build_snapshot({
+                key: catalog.records[start:start + page_size],
+                "page": page,
+                "page_size": page_size,
+                "total": len(catalog.records),
+                "version": catalog.version,
+            })
+        
+        return self._snapshots.get((uri, catalog.version or id(catalog), page, page_size), build)
+    
     async def read_resource(self, uri: str) -> str:
         """리소스 읽기"""
-        if uri == "party://venues/database":
-            return json.dumps({
-                "venues": [
-                    {
-                        "name": "그랜드 호텔 연회장",
-                        "location": "강남구",
-                        "capacity": 200,
-                        "price_per_hour": 500000,
-                        "amenities": ["음향시설", "주차장", "케이터링 서비스"]
-                    },
-                    {
-                        "name": "카페 블루문",
-                        "location": "홍대",
-                        "capacity": 30,
-                        "price_per_hour": 100000,
-                        "amenities": ["음향시설", "프로젝터"]
-                    }
-                ]
-            })
-        elif uri == "party://catering/menu":
-            return json.dumps({
-                "catering_options": [
-                    {
-                        "name": "한식 뷔페",
-                        "price_per_person": 25000,
-                        "cuisine": "korean",
-                        "dietary_options": ["vegetarian", "halal"]
-                    },
-                    {
-                        "name": "양식 코스",
-                        "price_per_person": 45000,
-                        "cuisine": "western",
-                        "dietary_options": ["vegetarian", "vegan", "gluten_free"]
-                    }
-                ]
-            })
-        else:
+        snapshot = self.resource_snapshot(uri)
+        if snapshot is None:
             return json.dumps({"error": "Resource not found"})
+        return snapshot.text
     
-    async def _search_venues(self, location: str, capacity: int, budget_max: Optional[float] = None) -> Dict:
-        """장소 검색 구현"""
-        # 실제로는 외부 API나 데이터베이스를 조회
-        venues = [
-            {
-                "name": f"{location} 파티룸 A",
-                "location": location,
-                "capacity": capacity + 10,
-                "hourly_rate": min(budget_max or 300000, 200000),
-                "rating": 4.5,
-                "amenities": ["음향시설", "주차장", "케이터링 지원"]
-            },
-            {
-                "name": f"{location} 커뮤니티 센터",
-                "location": location,
-                "capacity": capacity + 20,
-                "hourly_rate": min(budget_max or 300000, 150000),
-                "rating": 4.2,
-                "amenities": ["넓은 공간", "주차장", "주방시설"]
-            }
-        ]
-        
-        if budget_max:
-            venues = [v for v in venues if v["hourly_rate"] <= budget_max]
-        
-        return {"venues": venues}
+    async def _search_venues(self, location: str, capacity: int, budget_max: Optional[float] = None,
+                             sort_by: str = "rating", offset: int = 0, limit: int = 10,
+                             radius_km: Optional[float] = None) -> Dict:
+        """장소 검색 (카탈로그 인덱스 조회)"""
+        return get_venue_catalog().search(
+            location, min_capacity=capacity, max_hourly_rate=budget_max,
+            sort_by=sort_by, offset=offset, limit=limit, radius_km=radius_km
+        )
     
     async def _get_catering_options(self, guest_count: int, cuisine_type: Optional[str] = None,
                                   budget_per_person: Optional[float] = None,
-                                  dietary_restrictions: Optional[List[str]] = None) -> Dict:
-        """케이터링 옵션 검색"""
-        options = [
-            {
-                "name": "프리미엄 뷔페",
-                "price_per_person": 35000,
-                "cuisine": "international",
-                "dietary_options": ["vegetarian", "halal"],
-                "minimum_order": 20
-            },
-            {
-                "name": "간편 도시락",
-                "price_per_person": 15000,
-                "cuisine": "korean",
-                "dietary_options": ["vegetarian"],
-                "minimum_order": 10
-            },
-            {
-                "name": "파티 플래터",
-                "price_per_person": 25000,
-                "cuisine": "western",
-                "dietary_options": ["vegetarian", "vegan"],
-                "minimum_order": 15
-            }
-        ]
-        
-        # 필터링
-        if budget_per_person:
-            options = [o for o in options if o["price_per_person"] <= budget_per_person]
-        
-        if cuisine_type:
-            options = [o for o in options if o["cuisine"] == cuisine_type]
-        
-        if dietary_restrictions:
-            options = [o for o in options if any(dr in o["dietary_options"] for dr in dietary_restrictions)]
-        
-        # 최소 주문량 확인
-        options = [o for o in options if guest_count >= o["minimum_order"]]
-        
-        return {"catering_options": options}
+                                  dietary_restrictions: Optional[List[str]] = None,
+                                  dietary_match: str = "any", sort_by: str = "price", limit: int = 10) -> Dict:
+        """케이터링 옵션 검색 (비트마스크 인덱스 조회)"""
+        return get_catering_index().search(
+            guest_count, cuisine_type=cuisine_type, budget_per_person=budget_per_person,
+            dietary_restrictions=dietary_restrictions, dietary_match=dietary_match,
+            sort_by=sort_by, limit=limit
+        )
     
     async def _check_weather(self, date: str, location: str) -> Dict:
         """날씨 확인 (모의 구현)"""
@@ -300,34 +348,9 @@ class PartyPlanningMCPProvider(MCPProvider):
                               catering_cost: Optional[float] = None,
                               decoration_cost: Optional[float] = None) -> Dict:
         """예산 계산"""
-        # 기본값 설정
-        venue_cost = venue_cost or (guest_count * 5000)
-        catering_cost = catering_cost or (guest_count * 25000)
-        decoration_cost = decoration_cost or min(100000, guest_count * 2000)
-        
-        # 파티 타입별 조정
-        multiplier = {
-            "생일파티": 1.0,
-            "결혼기념일": 1.5,
-            "회사파티": 1.2,
-            "졸업파티": 0.8
-        }.get(party_type, 1.0)
-        
-        subtotal = (venue_cost + catering_cost + decoration_cost) * multiplier
-        tax = subtotal * 0.1  # 10% 세금
-        total = subtotal + tax
-        
-        return {
-            "breakdown": {
-                "venue": venue_cost * multiplier,
-                "catering": catering_cost * multiplier,
-                "decoration": decoration_cost * multiplier,
-                "subtotal": subtotal,
-                "tax": tax,
-                "total": total
-            },
-            "per_person": total / guest_count
-        }
+        # 0이나 None은 인원 기준 기본값 사용
+        return calculate_budget(guest_count, party_type, venue_cost or None, catering_cost or None,
+                                decoration_cost or None)
     
     async def _generate_timeline(self, party_date: str, complexity: str = "moderate") -> Dict:
         """타임라인 생성"""
@@ -364,17 +387,42 @@ class PartyPlanningMCPProvider(MCPProvider):
         }
 
 class MCPClient:
-    """MCP 클라이언트"""
+    """MCP 클라이언트
+
+    TTL이 정해진 로컬 도구의 결과는 ToolResultCache에 저장해 같은 인자로 다시 호출하면
+    도구를 실행하지 않고 돌려줍니다. 외부 서버의 도구는 캐시하지 않습니다.
+    """
     
-    def __init__(self):
+    def __init__(self, cache: Optional[ToolResultCache] = None):
         self.providers: Dict[str, MCPProvider] = {}
-        self.register_provider("party_planning", PartyPlanningMCPProvider())
+        self.cache = cache or ToolResultCache.from_settings()
+        self.register_provider(LOCAL_PROVIDER, PartyPlanningMCPProvider())
+        for config in getattr(settings, 'MCP_EXTERNAL_SERVERS', []):
+            try:
+                self.register_external_server(config)
+            except Exception as e:
+                logger.error(f"MCP external server registration error ({config.get('name')}): {e}")
     
     def register_provider(self, name: str, provider: MCPProvider):
         """MCP 프로바이더 등록"""
         self.providers[name] = provider
         logger.info(f"MCP provider '{name}' registered")
     
+    def register_external_server(self, config: Dict[str, Any]):
+        """외부 MCP 서버 등록 (config: name, transport, command/args/env 또는 url, pool_size, timeout)"""
+        from .mcp_remote import RemoteMCPProvider
+        
+        config = dict(config)
+        name = config.pop('name')
+        self.register_provider(name, RemoteMCPProvider(name=name, **config))
+    
+    def start_providers(self):
+        """외부 서버 프로세스 풀을 미리 시작 (워커 초기화 시 호출)"""
+        for provider in self.providers.values():
+            start = getattr(provider, 'start', None)
+            if callable(start):
+                start()
+    
     async def get_all_tools(self) -> Dict[str, List[MCPTool]]:
         """모든 프로바이더의 도구 목록 반환"""
         all_tools = {}
@@ -388,7 +436,65 @@ class MCPClient:
             raise ValueError(f"Provider '{provider_name}' not found")
         
         provider = self.providers[provider_name]
-        return await provider.call_tool(tool_name, arguments)
+        if self.cache.ttl_for(provider_name, tool_name) is None:
+            return await self._call_provider(provider, provider_name, tool_name, arguments)
+        
+        key = self.cache.make_key(provider_name, tool_name, arguments, provider.tool_defaults(tool_name))
+        cached, state = self.cache.lookup(key)
+        if state == FRESH:
+            self.cache.record(tool_name, 'hits')
+            return cached
+        if state == STALE:
+            # 오래된 결과를 바로 돌려주고 백그라운드에서 갱신
+            self.cache.record(tool_name, 'stale_hits')
+            self._refresh_in_background(provider, provider_name, tool_name, arguments, key)
+            return cached
+        
+        self.cache.record(tool_name, 'misses')
+        result = await self._call_provider(provider, provider_name, tool_name, arguments)
+        self.cache.store(key, result)
+        return result
+    
+    async def _call_provider(self, provider: MCPProvider, provider_name: str, tool_name: str,
+                             arguments: Dict[str, Any]) -> Any:
+        with tracer.span("mcp.call_tool", kind='CLIENT', **{'mcp.provider': provider_name, 'mcp.tool': tool_name}) as span:
+            result = await provider.call_tool(tool_name, arguments)
+            if span is not None and isinstance(result, dict) and 'error' in result:
+                span.error = str(result['error'])
+            return result
+    
+    def _refresh_in_background(self, provider: MCPProvider, provider_name: str, tool_name: str,
+                               arguments: Dict[str, Any], key):
+        """캐시 항목 갱신 (요청마다 이벤트 루프를 새로 만들고 닫으므로 별도 스레드의 루프에서 실행)"""
+        if not self.cache.begin_refresh(key):
+            return
+        
+        def refresh():
+            try:
+                result = asyncio.run(self._call_provider(provider, provider_name, tool_name, arguments))
+                if isinstance(result, dict) and 'error' in result:
+                    self.cache.record(tool_name, 'refresh_errors')
+                else:
+                    self.cache.store(key, result)
+                    self.cache.record(tool_name, 'refreshes')
+            except Exception as e:
+                logger.warning(f"MCP cache refresh error ({tool_name}): {e}")
+                self.cache.record(tool_name, 'refresh_errors')
+            finally:
+                self.cache.end_refresh(key)
+        
+        threading.Thread(target=refresh, name=f"mcp-refresh-{tool_name}", daemon=True).start()
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """도구 결과 캐시 통계"""
+        return self.cache.stats()
+    
+    def resource_snapshot(self, provider_name: str, uri: str, page: Optional[int] = None,
+                          page_size: Optional[int] = None) -> Optional[ResourceSnapshot]:
+        """특정 프로바이더의 미리 직렬화된 리소스"""
+        if provider_name not in self.providers:
+            raise ValueError(f"Provider '{provider_name}' not found")
+        return self.providers[provider_name].resource_snapshot(uri, page=page, page_size=page_size)
     
     async def get_contextual_tools(self, context: Dict[str, Any]) -> List[Dict]:
         """컨텍스트에 적합한 도구 추천"""
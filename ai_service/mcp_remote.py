@@ -0,0 +1,392 @@
+# ai_service/mcp_remote.py
+
+import json
+import atexit
+import asyncio
+import logging
+import threading
+from contextlib import AsyncExitStack
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import anyio
+from django.conf import settings
+from jsonschema.exceptions import SchemaError
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from .mcp_integration import MCPProvider, MCPResource, MCPTool, ToolRegistry
+
+logger = logging.getLogger(__name__)
+
+TRANSPORTS = ('stdio', 'sse', 'streamable_http')
+
+# 세션이 끊겼다고 보고 서버를 다시 띄우는 오류
+_CONNECTION_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream,
+                      ConnectionError, EOFError)
+# 서버 프로세스가 종료되면 SDK가 대기 중인 요청에 돌려주는 MCP 오류 코드 (CONNECTION_CLOSED)
+_CONNECTION_CLOSED_CODE = -32000
+
+
+def _is_connection_error(error: Exception) -> bool:
+    if isinstance(error, _CONNECTION_ERRORS):
+        return True
+    return getattr(getattr(error, 'error', None), 'code', None) == _CONNECTION_CLOSED_CODE
+
+
+class _EventLoopThread:
+    """외부 MCP 세션 전용 이벤트 루프
+
+    뷰는 요청마다 이벤트 루프를 만들고 닫기 때문에, 세션과 서버 프로세스는 별도 스레드의
+    오래 사는 루프에 둡니다. 스레드는 처음 사용할 때 시작합니다 (fork 이후 워커 프로세스에서).
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name=self._name, daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, coro: Awaitable):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def run(self, coro: Awaitable) -> Any:
+        """다른 이벤트 루프에서 await (호출한 루프는 막히지 않음)"""
+        return await asyncio.wrap_future(self.submit(coro))
+
+
+_loop_thread = _EventLoopThread('mcp-remote')
+
+
+class _PooledSession:
+    """서버 프로세스(또는 HTTP 연결) 하나와 그 위의 MCP 세션
+
+    supervise 태스크가 세션을 열고 유지하며, 세션이 죽거나 재시작 요청을 받으면 다시 엽니다.
+    시작에 실패했거나 열자마자 죽는 경우에만 지수 백오프하며, 그동안은 start_failed로 표시해
+    요청이 startup_timeout까지 기다리지 않고 바로 실패하게 합니다. 컨텍스트 매니저의 진입과 종료가 같은 태스크에서
+    이뤄져야 하므로 세션 수명은 전부 이 태스크 안에서 관리합니다.
+    """
+
+    def __init__(self, provider: 'RemoteMCPProvider', index: int):
+        self.provider = provider
+        self.index = index
+        self.session: Optional[ClientSession] = None
+        self.in_flight = 0
+        self.restarts = 0
+        self.start_failed = False
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._stopping = False
+
+    async def supervise(self):
+        loop = asyncio.get_running_loop()
+        backoff = 1.0
+        while not self._stopping:
+            opened_at = None
+            try:
+                async with AsyncExitStack() as stack:
+                    self.session = await self.provider._open_session(stack)
+                    opened_at = loop.time()
+                    self.start_failed = False
+                    self.ready.set()
+                    logger.info(f"MCP server '{self.provider.name}' session {self.index} ready")
+                    await self._wake.wait()
+            except Exception as e:
+                logger.warning(f"MCP server '{self.provider.name}' session {self.index} error: {e}")
+            finally:
+                self.session = None
+                self.ready.clear()
+                self._wake.clear()
+            if self._stopping:
+                break
+            self.restarts += 1
+            # 다시 뜬 서버의 도구 목록이 달라졌을 수 있으므로 다음 호출에서 새로 조회
+            self.provider._registry = None
+            if opened_at is not None and loop.time() - opened_at > backoff:
+                # 한동안 정상 동작한 세션은 바로 다시 엶
+                backoff = 1.0
+                continue
+            if opened_at is None:
+                self.start_failed = True
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def restart(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopping = True
+        self._wake.set()
+
+
+def _field(obj, *names) -> Any:
+    """SDK 버전에 따라 이름이 다른 필드 조회 (1.x: camelCase, 2.x: snake_case)"""
+    for name in names:
+        value = getattr(obj, name, None)
+        if value is not None:
+            return value
+    return None
+
+
+def _tool_result(result) -> Any:
+    """CallToolResult를 내부 프로바이더와 같은 dict 형태로 변환"""
+    texts = [content.text for content in result.content if getattr(content, 'type', None) == 'text']
+    text = "\n".join(texts)
+    if _field(result, 'is_error', 'isError'):
+        return {"error": text or "Tool call failed"}
+    structured = _field(result, 'structured_content', 'structuredContent')
+    if structured is not None:
+        return structured
+    if len(texts) == 1:
+        try:
+            parsed = json.loads(text)
+            return parsed if isinstance(parsed, dict) else {"result": parsed}
+        except ValueError:
+            pass
+    return {"content": text}
+
+
+class RemoteMCPProvider(MCPProvider):
+    """외부 MCP 서버 프로바이더 (stdio 하위 프로세스, SSE 또는 Streamable HTTP)
+
+    서버 pool_size개를 미리 띄워 두고, 요청마다 처리 중인 요청이 가장 적은 세션에
+    보냅니다. 한 세션에 여러 요청을 동시에 보낼 수 있으며(JSON-RPC 파이프라이닝),
+    전체 동시 요청 수는 pool_size * max_in_flight로 제한합니다. 연결 오류가 나면 해당
+    세션만 다시 시작합니다. 도구 인자는 서버가 알려준 inputSchema로 먼저 검증합니다.
+    """
+
+    def __init__(self, name: str, transport: str = 'stdio', command: Optional[str] = None,
+                 args: Optional[List[str]] = None, env: Optional[Dict[str, str]] = None,
+                 cwd: Optional[str] = None, url: Optional[str] = None, headers: Optional[Dict[str, str]] = None,
+                 pool_size: Optional[int] = None, max_in_flight: int = 8, timeout: Optional[float] = None,
+                 startup_timeout: float = 30.0):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"transport must be one of {TRANSPORTS}")
+        if transport == 'stdio' and not command:
+            raise ValueError(f"MCP server '{name}': stdio transport requires 'command'")
+        if transport != 'stdio' and not url:
+            raise ValueError(f"MCP server '{name}': {transport} transport requires 'url'")
+
+        self.name = name
+        self.transport = transport
+        self.command = command
+        self.args = list(args or [])
+        self.env = env
+        self.cwd = cwd
+        self.url = url
+        self.headers = headers
+        self.pool_size = pool_size or getattr(settings, 'MCP_REMOTE_POOL_SIZE', 2)
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout or getattr(settings, 'MCP_REMOTE_TIMEOUT', 30.0)
+        self.startup_timeout = startup_timeout
+
+        self._sessions: List[_PooledSession] = []
+        self._capacity: Optional[asyncio.Semaphore] = None
+        self._registry: Optional[ToolRegistry] = None
+        # 백그라운드 루프에서만 사용 (동시 요청이 도구 목록을 한 번만 조회하도록)
+        self._registry_lock = asyncio.Lock()
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    # --- 세션 풀 (백그라운드 루프에서 실행) ---
+
+    def start(self):
+        """서버 프로세스 풀 시작 (즉시 반환)"""
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+        _loop_thread.submit(self._start_sessions())
+        atexit.register(self.close)
+
+    async def _start_sessions(self):
+        self._capacity = asyncio.Semaphore(self.pool_size * self.max_in_flight)
+        self._sessions = [_PooledSession(self, index) for index in range(self.pool_size)]
+        for pooled in self._sessions:
+            pooled.task = asyncio.create_task(pooled.supervise(), name=f"mcp-{self.name}-{pooled.index}")
+
+    async def _open_session(self, stack: AsyncExitStack) -> ClientSession:
+        if self.transport == 'stdio':
+            params = {'command': self.command, 'args': self.args, 'env': self.env}
+            if self.cwd:
+                params['cwd'] = self.cwd
+            read, write = await stack.enter_async_context(stdio_client(StdioServerParameters(**params)))
+        elif self.transport == 'sse':
+            from mcp.client.sse import sse_client
+            read, write = await stack.enter_async_context(sse_client(self.url, headers=self.headers))
+        else:
+            try:
+                from mcp.client.streamable_http import streamable_http_client
+            except ImportError:
+                # mcp 1.x
+                from mcp.client.streamable_http import streamablehttp_client
+                streams = await stack.enter_async_context(streamablehttp_client(self.url, headers=self.headers))
+            else:
+                from mcp.shared._httpx_utils import create_mcp_http_client
+                http_client = await stack.enter_async_context(create_mcp_http_client(headers=self.headers))
+                streams = await stack.enter_async_context(streamable_http_client(self.url, http_client=http_client))
+            read, write = streams[0], streams[1]
+
+        session = await stack.enter_async_context(ClientSession(read, write))
+        await asyncio.wait_for(session.initialize(), self.startup_timeout)
+        return session
+
+    async def _acquire(self) -> _PooledSession:
+        """준비된 세션 중 처리 중인 요청이 가장 적은 세션 (없으면 startup_timeout까지 대기)"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.startup_timeout
+        while True:
+            ready = [pooled for pooled in self._sessions if pooled.session is not None]
+            if ready:
+                return min(ready, key=lambda pooled: pooled.in_flight)
+            if self._sessions and all(pooled.start_failed for pooled in self._sessions):
+                raise ConnectionError(f"MCP server '{self.name}' failed to start")
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TimeoutError(f"MCP server '{self.name}' has no ready session")
+            waiters = [asyncio.ensure_future(pooled.ready.wait()) for pooled in self._sessions]
+            try:
+                await asyncio.wait(waiters, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+
+    async def _request(self, operation: Callable[[ClientSession], Awaitable]) -> Any:
+        """세션 풀로 요청 전송
+
+        유휴 상태에서 서버가 종료된 세션은 요청을 보내야 알 수 있으므로, 연결 오류가 나면
+        그 세션을 다시 시작하고 다른(또는 새로 연) 세션으로 한 번 더 보냅니다. 시간 초과된
+        세션은 응답 없이 멈춘 것으로 보고 다시 시작합니다.
+        """
+        async with self._capacity:
+            for attempt in range(2):
+                pooled = await self._acquire()
+                pooled.in_flight += 1
+                try:
+                    return await asyncio.wait_for(operation(pooled.session), self.timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"MCP server '{self.name}' session {pooled.index} timed out, restarting")
+                    self._discard(pooled)
+                    raise TimeoutError(f"MCP server '{self.name}' timed out after {self.timeout}s")
+                except Exception as e:
+                    if not _is_connection_error(e):
+                        raise
+                    logger.warning(f"MCP server '{self.name}' session {pooled.index} lost: {e!r}, restarting")
+                    self._discard(pooled)
+                    if attempt:
+                        raise ConnectionError(f"MCP server '{self.name}' connection lost")
+                finally:
+                    pooled.in_flight -= 1
+
+    @staticmethod
+    def _discard(pooled: _PooledSession):
+        """세션을 다시 시작 (같은 세션을 기다리던 다른 요청이 다시 고르지 않도록 바로 제외)"""
+        if pooled.session is not None:
+            pooled.session = None
+            pooled.restart()
+
+    async def _run(self, operation: Callable[[ClientSession], Awaitable]) -> Any:
+        """요청 루프에서 호출: 백그라운드 루프의 세션 풀로 요청을 보내고 결과를 기다림"""
+        self.start()
+        return await _loop_thread.run(self._request(operation))
+
+    def close(self):
+        """모든 세션 종료 (서버 프로세스 정리)"""
+        if not self._started:
+            return
+
+        async def stop_all():
+            for pooled in self._sessions:
+                pooled.stop()
+
+        try:
+            _loop_thread.submit(stop_all()).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"MCP server '{self.name}' close error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'transport': self.transport,
+            'started': self._started,
+            'sessions': [
+                {'index': p.index, 'ready': p.session is not None, 'in_flight': p.in_flight, 'restarts': p.restarts}
+                for p in self._sessions
+            ],
+        }
+
+    # --- MCPProvider ---
+
+    async def _get_registry(self) -> ToolRegistry:
+        registry = self._registry
+        if registry is None:
+            self.start()
+            registry = await _loop_thread.run(self._load_registry())
+        return registry
+
+    async def _load_registry(self) -> ToolRegistry:
+        """서버의 도구 목록으로 레지스트리 구성 (백그라운드 루프에서 실행)"""
+        async with self._registry_lock:
+            if self._registry is not None:
+                return self._registry
+            result = await self._request(lambda session: session.list_tools())
+            tools = []
+            for tool in result.tools:
+                # JSON Schema 기본값대로 서버가 금지하지 않은 추가 인자는 허용
+                schema = {"additionalProperties": True,
+                          **(_field(tool, 'input_schema', 'inputSchema') or {"type": "object"})}
+                try:
+                    tools.append(MCPTool(
+                        name=tool.name,
+                        description=tool.description or "",
+                        parameters=schema,
+                        required=list(schema.get("required", [])),
+                        handler=partial(self._call_remote_tool, tool.name),
+                    ))
+                except SchemaError as e:
+                    logger.warning(f"MCP server '{self.name}' tool '{tool.name}' skipped: invalid schema ({e.message})")
+            registry = self._registry = ToolRegistry(tools)
+            return registry
+
+    async def _call_remote_tool(self, tool_name: str, **arguments) -> Any:
+        result = await self._run(lambda session: session.call_tool(tool_name, arguments))
+        return _tool_result(result)
+
+    async def get_tools(self) -> List[MCPTool]:
+        return (await self._get_registry()).tools
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        try:
+            registry = await self._get_registry()
+        except Exception as e:
+            logger.error(f"MCP server '{self.name}' tool list error: {e}")
+            return {"error": f"MCP server '{self.name}' unavailable: {e}"}
+        return await registry.dispatch(name, arguments)
+
+    async def get_resources(self) -> List[MCPResource]:
+        result = await self._run(lambda session: session.list_resources())
+        return [
+            MCPResource(
+                uri=str(resource.uri),
+                name=resource.name,
+                description=resource.description or "",
+                mime_type=_field(resource, 'mime_type', 'mimeType') or "text/plain",
+            )
+            for resource in result.resources
+        ]
+
+    async def read_resource(self, uri: str) -> str:
+        try:
+            result = await self._run(lambda session: session.read_resource(uri))
+        except Exception as e:
+            logger.error(f"MCP server '{self.name}' resource read error ({uri}): {e}")
+            return json.dumps({"error": str(e)})
+        return "\n".join(getattr(content, 'text', '') for content in result.contents)
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.1 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIUsageRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(db_index=True, max_length=100)),
+                ('endpoint', models.CharField(max_length=50)),
+                ('node', models.CharField(blank=True, default='', max_length=50)),
+                ('model', models.CharField(blank=True, default='', max_length=100)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('completion_tokens', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['subject', 'created_at'], name='ai_usage_subject_created_idx')],
+            },
+        ),
+    ]
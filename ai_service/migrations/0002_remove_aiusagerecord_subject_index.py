@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_service', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='aiusagerecord',
+            name='subject',
+            field=models.CharField(max_length=100),
+        ),
+    ]
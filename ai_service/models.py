@@ -1,3 +1,20 @@
 from django.db import models
 
-# Create your models here.
+
+class AIUsageRecord(models.Model):
+    """LLM 토큰 사용량 기록 (사용자/IP, 엔드포인트, 그래프 노드 단위)"""
+    subject = models.CharField(max_length=100)  # "user:<id>" 또는 "ip:<addr>"
+    endpoint = models.CharField(max_length=50)
+    node = models.CharField(max_length=50, blank=True, default='')
+    model = models.CharField(max_length=100, blank=True, default='')
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['subject', 'created_at'], name='ai_usage_subject_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} {self.endpoint}/{self.node} ({self.prompt_tokens}+{self.completion_tokens})"
@@ -10,18 +10,25 @@ from decimal import Decimal
 
 from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage, AIMessage
+from langchain_core.messages import ToolMessage
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode
+from django.conf import settings
 
 # RAG 시스템과 MCP 클라이언트 가져오기
-# from .rag_system import PartyPlanningRAG
+from .rag_system import get_rag
 from .mcp_integration import mcp_client
+from .budget_scenarios import estimate_party_cost
+from .usage import usage_callback
+from .tracing import tracer, tracing_callback
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 요청에 장소가 없을 때 도구 조회에 사용할 기본 지역
+DEFAULT_LOCATION = '서울'
+
 class PartyPlanState(TypedDict):
     """파티 플래닝 상태 정의"""
     # 입력 정보
@@ -57,11 +64,11 @@ class PartyPlanningAgent:
         self.llm = ChatOpenAI(
             model="gpt-4o-mini",
             temperature=0.7,
-            max_tokens=2000
+            max_tokens=2000,
+            callbacks=[usage_callback, tracing_callback]
         )
         
-        # RAG 시스템 초기화 (임시로 주석 처리)
-        # self.rag = PartyPlanningRAG()
+        # RAG 시스템은 프로세스당 하나를 백그라운드에서 초기화해 공유 (get_rag)
         
         # MCP 클라이언트 초기화
         self.mcp_client = mcp_client
@@ -74,13 +81,13 @@ class PartyPlanningAgent:
         graph_builder = StateGraph(PartyPlanState)
         
         # 노드 정의
-        graph_builder.add_node("analyze_requirements", self._analyze_requirements)
-        graph_builder.add_node("search_knowledge", self._search_knowledge)
-        graph_builder.add_node("generate_plan", self._generate_plan)
-        graph_builder.add_node("create_tasks", self._create_tasks)
-        graph_builder.add_node("estimate_costs", self._estimate_costs)
-        graph_builder.add_node("create_timeline", self._create_timeline)
-        graph_builder.add_node("finalize_plan", self._finalize_plan)
+        graph_builder.add_node("analyze_requirements", self._traced_node("analyze_requirements", self._analyze_requirements))
+        graph_builder.add_node("search_knowledge", self._traced_node("search_knowledge", self._search_knowledge))
+        graph_builder.add_node("generate_plan", self._traced_node("generate_plan", self._generate_plan))
+        graph_builder.add_node("create_tasks", self._traced_node("create_tasks", self._create_tasks))
+        graph_builder.add_node("estimate_costs", self._traced_node("estimate_costs", self._estimate_costs))
+        graph_builder.add_node("create_timeline", self._traced_node("create_timeline", self._create_timeline))
+        graph_builder.add_node("finalize_plan", self._traced_node("finalize_plan", self._finalize_plan))
         
         # 워크플로우 정의
         graph_builder.set_entry_point("analyze_requirements")
@@ -96,6 +103,10 @@ class PartyPlanningAgent:
         
         return graph_builder.compile()
     
+    def _traced_node(self, name: str, node):
+        """그래프 노드 실행을 trace span으로 감싸기"""
+        return tracer.traced(f"graph.node.{name}")(node)
+    
     async def _analyze_requirements(self, state: PartyPlanState) -> PartyPlanState:
         """요구사항 분석 노드"""
         logger.info("요구사항 분석 시작")
@@ -159,57 +170,17 @@ class PartyPlanningAgent:
         logger.info("관련 지식 검색 시작")
         
         party_type = state['party_type']
-        guest_count = state['guest_count']
-        budget = state.get('budget')
-        location = state.get('location', '서울')
         
-        # MCP를 통한 실시간 정보 수집
-        try:
-            # 장소 검색
-            venue_result = await self.mcp_client.call_tool(
-                "party_planning", 
-                "search_venues",
-                {
-                    "location": location,
-                    "capacity": guest_count,
-                    "budget_max": float(budget) if budget else None
-                }
-            )
-            
-            # 케이터링 옵션 검색
-            catering_result = await self.mcp_client.call_tool(
-                "party_planning",
-                "get_catering_options", 
-                {
-                    "guest_count": guest_count,
-                    "budget_per_person": float(budget) / guest_count if budget else None,
-                    "dietary_restrictions": state.get('dietary_restrictions', [])
-                }
-            )
-            
-            # 예산 계산
-            budget_result = await self.mcp_client.call_tool(
-                "party_planning",
-                "calculate_budget",
-                {
-                    "party_type": party_type,
-                    "guest_count": guest_count
-                }
-            )
-            
-            # 검색 결과를 컨텍스트로 구성
-            context_info = f"""
-            == MCP 도구를 통한 실시간 정보 ==
-            
-            추천 장소:
-            {json.dumps(venue_result, ensure_ascii=False, indent=2)}
-            
-            케이터링 옵션:
-            {json.dumps(catering_result, ensure_ascii=False, indent=2)}
-            
-            예산 계산:
-            {json.dumps(budget_result, ensure_ascii=False, indent=2)}
+        # RAG 지식 검색 (아직 준비되지 않았으면 기본 가이드 사용)
+        knowledge_context = await self._retrieve_knowledge(state)
+        if knowledge_context:
+            guide_section = f"""
+            == 지식 베이스 검색 결과 ==
             
+            {knowledge_context}
+            """
+        else:
+            guide_section = f"""
             == 기본 파티 플래닝 가이드 ==
             
             {party_type} 파티 추천사항:
@@ -224,11 +195,29 @@ class PartyPlanningAgent:
             - 30-50명: 호텔 연회장, 커뮤니티 센터
             - 50명 이상: 대형 연회장, 야외 공간
             """
+        
+        # MCP를 통한 실시간 정보 수집
+        try:
+            tool_context = None
+            if getattr(settings, 'AGENT_TOOL_MODE', 'fixed') == 'agentic':
+                try:
+                    tool_context = await self._collect_tool_context_agentic(state)
+                except Exception as e:
+                    logger.warning(f"에이전트 도구 호출 실패: {e}, 고정 도구 호출을 사용합니다.")
+            if tool_context is None:
+                tool_context = await self._collect_tool_context(state)
+            
+            # 검색 결과를 컨텍스트로 구성
+            context_info = f"""
+            == MCP 도구를 통한 실시간 정보 ==
+            
+            {tool_context}
+            {guide_section}"""
             
         except Exception as e:
             logger.warning(f"MCP 도구 호출 실패: {e}, 기본 정보를 사용합니다.")
-            # MCP 실패 시 기본 컨텍스트 사용
-            context_info = f"""
+            # MCP 실패 시 지식 베이스 검색 결과 또는 기본 컨텍스트 사용
+            context_info = guide_section if knowledge_context else f"""
             == 파티 플래닝 가이드 ==
             
             {party_type} 파티 추천사항:
@@ -256,6 +245,188 @@ class PartyPlanningAgent:
         logger.info("관련 지식 검색 완료")
         return state
     
+    @staticmethod
+    def _tool_location(state: PartyPlanState) -> str:
+        """도구 조회에 사용할 지역 (location 키는 항상 있고 값이 None일 수 있으므로 or로 보정)"""
+        return state.get('location') or DEFAULT_LOCATION
+    
+    async def _collect_tool_context(self, state: PartyPlanState) -> str:
+        """고정된 세 가지 MCP 도구(장소, 케이터링, 예산)를 호출해 컨텍스트 구성"""
+        party_type = state['party_type']
+        guest_count = state['guest_count']
+        budget = state.get('budget')
+        location = self._tool_location(state)
+        
+        # 장소 검색
+        venue_result = await self.mcp_client.call_tool(
+            "party_planning", 
+            "search_venues",
+            {
+                "location": location,
+                "capacity": guest_count,
+                "budget_max": float(budget) if budget else None
+            }
+        )
+        
+        # 케이터링 옵션 검색
+        catering_result = await self.mcp_client.call_tool(
+            "party_planning",
+            "get_catering_options", 
+            {
+                "guest_count": guest_count,
+                "budget_per_person": float(budget) / guest_count if budget else None,
+                "dietary_restrictions": state.get('dietary_restrictions', [])
+            }
+        )
+        
+        # 예산 계산
+        budget_result = await self.mcp_client.call_tool(
+            "party_planning",
+            "calculate_budget",
+            {
+                "party_type": party_type,
+                "guest_count": guest_count
+            }
+        )
+        
+        return f"""
+            추천 장소:
+            {json.dumps(venue_result, ensure_ascii=False, indent=2)}
+            
+            케이터링 옵션:
+            {json.dumps(catering_result, ensure_ascii=False, indent=2)}
+            
+            예산 계산:
+            {json.dumps(budget_result, ensure_ascii=False, indent=2)}"""
+    
+    async def _tool_specs(self) -> Dict[str, tuple]:
+        """MCP 도구 스키마를 LLM 함수 호출 형식으로 변환 ({함수 이름: (스펙, (프로바이더, 도구))})"""
+        specs = {}
+        for provider_name, tools in (await self.mcp_client.get_all_tools()).items():
+            for tool in tools:
+                # 프로바이더가 여러 개여도 이름이 겹치지 않도록 접두사를 붙임
+                function_name = f"{provider_name}__{tool.name}"
+                specs[function_name] = ({
+                    "type": "function",
+                    "function": {
+                        "name": function_name,
+                        "description": tool.description,
+                        "parameters": {**tool.parameters, "required": list(tool.required)},
+                    },
+                }, (provider_name, tool.name))
+        return specs
+    
+    async def _run_tool_call(self, call: Dict, specs: Dict[str, tuple]) -> tuple:
+        """LLM이 요청한 도구 호출 하나를 실행 (실패해도 예외 대신 오류 결과를 반환)"""
+        entry = specs.get(call['name'])
+        if entry is None:
+            return call, {"error": f"Unknown tool: {call['name']}"}
+        provider_name, tool_name = entry[1]
+        try:
+            result = await self.mcp_client.call_tool(provider_name, tool_name, call.get('args') or {})
+        except Exception as e:
+            result = {"error": str(e)}
+        return call, result
+    
+    async def _collect_tool_context_agentic(self, state: PartyPlanState) -> Optional[str]:
+        """LLM이 필요한 MCP 도구를 직접 골라 호출하는 루프
+        
+        한 턴에 요청된 여러 도구 호출은 동시에 실행하고, 반복 횟수와 누적 토큰 수로
+        비용을 제한합니다. 도구를 하나도 호출하지 않았거나 반복 횟수가 0 이하로 설정되어
+        있으면 None을 반환합니다(고정 도구 호출로 대체).
+        """
+        max_iterations = getattr(settings, 'AGENT_TOOL_MAX_ITERATIONS', 4)
+        token_budget = getattr(settings, 'AGENT_TOOL_TOKEN_BUDGET', 6000)
+        max_calls = getattr(settings, 'AGENT_TOOL_MAX_CALLS_PER_TURN', 6)
+        max_chars = getattr(settings, 'AGENT_TOOL_RESULT_MAX_CHARS', 4000)
+        if max_iterations <= 0:
+            # 루프가 한 번도 돌지 않으면 반복 횟수를 기록할 수 없으므로 바로 고정 호출로 대체
+            return None
+        
+        specs = await self._tool_specs()
+        if not specs:
+            return None
+        llm = self.llm.bind_tools([spec for spec, _ in specs.values()])
+        
+        budget = state.get('budget')
+        system_message = (
+            "당신은 파티 플래닝을 위한 정보 수집 담당자입니다. 제공된 도구로 계획에 필요한 "
+            "장소, 케이터링, 예산, 날씨, 일정 정보를 조회하세요. 서로 독립적인 조회는 한 번에 "
+            "여러 도구를 동시에 호출하고, 충분한 정보를 모았으면 도구 호출 없이 '완료'라고만 답하세요."
+        )
+        user_message = (
+            f"파티 종류: {state['party_type']}\n"
+            f"예산: {f'{budget:,}원' if budget else '미정'}\n"
+            f"참석자 수: {state['guest_count']}명\n"
+            f"날짜: {state['date'].strftime('%Y-%m-%d')}\n"
+            f"장소: {self._tool_location(state)}\n"
+            f"식단 제한: {', '.join(state.get('dietary_restrictions') or []) or '없음'}\n\n"
+            f"요구사항 분석:\n{state['messages'][-1].content if state.get('messages') else ''}"
+        )
+        messages = [SystemMessage(content=system_message), HumanMessage(content=user_message)]
+        
+        collected = []
+        used_tokens = 0
+        with tracer.span("agent.tool_loop", **{'agent.max_iterations': max_iterations,
+                                               'agent.token_budget': token_budget}) as span:
+            for iteration in range(max_iterations):
+                response = await llm.ainvoke(messages)
+                used_tokens += (getattr(response, 'usage_metadata', None) or {}).get('total_tokens', 0)
+                messages.append(response)
+                if not response.tool_calls:
+                    break
+                
+                calls = response.tool_calls[:max_calls]
+                results = await asyncio.gather(*(self._run_tool_call(call, specs) for call in calls))
+                for call, result in results:
+                    content = json.dumps(result, ensure_ascii=False, default=str)
+                    if len(content) > max_chars:
+                        content = content[:max_chars] + '...(생략)'
+                    messages.append(ToolMessage(content=content, tool_call_id=call['id']))
+                    collected.append((call, content))
+                # 한도를 넘어 실행하지 않은 호출에도 응답 메시지가 있어야 다음 턴 요청이 유효함
+                for call in response.tool_calls[max_calls:]:
+                    messages.append(ToolMessage(content='{"error": "Tool call limit per turn exceeded"}',
+                                                tool_call_id=call['id']))
+                
+                if used_tokens >= token_budget:
+                    logger.info(f"도구 호출 토큰 예산 소진: {used_tokens}/{token_budget}")
+                    break
+            
+            if span is not None:
+                span.set_attribute('agent.iterations', iteration + 1)
+                span.set_attribute('agent.tool_calls', len(collected))
+                span.set_attribute('agent.tokens', used_tokens)
+        
+        if not collected:
+            return None
+        return "\n".join(
+            f"""
+            {call['name']} {json.dumps(call.get('args') or {}, ensure_ascii=False)}:
+            {content}
+            """
+            for call, content in collected
+        )
+    
+    async def _retrieve_knowledge(self, state: PartyPlanState) -> str:
+        """RAG 지식 베이스 검색 (준비 전이거나 실패하면 빈 문자열)"""
+        rag = get_rag()
+        if rag is None:
+            logger.info("RAG 시스템 초기화 중이므로 기본 가이드를 사용합니다.")
+            return ""
+        
+        try:
+            with tracer.span("rag.contextual_search"):
+                return await asyncio.to_thread(rag.get_contextual_information, {
+                    'party_type': state['party_type'],
+                    'budget': state.get('budget'),
+                    'guest_count': state['guest_count'],
+                    'special_requirements': state.get('special_requirements'),
+                })
+        except Exception as e:
+            logger.warning(f"RAG 검색 실패: {e}, 기본 가이드를 사용합니다.")
+            return ""
+    
     async def _generate_plan(self, state: PartyPlanState) -> PartyPlanState:
         """전체 계획 생성 노드"""
         logger.info("파티 계획 생성 시작")
@@ -409,29 +580,8 @@ class PartyPlanningAgent:
         guest_count = state['guest_count']
         party_type = state['party_type']
         
-        # 기본 비용 추정 로직
-        base_cost_per_person = {
-            '생일파티': 25000,
-            '결혼기념일': 60000,
-            '회사파티': 45000,
-            '졸업파티': 20000,
-            '기타': 30000
-        }
-        
-        per_person_cost = base_cost_per_person.get(party_type, 30000)
-        base_cost = per_person_cost * guest_count
-        
-        # 장소비 추가 (인원수에 따라)
-        if guest_count <= 10:
-            venue_cost = 100000
-        elif guest_count <= 30:
-            venue_cost = 300000
-        elif guest_count <= 50:
-            venue_cost = 500000
-        else:
-            venue_cost = 1000000
-        
-        total_estimated_cost = base_cost + venue_cost
+        # 기본 비용 추정 로직 (1인당 기본 비용 + 인원 구간별 장소비)
+        total_estimated_cost = estimate_party_cost(party_type, guest_count)
         
         # 사용자 예산과 비교
         user_budget = state.get('budget')
@@ -578,7 +728,9 @@ class PartyPlanningAgent:
             )
             
             # LangGraph 실행
-            result = await self.graph.ainvoke(initial_state)
+            with tracer.span("graph.party_plan", **{'party.type': party_request['party_type'],
+                                                     'party.guest_count': party_request['guest_count']}):
+                result = await self.graph.ainvoke(initial_state)
             
             # 결과 포맷팅
             return {
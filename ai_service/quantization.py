@@ -0,0 +1,106 @@
+# ai_service/quantization.py
+
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# 양자화 점수 계산 시 한 번에 float32로 변환하는 블록 크기 (CPU 캐시에 들어가는 크기)
+SCAN_BLOCK_BYTES = 1 << 20
+# 양자화 파일 생성 시 한 번에 처리하는 행 수
+SCAN_BLOCK_ROWS = 8192
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """벡터별 대칭 int8 양자화
+
+    각 벡터를 max|v| / 127 배율로 나눠 반올림합니다. 복원은 codes * scale 입니다.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def int8_scores(codes: np.ndarray, scales: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """양자화된 벡터와 질의의 근사 내적
+
+    float32 변환은 캐시에 들어가는 블록 단위로 하므로 임시 메모리가 작고 메모리 대역폭은
+    int8 읽기만큼만 사용합니다.
+    """
+    block_rows = max(64, SCAN_BLOCK_BYTES // (4 * max(1, codes.shape[1])))
+    scores = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), block_rows):
+        block = codes[start:start + block_rows]
+        scores[start:start + len(block)] = (block.astype(np.float32) @ query) * scales[start:start + len(block)]
+    return scores
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """점수 상위 k개 행 번호 (점수 내림차순)"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def search_int8(codes: np.ndarray, scales: np.ndarray, vectors: np.ndarray, query: np.ndarray,
+                top_k: int, rescore_factor: int = 4,
+                mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """int8 근사 검색 후 상위 후보만 float32 벡터로 다시 채점
+
+    mask가 주어지면 True인 행(삭제되지 않았고 대상 컬렉션에 속한 행)만 후보로 씁니다.
+
+    Returns:
+        (행 번호, 정확한 점수) - 점수 내림차순
+    """
+    approx = int8_scores(codes, scales, query)
+    shortlist = top_k * rescore_factor
+    if mask is not None:
+        approx[~mask] = -np.inf
+        shortlist = min(shortlist, int(mask.sum()))
+        top_k = min(top_k, shortlist)
+    candidates = np.sort(top_k_indices(approx, shortlist))
+    exact = np.asarray(vectors[candidates], dtype=np.float32) @ query
+    order = top_k_indices(exact, top_k)
+    return candidates[order], exact[order]
+
+
+def measure_recall(vectors: np.ndarray, queries: np.ndarray, top_k: int = 10,
+                   rescore_factor: int = 4) -> Dict[str, float]:
+    """float32 전수 검색 대비 int8 검색의 recall@k, 지연 시간, 메모리 비교
+
+    vectors, queries는 정규화된 float32 배열이어야 합니다.
+    """
+    codes, scales = quantize_int8(vectors)
+
+    exact_time = quantized_time = 0.0
+    quantized_only_hits = rescored_hits = 0
+    for query in queries:
+        started = time.perf_counter()
+        expected = set(top_k_indices(vectors @ query, top_k).tolist())
+        exact_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        rows, _ = search_int8(codes, scales, vectors, query, top_k, rescore_factor)
+        quantized_time += time.perf_counter() - started
+
+        rescored_hits += len(expected & set(rows.tolist()))
+        quantized_only_hits += len(expected & set(top_k_indices(int8_scores(codes, scales, query), top_k).tolist()))
+
+    total = max(1, len(queries) * min(top_k, len(vectors)))
+    return {
+        'vectors': len(vectors),
+        'dim': vectors.shape[1],
+        'queries': len(queries),
+        'top_k': top_k,
+        'rescore_factor': rescore_factor,
+        'recall_int8_only': quantized_only_hits / total,
+        'recall_int8_rescored': rescored_hits / total,
+        'float32_bytes': int(vectors.nbytes),
+        'int8_bytes': int(codes.nbytes + scales.nbytes),
+        'float32_ms_per_query': exact_time * 1000 / max(1, len(queries)),
+        'int8_ms_per_query': quantized_time * 1000 / max(1, len(queries)),
+    }
@@ -1,50 +1,187 @@
 # ai_service/rag_system.py
 
 import os
-import uuid
+import json
+import time
+import hashlib
+import threading
+from bisect import bisect_right
 from typing import List, Dict, Any, Optional
-from pathlib import Path
-import chromadb
-from chromadb.config import Settings
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain_community.document_loaders import TextLoader, JSONLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
+import numpy as np
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from tenacity import Retrying, stop_after_attempt, wait_random_exponential
 from django.conf import settings
 import logging
 
+from .embedding_cache import EmbeddingCache, CachedEmbeddings
+from .embeddings import create_embeddings, index_namespace
+from .vector_index import create_vector_index
+from .lexical_index import LexicalIndexHolder, reciprocal_rank_fusion
+from .text_splitting import TokenTextSplitter
+from .reranking import normalize_rows, collapse_near_duplicates, maximal_marginal_relevance
+
 logger = logging.getLogger(__name__)
 
+# 파티 아이디어 데이터
+PARTY_IDEAS = [
+    {
+        "type": "생일파티",
+        "content": "생일파티 기획: 케이크, 촛불, 생일축하 노래, 선물 교환, 게임 활동. 예산: 10-50만원",
+        "category": "birthday",
+        "budget_range": "100000-500000"
+    },
+    {
+        "type": "결혼기념일",
+        "content": "결혼기념일 파티: 로맨틱한 분위기, 꽃 장식, 기념품, 사진 촬영, 특별 메뉴. 예산: 20-100만원",
+        "category": "anniversary",
+        "budget_range": "200000-1000000"
+    },
+    {
+        "type": "회사 파티",
+        "content": "회사 파티: 팀빌딩 활동, 네트워킹, 프레젠테이션, 뷔페식 식사, 시상식. 예산: 인당 3-10만원",
+        "category": "corporate",
+        "budget_range": "30000-100000"
+    },
+    {
+        "type": "졸업파티",
+        "content": "졸업파티: 기념품 제작, 사진 부스, 축하 메시지, 동창회 연락처 교환. 예산: 5-30만원",
+        "category": "graduation",
+        "budget_range": "50000-300000"
+    }
+]
+
+# 장소 데이터
+VENUE_DATA = [
+    {
+        "name": "실내 카페/레스토랑",
+        "content": "아늑한 분위기, 음식 서비스 가능, 소규모 모임에 적합, 날씨 걱정 없음. 비용: 시간당 10-30만원",
+        "capacity": "10-50명",
+        "cost_range": "100000-300000"
+    },
+    {
+        "name": "호텔 연회장",
+        "content": "격식 있는 분위기, 풀 서비스, 대규모 행사 가능, 주차 편리. 비용: 100-500만원",
+        "capacity": "50-200명",
+        "cost_range": "1000000-5000000"
+    },
+    {
+        "name": "야외 공원",
+        "content": "자연스러운 분위기, 넓은 공간, 저렴한 비용, 날씨 의존적. 비용: 무료-10만원",
+        "capacity": "제한없음",
+        "cost_range": "0-100000"
+    }
+]
+
+# 케이터링 데이터  
+CATERING_DATA = [
+    {
+        "type": "뷔페",
+        "content": "다양한 음식 선택, 셀프 서비스, 비교적 저렴, 대규모 행사에 적합. 비용: 인당 15-40천원",
+        "cost_per_person": "15000-40000"
+    },
+    {
+        "type": "코스 요리",
+        "content": "격식 있는 서빙, 정해진 메뉴, 개인별 서빙, 고급스러운 분위기. 비용: 인당 50-150천원",
+        "cost_per_person": "50000-150000"
+    },
+    {
+        "type": "간식/디저트",
+        "content": "간단한 파티에 적합, 케이크, 쿠키, 음료수, 부담없는 분위기. 비용: 인당 5-20천원",
+        "cost_per_person": "5000-20000"
+    }
+]
+
+# 컬렉션별 기본 데이터 (내용이 바뀌면 시드 버전도 바뀌어 다시 적재됩니다)
+DEFAULT_PARTY_DATA = {
+    'party_ideas': PARTY_IDEAS,
+    'venues': VENUE_DATA,
+    'catering': CATERING_DATA,
+}
+
+SEED_DATA_VERSION = hashlib.sha256(
+    json.dumps(DEFAULT_PARTY_DATA, ensure_ascii=False, sort_keys=True).encode('utf-8')
+).hexdigest()[:16]
+
+
+def document_id(collection_type: str, content: str) -> str:
+    """컬렉션과 내용으로부터 결정되는 문서 ID (같은 내용은 항상 같은 ID)"""
+    digest = hashlib.sha256(f"{collection_type}\x00{content}".encode('utf-8')).hexdigest()
+    return digest[:32]
+
+
 class PartyPlanningRAG:
     """파티 플래닝을 위한 RAG 시스템"""
     
     def __init__(self):
-        # ChromaDB 설정
-        self.chroma_client = chromadb.PersistentClient(
-            path=os.path.join(settings.BASE_DIR, "vector_db"),
-            settings=Settings(anonymized_telemetry=False)
-        )
+        # 벡터 DB 저장 위치
+        self.persist_dir = os.path.join(settings.BASE_DIR, "vector_db")
+        os.makedirs(self.persist_dir, exist_ok=True)
         
-        # OpenAI 임베딩 모델
-        self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small"
-        )
+        # 임베딩 모델 (RAG_EMBEDDING_BACKEND 설정으로 OpenAI/로컬 선택)
+        self.embeddings, self.embedding_model = create_embeddings()
+        self.index_namespace = index_namespace(self.embedding_model)
+        
+        # 한 번 임베딩한 텍스트는 디스크 캐시에서 재사용
+        if getattr(settings, 'RAG_EMBEDDING_CACHE_ENABLED', True):
+            cache = EmbeddingCache(
+                path=getattr(settings, 'RAG_EMBEDDING_CACHE_PATH',
+                             os.path.join(self.persist_dir, "embedding_cache.sqlite3")),
+                max_entries=getattr(settings, 'RAG_EMBEDDING_CACHE_MAX_ENTRIES', 100000)
+            )
+            self.embeddings = CachedEmbeddings(self.embeddings, cache, self.embedding_model)
         
-        # 컬렉션 이름들
+        # 컬렉션 이름들 (임베딩 모델별로 분리)
         self.collections = {
-            'party_ideas': 'party_planning_ideas',
-            'venues': 'party_venues',
-            'catering': 'catering_options',
-            'decorations': 'decoration_ideas',
-            'activities': 'party_activities'
+            'party_ideas': f'party_planning_ideas_{self.index_namespace}',
+            'venues': f'party_venues_{self.index_namespace}',
+            'catering': f'catering_options_{self.index_namespace}',
+            'decorations': f'decoration_ideas_{self.index_namespace}',
+            'activities': f'party_activities_{self.index_namespace}'
         }
         
-        # 텍스트 분할기
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
+        # 임베딩 배치 설정
+        self.embed_batch_size = getattr(settings, 'RAG_EMBED_BATCH_SIZE', 64)
+        self.embed_concurrency = getattr(settings, 'RAG_EMBED_CONCURRENCY', 4)
+        self.embed_max_retries = getattr(settings, 'RAG_EMBED_MAX_RETRIES', 3)
+        
+        # 벡터 인덱스 (RAG_VECTOR_BACKEND: 'chroma' 또는 'numpy')
+        # chroma의 인덱스 구성 ('unified': collection_type 메타데이터로 구분하는 단일 컬렉션,
+        #                     'per_collection': 종류별 컬렉션)
+        self.vector_backend = getattr(settings, 'RAG_VECTOR_BACKEND', 'chroma')
+        self.index_mode = getattr(settings, 'RAG_INDEX_MODE', 'unified')
+        self.index = create_vector_index(
+            persist_dir=self.persist_dir,
+            namespace=self.index_namespace,
+            collections=self.collections,
+            unified_collection=f'party_knowledge_{self.index_namespace}',
+        )
+        
+        # 검색 방식 ('hybrid': BM25 + 벡터 RRF 결합, 'vector', 'lexical')
+        self.search_mode = getattr(settings, 'RAG_SEARCH_MODE', 'hybrid')
+        self.rrf_k = getattr(settings, 'RAG_RRF_K', 60)
+        # 검색 결과 다양화 (MMR 가중치, 거의 같은 문서로 볼 코사인 유사도)
+        self.mmr_lambda = getattr(settings, 'RAG_MMR_LAMBDA', 0.5)
+        self.dedupe_threshold = getattr(settings, 'RAG_DEDUPE_THRESHOLD', 0.95)
+        # 인덱스가 바뀔 때마다 갱신되는 파일 (다른 워커의 BM25 색인 재생성 신호)
+        self.generation_path = os.path.join(self.persist_dir, f"generation_{self.index_namespace}")
+        self.lexical_index = LexicalIndexHolder(self.index.iter_documents)
+        
+        # 문맥 검색 결과 캐시 (LRU + TTL, 인덱스 세대가 바뀌면 무효)
+        self._context_cache = TTLCache(
+            maxsize=getattr(settings, 'RAG_CONTEXT_CACHE_SIZE', 256),
+            ttl=getattr(settings, 'RAG_CONTEXT_CACHE_TTL', 600)
+        )
+        self._context_cache_lock = threading.Lock()
+        
+        # 기본 데이터 적재 여부를 기록하는 파일
+        self.seed_marker_path = os.path.join(self.persist_dir, "seed_version.json")
+        self._seed_marker_key = f"{self.index_namespace}/{self.vector_backend}/{self.index_mode}"
+        
+        # 텍스트 분할기 (토큰 수 기준)
+        self.text_splitter = TokenTextSplitter(
+            chunk_tokens=getattr(settings, 'RAG_CHUNK_TOKENS', 500),
+            overlap_tokens=getattr(settings, 'RAG_CHUNK_OVERLAP_TOKENS', 50),
         )
         
         # 벡터 스토어 초기화
@@ -55,164 +192,330 @@ class PartyPlanningRAG:
         try:
             # 기본 파티 플래닝 데이터 추가
             self._add_default_party_data()
+            self._refresh_lexical_index()
             logger.info("RAG 시스템이 성공적으로 초기화되었습니다.")
         except Exception as e:
             logger.error(f"RAG 시스템 초기화 오류: {e}")
     
     def _add_default_party_data(self):
-        """기본 파티 플래닝 데이터 추가"""
-        # 파티 아이디어 데이터
-        party_ideas = [
-            {
-                "type": "생일파티",
-                "content": "생일파티 기획: 케이크, 촛불, 생일축하 노래, 선물 교환, 게임 활동. 예산: 10-50만원",
-                "category": "birthday",
-                "budget_range": "100000-500000"
-            },
-            {
-                "type": "결혼기념일",
-                "content": "결혼기념일 파티: 로맨틱한 분위기, 꽃 장식, 기념품, 사진 촬영, 특별 메뉴. 예산: 20-100만원",
-                "category": "anniversary",
-                "budget_range": "200000-1000000"
-            },
-            {
-                "type": "회사 파티",
-                "content": "회사 파티: 팀빌딩 활동, 네트워킹, 프레젠테이션, 뷔페식 식사, 시상식. 예산: 인당 3-10만원",
-                "category": "corporate",
-                "budget_range": "30000-100000"
-            },
-            {
-                "type": "졸업파티",
-                "content": "졸업파티: 기념품 제작, 사진 부스, 축하 메시지, 동창회 연락처 교환. 예산: 5-30만원",
-                "category": "graduation",
-                "budget_range": "50000-300000"
-            }
-        ]
-        
-        # 장소 데이터
-        venue_data = [
-            {
-                "name": "실내 카페/레스토랑",
-                "content": "아늑한 분위기, 음식 서비스 가능, 소규모 모임에 적합, 날씨 걱정 없음. 비용: 시간당 10-30만원",
-                "capacity": "10-50명",
-                "cost_range": "100000-300000"
-            },
-            {
-                "name": "호텔 연회장",
-                "content": "격식 있는 분위기, 풀 서비스, 대규모 행사 가능, 주차 편리. 비용: 100-500만원",
-                "capacity": "50-200명",
-                "cost_range": "1000000-5000000"
-            },
-            {
-                "name": "야외 공원",
-                "content": "자연스러운 분위기, 넓은 공간, 저렴한 비용, 날씨 의존적. 비용: 무료-10만원",
-                "capacity": "제한없음",
-                "cost_range": "0-100000"
-            }
-        ]
-        
-        # 케이터링 데이터  
-        catering_data = [
-            {
-                "type": "뷔페",
-                "content": "다양한 음식 선택, 셀프 서비스, 비교적 저렴, 대규모 행사에 적합. 비용: 인당 15-40천원",
-                "cost_per_person": "15000-40000"
-            },
-            {
-                "type": "코스 요리",
-                "content": "격식 있는 서빙, 정해진 메뉴, 개인별 서빙, 고급스러운 분위기. 비용: 인당 50-150천원",
-                "cost_per_person": "50000-150000"
-            },
-            {
-                "type": "간식/디저트",
-                "content": "간단한 파티에 적합, 케이크, 쿠키, 음료수, 부담없는 분위기. 비용: 인당 5-20천원",
-                "cost_per_person": "5000-20000"
-            }
-        ]
+        """기본 파티 플래닝 데이터 추가 (시드 버전이 같으면 아무 작업도 하지 않음)"""
+        if self._read_seed_version() == SEED_DATA_VERSION:
+            logger.info("기본 데이터가 최신 상태이므로 시드 적재를 건너뜁니다.")
+            return
         
         # 각 컬렉션에 데이터 추가
-        self._add_documents_to_collection('party_ideas', party_ideas)
-        self._add_documents_to_collection('venues', venue_data)
-        self._add_documents_to_collection('catering', catering_data)
+        succeeded = True
+        for collection_type, documents in DEFAULT_PARTY_DATA.items():
+            succeeded &= self._add_documents_to_collection(collection_type, documents)
+            self._remove_legacy_duplicates(collection_type, documents)
+        
+        # 일부라도 실패하면 다음 시작 때 다시 시도
+        if succeeded:
+            self._write_seed_version(SEED_DATA_VERSION)
     
-    def _add_documents_to_collection(self, collection_type: str, documents: List[Dict]):
-        """특정 컬렉션에 문서 추가"""
+    def _read_seed_markers(self) -> Dict[str, str]:
         try:
-            collection_name = self.collections[collection_type]
-            
-            # ChromaDB 컬렉션 생성 또는 가져오기
-            try:
-                collection = self.chroma_client.get_collection(collection_name)
-            except:
-                collection = self.chroma_client.create_collection(collection_name)
+            with open(self.seed_marker_path, encoding='utf-8') as f:
+                return json.load(f).get('versions', {})
+        except (OSError, ValueError, AttributeError):
+            return {}
+    
+    def _read_seed_version(self) -> Optional[str]:
+        """현재 임베딩 모델/인덱스 구성에 적재된 시드 버전"""
+        return self._read_seed_markers().get(self._seed_marker_key)
+    
+    def _write_seed_version(self, version: str):
+        versions = self._read_seed_markers()
+        versions[self._seed_marker_key] = version
+        tmp_path = f"{self.seed_marker_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'versions': versions}, f)
+        os.replace(tmp_path, self.seed_marker_path)
+    
+    def _add_documents_to_collection(self, collection_type: str, documents: List[Dict]) -> bool:
+        """특정 컬렉션에 문서 추가 (실패 시 로그만 남기고 False 반환)"""
+        try:
+            self.ingest_documents(collection_type, documents)
+            return True
+        except Exception as e:
+            logger.error(f"문서 추가 오류 ({collection_type}): {e}")
+            return False
+    
+    def ingest_documents(self, collection_type: str, documents: List[Dict]) -> Dict[str, int]:
+        """문서 일괄 적재
+        
+        내용 해시 ID로 upsert 하며, 이미 저장된 문서는 임베딩하지 않습니다.
+        문서에 'id'가 있으면 그 ID를 사용하고, 저장된 본문과 내용이 다를 때만 다시 임베딩합니다.
+        새 문서는 embed_batch_size 단위로 묶어 embed_concurrency 개까지 병렬로 임베딩하고,
+        배치마다 한 번의 upsert로 저장합니다.
+        """
+        # 내용 해시 ID로 중복 제거
+        pending = {}
+        explicit_ids = set()
+        for doc in documents:
+            content = doc.get('content', '')
+            metadata = {k: v for k, v in doc.items() if k not in ('content', 'id')}
+            if doc.get('id'):
+                doc_id = str(doc['id'])
+                explicit_ids.add(doc_id)
+            else:
+                doc_id = document_id(collection_type, content)
+            pending[doc_id] = (content, metadata)
+        if not pending:
+            return {'received': len(documents), 'embedded': 0, 'updated': 0}
+        
+        # 이미 저장된 문서는 메타데이터만 갱신 (지정 ID 문서는 본문이 그대로일 때만)
+        existing_ids = self.index.existing_ids(collection_type, list(pending))
+        stored_explicit = [doc_id for doc_id in pending if doc_id in explicit_ids and doc_id in existing_ids]
+        if stored_explicit:
+            stored = self.index.get_contents(collection_type, stored_explicit)
+            existing_ids -= {doc_id for doc_id in stored_explicit if stored.get(doc_id) != pending[doc_id][0]}
+        update_ids = [doc_id for doc_id in pending if doc_id in existing_ids and pending[doc_id][1]]
+        if update_ids:
+            self.index.update_metadata(collection_type, update_ids, [pending[doc_id][1] for doc_id in update_ids])
+        
+        new_ids = [doc_id for doc_id in pending if doc_id not in existing_ids]
+        
+        # 병렬 임베딩 한 번에 처리할 만큼씩 나눠서 메모리 사용량 제한
+        group_size = self.embed_batch_size * self.embed_concurrency
+        for start in range(0, len(new_ids), group_size):
+            group_ids = new_ids[start:start + group_size]
+            embeddings = self._embed_texts([pending[doc_id][0] for doc_id in group_ids])
             
-            # 문서들을 벡터화하여 저장
+            for batch_start in range(0, len(group_ids), self.embed_batch_size):
+                batch_ids = group_ids[batch_start:batch_start + self.embed_batch_size]
+                self.index.upsert(
+                    collection_type,
+                    ids=batch_ids,
+                    embeddings=embeddings[batch_start:batch_start + self.embed_batch_size],
+                    documents=[pending[doc_id][0] for doc_id in batch_ids],
+                    metadatas=[pending[doc_id][1] for doc_id in batch_ids]
+                )
+        
+        if new_ids or update_ids:
+            self._bump_generation()
+        return {'received': len(documents), 'embedded': len(new_ids), 'updated': len(update_ids)}
+    
+    def delete_documents(self, collection_type: str, ids: Optional[List[str]] = None,
+                         where: Optional[Dict] = None) -> int:
+        """ID 목록 또는 메타데이터 조건으로 문서 삭제 (삭제 대상 수 반환)"""
+        target_ids = list(ids or [])
+        if where:
+            target_ids.extend(self.index.find_ids(collection_type, where))
+        target_ids = list(dict.fromkeys(target_ids))
+        if not target_ids:
+            return 0
+        
+        found = self.index.existing_ids(collection_type, target_ids)
+        if found:
+            self.index.delete(collection_type, list(found))
+            self._bump_generation()
+        return len(found)
+    
+    def compact_index(self) -> Dict:
+        """중복 문서를 정리한 뒤 인덱스 공간 회수
+        
+        지정 ID 문서는 호출자가 그 ID로 관리하므로 지우지 않습니다. 같은 컬렉션에 본문과
+        메타데이터가 모두 같은 지정 ID 문서가 있을 때만 내용 해시 ID 문서를 중복으로 보고 지웁니다.
+        """
+        # (컬렉션, 본문+메타데이터 해시) → [내용 해시 ID, 지정 ID 문서 존재 여부]
+        groups: Dict[tuple, list] = {}
+        for doc in self.index.iter_documents():
+            digest = hashlib.sha256()
+            digest.update(doc['content'].encode('utf-8'))
+            digest.update(json.dumps(doc['metadata'], ensure_ascii=False, sort_keys=True).encode('utf-8'))
+            entry = groups.setdefault((doc['collection'], digest.digest()), [None, False])
+            if doc['id'] == document_id(doc['collection'], doc['content']):
+                entry[0] = doc['id']
+            else:
+                entry[1] = True
+        
+        duplicates: Dict[str, List[str]] = {}
+        for (collection_type, _), (content_id, has_explicit) in groups.items():
+            if content_id and has_explicit:
+                duplicates.setdefault(collection_type, []).append(content_id)
+        
+        removed = 0
+        for collection_type, ids in duplicates.items():
+            self.index.delete(collection_type, ids)
+            removed += len(ids)
+        if removed:
+            self._bump_generation()
+        
+        result = self.index.compact()
+        result['duplicates_removed'] = removed
+        return result
+    
+    def index_stats(self) -> Dict:
+        stats = self.index.stats()
+        stats['namespace'] = self.index_namespace
+        stats['embedding_model'] = self.embedding_model
+        return stats
+    
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """텍스트 목록을 배치로 나누어 병렬 임베딩 (입력 순서 유지)"""
+        batches = [texts[i:i + self.embed_batch_size] for i in range(0, len(texts), self.embed_batch_size)]
+        if not batches:
+            return []
+        if len(batches) == 1:
+            return self._embed_batch(batches[0])
+        
+        with ThreadPoolExecutor(max_workers=min(self.embed_concurrency, len(batches))) as executor:
+            results = list(executor.map(self._embed_batch, batches))
+        return [vector for batch in results for vector in batch]
+    
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """배치 하나를 임베딩 (일시적 오류는 지수 백오프로 재시도)"""
+        for attempt in Retrying(
+            stop=stop_after_attempt(self.embed_max_retries),
+            wait=wait_random_exponential(multiplier=0.5, max=10),
+            reraise=True,
+        ):
+            with attempt:
+                return self.embeddings.embed_documents(texts)
+    
+    def _remove_legacy_duplicates(self, collection_type: str, documents: List[Dict]):
+        """임의 ID로 중복 저장된 과거 문서 제거 (내용 해시 ID 문서만 남김)"""
+        try:
             for doc in documents:
-                doc_id = str(uuid.uuid4())
                 content = doc.get('content', '')
-                
-                # 메타데이터 준비
-                metadata = {k: v for k, v in doc.items() if k != 'content'}
-                
-                # 임베딩 생성
-                embedding = self.embeddings.embed_query(content)
-                
-                # 컬렉션에 추가
-                collection.add(
-                    ids=[doc_id],
-                    embeddings=[embedding],
-                    documents=[content],
-                    metadatas=[metadata]
-                )
-                
+                removed = self.index.remove_duplicates(collection_type, content, document_id(collection_type, content))
+                if removed:
+                    logger.info(f"중복 문서 {removed}개 제거 ({collection_type})")
+                    self._bump_generation()
         except Exception as e:
-            logger.error(f"문서 추가 오류 ({collection_type}): {e}")
+            logger.error(f"중복 문서 정리 오류 ({collection_type}): {e}")
+    
+    def _generation(self) -> tuple:
+        """인덱스 세대 (다른 프로세스의 변경도 감지)"""
+        try:
+            stat = os.stat(self.generation_path)
+            return stat.st_ino, stat.st_mtime_ns
+        except OSError:
+            return 0, 0
     
-    def search_relevant_info(self, query: str, collection_types: List[str] = None, top_k: int = 5) -> List[Dict]:
-        """관련 정보 검색"""
+    def _bump_generation(self):
+        # 매번 새 파일로 교체해 mtime 해상도가 낮아도 inode로 변경을 구분
+        tmp_path = f"{self.generation_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(str(time.time()))
+        os.replace(tmp_path, self.generation_path)
+        with self._context_cache_lock:
+            self._context_cache.clear()
+        self._refresh_lexical_index()
+    
+    def _refresh_lexical_index(self):
+        """BM25를 쓰는 검색 방식이면 현재 세대의 색인을 백그라운드에서 미리 생성"""
+        if self.search_mode in ('hybrid', 'lexical'):
+            self.lexical_index.refresh(self._generation())
+    
+    def _search_lexical(self, query: str, collection_types: List[str], top_k: int) -> List[Dict]:
+        """BM25 검색 (임베딩 호출 없음)"""
+        index = self.lexical_index.get(self._generation())
+        if index is None:
+            return []
+        results = index.search(query, collection_types, top_k)
+        for result in results:
+            result['lexical_score'] = result['score']
+        return results
+    
+    def search_relevant_info(self, query: str, collection_types: List[str] = None, top_k: int = 5,
+                             search_mode: Optional[str] = None, mmr: bool = False,
+                             mmr_lambda: Optional[float] = None,
+                             dedupe_threshold: Optional[float] = None) -> List[Dict]:
+        """관련 정보 검색
+        
+        hybrid 모드는 BM25와 벡터 검색 결과를 각각 넉넉히 가져와 RRF로 결합하며,
+        임베딩 호출이 실패하면 BM25 결과만으로 응답합니다.
+        
+        dedupe_threshold를 주면 코사인 유사도가 그 이상인 거의 같은 문서를 하나로 합치고,
+        mmr=True이면 질의 관련도와 다양성을 함께 고려해 순서를 다시 정합니다.
+        """
         if collection_types is None:
             collection_types = list(self.collections.keys())
+        search_mode = search_mode or self.search_mode
+        diversify = mmr or dedupe_threshold is not None
+        candidates = top_k * 4 if search_mode == 'hybrid' or diversify else top_k
         
-        all_results = []
+        lexical_results = []
+        if search_mode in ('hybrid', 'lexical'):
+            lexical_results = self._search_lexical(query, collection_types, candidates)
         
-        try:
-            # 쿼리 임베딩 생성
-            query_embedding = self.embeddings.embed_query(query)
-            
-            for collection_type in collection_types:
-                collection_name = self.collections[collection_type]
+        query_embedding = None
+        fused = False
+        if search_mode == 'lexical':
+            results = lexical_results
+        else:
+            try:
+                # 쿼리 임베딩 생성
+                query_embedding = self.embeddings.embed_query(query)
                 
-                try:
-                    collection = self.chroma_client.get_collection(collection_name)
-                    
-                    # 유사도 검색
-                    results = collection.query(
-                        query_embeddings=[query_embedding],
-                        n_results=top_k
-                    )
-                    
-                    # 결과 포맷팅
-                    for i, doc in enumerate(results['documents'][0]):
-                        result = {
-                            'content': doc,
-                            'metadata': results['metadatas'][0][i] if results['metadatas'][0] else {},
-                            'score': 1 - results['distances'][0][i] if results['distances'][0] else 0,
-                            'collection': collection_type
-                        }
-                        all_results.append(result)
-                        
-                except Exception as e:
-                    logger.error(f"컬렉션 검색 오류 ({collection_type}): {e}")
-                    continue
-            
-            # 점수 기준으로 정렬
-            all_results.sort(key=lambda x: x['score'], reverse=True)
-            
-            return all_results[:top_k]
-            
+                # 유사도 검색 (점수 내림차순)
+                vector_results = self.index.query(query_embedding, collection_types, candidates)
+                
+            except Exception as e:
+                logger.error(f"검색 오류: {e}")
+                if lexical_results:
+                    logger.warning("벡터 검색에 실패하여 BM25 결과만 사용합니다.")
+                results = lexical_results
+            else:
+                if search_mode == 'hybrid':
+                    for result in vector_results:
+                        result['vector_score'] = result['score']
+                    results = reciprocal_rank_fusion([vector_results, lexical_results], k=self.rrf_k)
+                    fused = True
+                else:
+                    results = vector_results
+        
+        if diversify and len(results) > 1:
+            results = self._diversify(
+                results, query_embedding, top_k, mmr,
+                self.mmr_lambda if mmr_lambda is None else mmr_lambda,
+                dedupe_threshold, fused
+            )
+        return results[:top_k]
+    
+    def _diversify(self, results: List[Dict], query_embedding: Optional[List[float]], top_k: int,
+                   mmr: bool, mmr_lambda: float, dedupe_threshold: Optional[float],
+                   fused: bool = False) -> List[Dict]:
+        """후보 문서들의 저장된 임베딩으로 중복 제거 및 MMR 재순위화
+        
+        fused=True(hybrid RRF 결과)이면 MMR 관련도로 코사인 대신 0~1로 정규화한 RRF 점수를
+        사용해 BM25 순위를 유지합니다.
+        """
+        try:
+            vectors = {}
+            by_type: Dict[str, List[str]] = {}
+            for result in results:
+                by_type.setdefault(result['collection'], []).append(result['id'])
+            for collection_type, ids in by_type.items():
+                for doc_id, vector in self.index.get_embeddings(collection_type, ids).items():
+                    vectors[(collection_type, doc_id)] = vector
         except Exception as e:
-            logger.error(f"검색 오류: {e}")
-            return []
+            logger.error(f"재순위화용 임베딩 조회 오류: {e}")
+            return results
+        
+        candidates = [result for result in results if (result['collection'], result['id']) in vectors]
+        if len(candidates) <= 1:
+            return results
+        embeddings = normalize_rows([vectors[(result['collection'], result['id'])] for result in candidates])
+        
+        selected = np.arange(len(candidates))
+        if dedupe_threshold is not None:
+            selected = collapse_near_duplicates(embeddings, dedupe_threshold)
+        if mmr and query_embedding is not None:
+            query_vector = normalize_rows(query_embedding)
+            relevance = None
+            if fused:
+                scores = np.array([candidates[i]['score'] for i in selected], dtype=np.float32)
+                spread = scores.max() - scores.min()
+                relevance = (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+            order = maximal_marginal_relevance(query_vector, embeddings[selected], top_k, mmr_lambda,
+                                               relevance=relevance)
+            selected = selected[order]
+        
+        # 임베딩을 찾지 못한 문서는 뒤에 붙임
+        return [candidates[i] for i in selected] + [r for r in results if (r['collection'], r['id']) not in vectors]
     
     def add_custom_knowledge(self, content: str, metadata: Dict, collection_type: str = 'party_ideas'):
         """사용자 정의 지식 추가"""
@@ -223,30 +526,132 @@ class PartyPlanningRAG:
             logger.error(f"사용자 정의 지식 추가 오류: {e}")
     
     def get_contextual_information(self, party_request: Dict) -> str:
-        """파티 요청에 기반한 맥락적 정보 검색"""
+        """파티 요청에 기반한 맥락적 정보 검색
+        
+        예산과 참석자 수는 구간으로 묶어 쿼리를 만들므로, 같은 구간의 요청은
+        캐시된 결과를 그대로 사용해 임베딩 호출과 벡터 검색을 건너뜁니다.
+        """
+        signature = request_signature(party_request)
+        cache_key = (self._generation(), signature)
+        with self._context_cache_lock:
+            cached = self._context_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         # 검색 쿼리 구성
+        party_type, budget_band, guest_band, special_requirements = signature
         query_parts = []
         
-        if party_request.get('party_type'):
-            query_parts.append(f"파티 종류: {party_request['party_type']}")
+        if party_type:
+            query_parts.append(f"파티 종류: {party_type}")
         
-        if party_request.get('budget'):
-            query_parts.append(f"예산: {party_request['budget']}원")
+        if budget_band:
+            query_parts.append(f"예산: {budget_band}원")
             
-        if party_request.get('guest_count'):
-            query_parts.append(f"참석자: {party_request['guest_count']}명")
+        if guest_band:
+            query_parts.append(f"참석자: {guest_band}명")
             
-        if party_request.get('special_requirements'):
-            query_parts.append(party_request['special_requirements'])
+        if special_requirements:
+            query_parts.append(special_requirements)
         
         search_query = " ".join(query_parts)
         
         # 관련 정보 검색
-        results = self.search_relevant_info(search_query, top_k=10)
+        results = self.search_relevant_info(
+            search_query, top_k=10, mmr=True, dedupe_threshold=self.dedupe_threshold
+        )
         
         # 검색 결과를 문맥 정보로 변환
         context_info = []
         for result in results:
             context_info.append(f"[{result['collection']}] {result['content']}")
         
-        return "\n\n".join(context_info)
\ No newline at end of file
+        context = "\n\n".join(context_info)
+        # 검색 실패로 빈 결과가 나온 경우는 캐시하지 않음
+        if context:
+            with self._context_cache_lock:
+                self._context_cache[cache_key] = context
+        return context
+
+
+# 문맥 검색 캐시 키에 사용하는 구간 경계
+BUDGET_BANDS = [100000, 300000, 500000, 1000000, 2000000, 5000000]
+GUEST_BANDS = [10, 20, 30, 50, 100, 200]
+
+
+def _band(value, bounds: List[int]) -> str:
+    """값이 속한 구간 ("300000-500000", "200 이상" 등)"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return ''
+    if value <= 0:
+        return ''
+    i = bisect_right(bounds, value)
+    if i == len(bounds):
+        return f"{bounds[-1]} 이상"
+    low = bounds[i - 1] if i > 0 else 0
+    return f"{low}-{bounds[i]}"
+
+
+def request_signature(party_request: Dict) -> tuple:
+    """파티 요청을 정규화한 캐시 키 (파티 종류, 예산 구간, 인원 구간, 특별 요청)"""
+    party_type = str(party_request.get('party_type') or '').strip().lower()
+    special_requirements = " ".join(str(party_request.get('special_requirements') or '').split())
+    return (
+        party_type,
+        _band(party_request.get('budget'), BUDGET_BANDS),
+        _band(party_request.get('guest_count'), GUEST_BANDS),
+        special_requirements,
+    )
+
+
+# ---- 프로세스당 하나의 RAG 인스턴스 ----
+
+_rag_instance: Optional[PartyPlanningRAG] = None
+_rag_lock = threading.Lock()
+_rag_warm_thread: Optional[threading.Thread] = None
+_rag_failed_at: Optional[float] = None
+# 초기화 실패 후 다시 시도하기까지 대기 시간 (초)
+RAG_RETRY_INTERVAL = 300
+
+
+def _build_rag():
+    global _rag_instance, _rag_failed_at
+    started_at = time.monotonic()
+    try:
+        instance = PartyPlanningRAG()
+    except Exception as e:
+        logger.error(f"RAG 시스템 초기화 실패: {e}")
+        _rag_failed_at = time.monotonic()
+        return
+    _rag_instance = instance
+    logger.info(f"RAG 시스템 준비 완료 ({time.monotonic() - started_at:.1f}초)")
+
+
+def warm_rag_in_background() -> bool:
+    """백그라운드 스레드에서 RAG 시스템 초기화 시작 (이미 준비됐거나 진행 중이면 무시)"""
+    global _rag_warm_thread, _rag_failed_at
+    if not getattr(settings, 'RAG_ENABLED', True) or _rag_instance is not None:
+        return False
+
+    with _rag_lock:
+        if _rag_instance is not None or (_rag_warm_thread and _rag_warm_thread.is_alive()):
+            return False
+        if _rag_failed_at is not None and time.monotonic() - _rag_failed_at < RAG_RETRY_INTERVAL:
+            return False
+        _rag_failed_at = None
+        _rag_warm_thread = threading.Thread(target=_build_rag, name='rag-warmup', daemon=True)
+        _rag_warm_thread.start()
+    return True
+
+
+def get_rag() -> Optional[PartyPlanningRAG]:
+    """준비된 RAG 시스템 (아직 초기화 중이면 None을 반환하고 백그라운드 초기화를 시작)
+
+    요청 경로에서 초기화를 기다리지 않도록, 준비되기 전에는 호출한 쪽이 기본 정보를 사용합니다.
+    """
+    if _rag_instance is None:
+        warm_rag_in_background()
+    return _rag_instance
+
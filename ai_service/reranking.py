@@ -0,0 +1,63 @@
+# ai_service/reranking.py
+
+from typing import List, Optional
+
+import numpy as np
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def collapse_near_duplicates(embeddings: np.ndarray, threshold: float = 0.95) -> np.ndarray:
+    """순위가 높은 문서부터 남기며, 이미 남긴 문서와 코사인 유사도가 threshold 이상인 문서 제거
+
+    embeddings는 순위순으로 정렬되고 정규화된 (n, d) 배열이며, 남길 행 번호를 반환합니다.
+    """
+    n = len(embeddings)
+    if n <= 1:
+        return np.arange(n)
+    similarity = embeddings @ embeddings.T
+    # 자기보다 순위가 높은 문서와의 유사도만 봄 (하삼각)
+    duplicate_of_higher = np.tril(similarity >= threshold, k=-1)
+
+    keep = np.ones(n, dtype=bool)
+    for i in range(1, n):
+        # 이미 제거된 문서와 비슷한 것은 제거 사유가 아님
+        if duplicate_of_higher[i, :i][keep[:i]].any():
+            keep[i] = False
+    return np.nonzero(keep)[0]
+
+
+def maximal_marginal_relevance(query_embedding: np.ndarray, embeddings: np.ndarray,
+                               top_k: int, lambda_mult: float = 0.5,
+                               relevance: Optional[np.ndarray] = None) -> List[int]:
+    """MMR 재순위화
+
+    lambda_mult * 질의 유사도 - (1 - lambda_mult) * 이미 고른 문서와의 최대 유사도가
+    가장 큰 문서를 하나씩 고릅니다. 유사도는 후보 집합 전체에 대해 한 번만 계산합니다.
+    relevance를 주면 질의 유사도 대신 그 값(예: 정규화한 RRF 점수)을 관련도로 사용합니다.
+    """
+    n = len(embeddings)
+    if n == 0 or top_k <= 0:
+        return []
+    if relevance is None:
+        relevance = embeddings @ query_embedding
+    similarity = embeddings @ embeddings.T
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < min(top_k, n):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    return selected
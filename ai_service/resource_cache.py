@@ -0,0 +1,100 @@
+# ai_service/resource_cache.py
+
+import gzip
+import json
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+from cachetools import LRUCache
+
+
+@dataclass(frozen=True)
+class ResourceSnapshot:
+    """미리 직렬화/압축해 둔 리소스 응답
+
+    ETag는 본문 바이트의 해시이므로 강한(strong) 검증자이며, gzip 본문은 바이트가 다르므로
+    별도의 ETag를 가집니다.
+    """
+    body: bytes
+    gzip_body: bytes
+    etag: str
+    gzip_etag: str
+    mime_type: str = 'application/json'
+
+    @property
+    def text(self) -> str:
+        return self.body.decode('utf-8')
+
+    def matches(self, etags) -> bool:
+        """If-None-Match 값과 비교 (약한 비교: W/ 접두사 무시, 두 표현 중 하나와 같으면 일치)"""
+        for tag in etags:
+            if tag == '*':
+                return True
+            tag = tag[2:] if tag.startswith('W/') else tag
+            if tag in (self.etag, self.gzip_etag):
+                return True
+        return False
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Accept-Encoding 헤더가 gzip을 허용하는지 (q=0이면 거부, gzip이 없으면 * 항목을 따름)"""
+    wildcard = None
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding in ('gzip', 'x-gzip'):
+            return quality > 0
+        if coding == '*':
+            wildcard = quality > 0
+    return bool(wildcard)
+
+
+def build_snapshot(payload: Any, mime_type: str = 'application/json') -> ResourceSnapshot:
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    # mtime=0으로 고정해 같은 본문이면 압축 결과도 항상 같게 함
+    gzip_body = gzip.compress(body, compresslevel=6, mtime=0)
+    return ResourceSnapshot(
+        body=body,
+        gzip_body=gzip_body,
+        etag=f'"{digest}"',
+        gzip_etag=f'"{digest}-gzip"',
+        mime_type=mime_type,
+    )
+
+
+class ResourceSnapshotCache:
+    """(리소스, 카탈로그 버전, 페이지) 단위 스냅샷 캐시
+
+    카탈로그가 바뀌면 버전이 달라져 새 스냅샷을 만들고, 이전 스냅샷은 LRU로 밀려납니다.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self._snapshots: LRUCache = LRUCache(maxsize=max_entries)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, build: Callable[[], Optional[ResourceSnapshot]]) -> Optional[ResourceSnapshot]:
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+        if snapshot is not None:
+            return snapshot
+        # 직렬화/압축은 잠금 밖에서 (동시에 만들어져도 결과가 같으므로 문제 없음)
+        snapshot = build()
+        if snapshot is not None:
+            with self._lock:
+                self._snapshots[key] = snapshot
+        return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
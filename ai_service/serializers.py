@@ -1,5 +1,6 @@
 # ai_service/serializers.py
 
+from django.conf import settings
 from rest_framework import serializers
 
 class AIQuerySerializer(serializers.Serializer):
@@ -36,4 +37,63 @@ class PartyPlanResponseSerializer(serializers.Serializer):
     tasks = serializers.ListField(child=serializers.DictField())
     estimated_cost = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
     timeline = serializers.ListField(child=serializers.DictField())
-    recommendations = serializers.ListField(child=serializers.DictField())
\ No newline at end of file
+    recommendations = serializers.ListField(child=serializers.DictField())
+
+
+def _validate_metadata(value):
+    """벡터 DB 메타데이터는 문자열/숫자/불리언 값만 허용"""
+    for key, item in value.items():
+        if not isinstance(item, (str, int, float, bool)):
+            raise serializers.ValidationError(f"메타데이터 '{key}' 값은 문자열, 숫자, 불리언이어야 합니다.")
+    return value
+
+
+class KnowledgeDocumentSerializer(serializers.Serializer):
+    """지식 문서 시리얼라이저"""
+    id = serializers.CharField(max_length=64, required=False)
+    content = serializers.CharField(max_length=20000, required=True)
+    metadata = serializers.DictField(required=False, default=dict, validators=[_validate_metadata])
+
+class KnowledgeUpsertSerializer(serializers.Serializer):
+    """지식 문서 추가/교체 요청 시리얼라이저"""
+    documents = serializers.ListField(
+        child=KnowledgeDocumentSerializer(),
+        allow_empty=False,
+        max_length=1000
+    )
+
+class KnowledgeDeleteSerializer(serializers.Serializer):
+    """지식 문서 삭제 요청 시리얼라이저 (ids 또는 where 중 하나 이상)"""
+    ids = serializers.ListField(child=serializers.CharField(max_length=64), required=False, allow_empty=True)
+    where = serializers.DictField(required=False, validators=[_validate_metadata])
+
+    def validate(self, attrs):
+        if not attrs.get('ids') and not attrs.get('where'):
+            raise serializers.ValidationError("ids 또는 where 중 하나는 지정해야 합니다.")
+        return attrs
+
+class BudgetScenarioSerializer(serializers.Serializer):
+    """예산 시나리오 비교 요청 시리얼라이저 (각 축의 모든 조합을 계산, 비용 값 null은 인원 기준 기본값)"""
+    guest_counts = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000)
+    party_types = serializers.ListField(
+        child=serializers.CharField(max_length=100), required=False, allow_empty=False, max_length=100
+    )
+    venue_costs = serializers.ListField(
+        child=serializers.FloatField(min_value=0, allow_null=True), required=False, allow_empty=False, max_length=1000
+    )
+    catering_costs = serializers.ListField(
+        child=serializers.FloatField(min_value=0, allow_null=True), required=False, allow_empty=False, max_length=1000
+    )
+    decoration_costs = serializers.ListField(
+        child=serializers.FloatField(min_value=0, allow_null=True), required=False, allow_empty=False, max_length=1000
+    )
+    budget = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+
+    def validate(self, attrs):
+        count = 1
+        for name in ('guest_counts', 'party_types', 'venue_costs', 'catering_costs', 'decoration_costs'):
+            count *= len(attrs.get(name) or [None])
+        max_scenarios = getattr(settings, 'BUDGET_SCENARIO_MAX', 2000)
+        if count > max_scenarios:
+            raise serializers.ValidationError(f"시나리오 수({count:,})가 최대 {max_scenarios:,}개를 넘습니다.")
+        return attrs
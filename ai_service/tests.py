@@ -1,3 +1,1073 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import hashlib
+import tempfile
+import threading
+import time
+from datetime import datetime
+from unittest.mock import MagicMock, patch
 
-# Create your tests here.
+import numpy as np
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from langchain_core.embeddings import Embeddings
+
+from .budget_scenarios import budget_scenarios, calculate_budget
+from .catering_index import CateringIndex
+from .embedding_cache import CachedEmbeddings, EmbeddingCache
+from .embeddings import (
+    DEFAULT_LOCAL_MODEL, LocalSentenceTransformerEmbeddings, create_embeddings, index_namespace
+)
+from .geo import GridIndex, haversine_km
+from .ingestion import IngestionPipeline
+from .lexical_index import LexicalIndexHolder, reciprocal_rank_fusion
+from .mcp_integration import MCPClient, PartyPlanningMCPProvider
+from .mcp_remote import RemoteMCPProvider, _PooledSession
+from .party_planning_agent import DEFAULT_LOCATION, PartyPlanningAgent
+from . import rag_system
+from .rag_system import PartyPlanningRAG, get_rag, request_signature
+from .resource_cache import accepts_gzip
+from .serializers import BudgetScenarioSerializer
+from .text_splitting import TokenTextSplitter
+from .tool_cache import LOCAL_PROVIDER, ToolResultCache
+from .tracing import JsonFileSpanExporter, SpanContext, Tracer
+from .usage import UsageLedger, get_client_ip
+from .vector_index import NumpyVectorIndex
+from .venue_catalog import DEFAULT_CATALOG_PATH, VenueCatalog, _region_names
+
+
+class FakeEmbeddings(Embeddings):
+    """내용 해시로 만드는 결정적 임베딩 (네트워크 호출 없음, 임베딩한 텍스트 수 기록)"""
+
+    def __init__(self):
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+    @staticmethod
+    def _vector(text):
+        return [b / 255 + 0.01 for b in hashlib.sha256(text.encode('utf-8')).digest()[:16]]
+
+
+class FlakyEmbeddings(FakeEmbeddings):
+    """처음 failures번은 일시적 오류를 내는 임베딩 (배치 크기 기록)"""
+
+    def __init__(self, failures=0):
+        super().__init__()
+        self.failures = failures
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.batches.append(len(texts))
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("temporary failure")
+        return super().embed_documents(texts)
+
+
+class ParagraphSplitter:
+    """빈 줄 단위로 청크를 나누는 분할기 (토크나이저 다운로드 없이 여러 청크를 만듦)"""
+
+    def split_texts(self, texts):
+        return [[part for part in text.split('\n\n') if part] for text in texts]
+
+
+class RAGTestMixin:
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.embeddings = FakeEmbeddings()
+        settings_override = override_settings(
+            BASE_DIR=self.tmp_dir.name,
+            RAG_VECTOR_BACKEND='numpy',
+            RAG_EMBEDDING_CACHE_ENABLED=False,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.rag = self.build_rag()
+        self.embeddings.embedded = 0
+
+    def build_rag(self):
+        """같은 저장 위치를 쓰는 RAG 인스턴스 (워커 재시작에 해당)"""
+        with patch('ai_service.rag_system.create_embeddings', return_value=(self.embeddings, 'fake-embedding')):
+            rag = PartyPlanningRAG()
+        rag.text_splitter = ParagraphSplitter()
+        return rag
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def documents(self, collection_type):
+        return {
+            doc['id']: doc for doc in self.rag.index.iter_documents()
+            if doc['collection'] == collection_type
+        }
+
+
+class IngestionTests(RAGTestMixin, SimpleTestCase):
+    def _write_jsonl(self, records):
+        path = os.path.join(self.tmp_dir.name, 'venues.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return path
+
+    def test_multi_chunk_record_with_id_keeps_every_chunk(self):
+        path = self._write_jsonl([
+            {'id': 'venue-1', 'content': '강남 파티룸\n\n30명 수용\n\n주차 가능', 'city': '서울'},
+            {'id': 'venue-2', 'content': '홍대 루프탑', 'city': '서울'},
+        ])
+
+        stats = IngestionPipeline(self.rag, 'venues').run(path, resume=False)
+
+        documents = self.documents('venues')
+        self.assertEqual(stats.embedded, 4)
+        self.assertEqual(
+            {doc_id: doc['content'] for doc_id, doc in documents.items() if doc_id.startswith('venue-')},
+            {'venue-1:0': '강남 파티룸', 'venue-1:1': '30명 수용', 'venue-1:2': '주차 가능', 'venue-2': '홍대 루프탑'},
+        )
+        self.assertEqual(documents['venue-1:2']['metadata']['source_id'], 'venue-1')
+        self.assertNotIn('id', documents['venue-2']['metadata'])
+
+        # 같은 파일을 다시 적재하면 본문이 그대로이므로 다시 임베딩하지 않음
+        stats = IngestionPipeline(self.rag, 'venues').run(path, resume=False)
+        self.assertEqual(stats.embedded, 0)
+
+    def test_reingest_with_different_chunking_removes_old_chunks(self):
+        path = self._write_jsonl([{'id': 'venue-1', 'content': '강남 파티룸\n\n30명 수용\n\n주차 가능'}])
+        IngestionPipeline(self.rag, 'venues').run(path, resume=False)
+
+        path = self._write_jsonl([{'id': 'venue-1', 'content': '강남 파티룸\n\n30명 수용'}])
+        IngestionPipeline(self.rag, 'venues').run(path, resume=False)
+        self.assertEqual(
+            sorted(doc_id for doc_id in self.documents('venues') if doc_id.startswith('venue-1')),
+            ['venue-1:0', 'venue-1:1'],
+        )
+
+        path = self._write_jsonl([{'id': 'venue-1', 'content': '강남 파티룸'}])
+        IngestionPipeline(self.rag, 'venues').run(path, resume=False)
+        self.assertEqual([doc_id for doc_id in self.documents('venues') if doc_id.startswith('venue-1')], ['venue-1'])
+
+        path = self._write_jsonl([{'id': 'venue-1', 'content': '강남 파티룸\n\n주차 가능'}])
+        IngestionPipeline(self.rag, 'venues').run(path, resume=False)
+        self.assertEqual(
+            sorted(doc_id for doc_id in self.documents('venues') if doc_id.startswith('venue-1')),
+            ['venue-1:0', 'venue-1:1'],
+        )
+
+    def test_long_record_id_keeps_chunk_ids_within_limit(self):
+        record_id = 'v' * 63
+        path = self._write_jsonl([{'id': record_id, 'content': '첫 문단\n\n둘째 문단'}])
+
+        IngestionPipeline(self.rag, 'venues').run(path, resume=False)
+
+        chunks = [doc for doc in self.documents('venues').values() if doc['metadata'].get('source_id') == record_id]
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(all(len(doc['id'].encode('utf-8')) <= 64 for doc in chunks))
+
+    def test_explicit_id_is_reembedded_only_when_content_changes(self):
+        doc = {'id': 'guide-1', 'content': '생일 케이크 준비', 'category': 'birthday'}
+        self.assertEqual(self.rag.ingest_documents('party_ideas', [doc])['embedded'], 1)
+
+        result = self.rag.ingest_documents('party_ideas', [{**doc, 'category': 'kids'}])
+        self.assertEqual((result['embedded'], result['updated']), (0, 1))
+        self.assertEqual(self.documents('party_ideas')['guide-1']['metadata']['category'], 'kids')
+
+        result = self.rag.ingest_documents('party_ideas', [{**doc, 'content': '생일 케이크와 풍선 준비'}])
+        self.assertEqual(result['embedded'], 1)
+        self.assertEqual(self.documents('party_ideas')['guide-1']['content'], '생일 케이크와 풍선 준비')
+
+
+class CharEncoding:
+    """글자 하나를 토큰 하나로 세는 인코더 (토크나이저 다운로드 없이 경계를 예측 가능하게 함)"""
+
+    def encode_ordinary(self, text):
+        return list(text)
+
+    def encode_ordinary_batch(self, texts):
+        return [list(text) for text in texts]
+
+
+class TokenTextSplitterTests(SimpleTestCase):
+    def setUp(self):
+        encoding = patch('ai_service.text_splitting.get_encoding', return_value=CharEncoding())
+        encoding.start()
+        self.addCleanup(encoding.stop)
+        self.splitter = TokenTextSplitter(chunk_tokens=40, overlap_tokens=15)
+        # 공백 포함 12토큰짜리 문장
+        self.sentences = [f"이것은 {i:02d}번 문장." for i in range(10)]
+
+    def test_short_text_is_a_single_chunk(self):
+        self.assertEqual(self.splitter.split_text("  짧은 문장.  "), ["짧은 문장."])
+        self.assertEqual(self.splitter.split_text("   "), [])
+
+    def test_chunks_end_on_sentence_boundaries_within_limit(self):
+        chunks = self.splitter.split_text(' '.join(self.sentences))
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(self.splitter.count_tokens(chunk), 40)
+            self.assertTrue(chunk.endswith('문장.'))
+        # 모든 문장이 순서대로 포함됨
+        seen = [sentence for chunk in chunks for sentence in self.sentences if sentence in chunk]
+        self.assertEqual(list(dict.fromkeys(seen)), self.sentences)
+
+    def test_next_chunk_overlaps_last_sentence_within_overlap_tokens(self):
+        chunks = self.splitter.split_text(' '.join(self.sentences))
+
+        for previous, current in zip(chunks, chunks[1:]):
+            last_sentence = [sentence for sentence in self.sentences if sentence in previous][-1]
+            self.assertTrue(current.startswith(last_sentence), (previous, current))
+
+    def test_overlap_larger_than_chunk_is_rejected(self):
+        with self.assertRaises(ValueError):
+            TokenTextSplitter(chunk_tokens=10, overlap_tokens=10)
+
+    def test_oversized_word_is_cut_to_chunk_size(self):
+        chunks = self.splitter.split_text('가' * 100)
+
+        self.assertEqual([len(chunk) for chunk in chunks], [40, 40, 20])
+
+
+class CompactionTests(RAGTestMixin, SimpleTestCase):
+    def test_compaction_keeps_explicit_ids_and_distinct_metadata(self):
+        self.rag.ingest_documents('venues', [
+            {'id': 'venue-a', 'content': '넓은 연회장', 'city': '서울'},
+            {'id': 'venue-b', 'content': '넓은 연회장', 'city': '부산'},
+            {'content': '넓은 연회장', 'city': '서울'},
+            {'content': '작은 파티룸', 'city': '서울'},
+        ])
+
+        result = self.rag.compact_index()
+
+        # 지정 ID 문서와 같은 내용/메타데이터인 내용 해시 ID 문서만 제거
+        self.assertEqual(result['duplicates_removed'], 1)
+        remaining = {
+            (doc['content'], doc['metadata']['city']): doc_id
+            for doc_id, doc in self.documents('venues').items()
+            if doc['content'] in ('넓은 연회장', '작은 파티룸')
+        }
+        self.assertEqual(len(remaining), 3)
+        self.assertEqual(remaining[('넓은 연회장', '서울')], 'venue-a')
+        self.assertEqual(remaining[('넓은 연회장', '부산')], 'venue-b')
+
+
+class NumpyVectorIndexTests(SimpleTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = tmp_dir.name
+        self.index = NumpyVectorIndex(self.path)
+        rng = np.random.default_rng(1)
+        self.vectors = rng.normal(size=(40, 8)).astype(np.float32)
+        self.ids = [f'doc-{i}' for i in range(len(self.vectors))]
+        self.index.upsert('venues', self.ids, self.vectors.tolist(),
+                          [f'content {i}' for i in range(len(self.ids))], [{'n': i} for i in range(len(self.ids))])
+        self.index.upsert('catering', ['other'], [self.vectors[0].tolist()], ['catering'], [{}])
+
+    def _expected(self, query, top_k, excluded=()):
+        normalized = self.vectors / np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        scores = normalized @ (query / np.linalg.norm(query))
+        order = [i for i in np.argsort(-scores) if self.ids[i] not in excluded]
+        return [self.ids[i] for i in order[:top_k]]
+
+    def test_query_matches_brute_force_cosine_ranking(self):
+        query = self.vectors[3] + 0.1
+
+        results = self.index.query(query.tolist(), ['venues'], 5)
+
+        self.assertEqual([r['id'] for r in results], self._expected(query, 5))
+        self.assertEqual(results[0]['content'], f"content {results[0]['id'].split('-')[1]}")
+        self.assertTrue(all(r['collection'] == 'venues' for r in results))
+
+    def test_replaced_and_deleted_rows_are_not_returned(self):
+        self.index.delete('venues', ['doc-3'])
+        self.index.upsert('venues', ['doc-5'], [(-self.vectors[5]).tolist()], ['replaced'], [{}])
+
+        results = self.index.query(self.vectors[3].tolist(), ['venues'], 40)
+
+        ids = [r['id'] for r in results]
+        self.assertNotIn('doc-3', ids)
+        self.assertEqual(ids.count('doc-5'), 1)
+        self.assertEqual(len(ids), 39)
+
+    def test_compaction_drops_deleted_rows_and_keeps_results(self):
+        self.index.delete('venues', self.ids[::2])
+        query = self.vectors[7].tolist()
+        before = [r['id'] for r in self.index.query(query, ['venues'], 5)]
+
+        result = self.index.compact()
+
+        self.assertEqual(result['rows_before'], 41)
+        self.assertEqual(result['rows_after'], 21)
+        self.assertEqual(self.index.stats()['deleted'], 0)
+        self.assertEqual([r['id'] for r in self.index.query(query, ['venues'], 5)], before)
+        # 다른 워커(새 인스턴스)도 압축된 파일을 읽음
+        other = NumpyVectorIndex(self.path)
+        self.assertEqual([r['id'] for r in other.query(query, ['venues'], 5)], before)
+        self.assertEqual(other.stats()['documents'], {'venues': 20, 'catering': 1})
+
+
+class QuantizedQueryTests(SimpleTestCase):
+    def _index(self, quantization, vectors):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        index = NumpyVectorIndex(tmp_dir.name, quantization=quantization)
+        for collection in ('venues', 'catering'):
+            ids = [f'{collection}-{i}' for i in range(len(vectors))]
+            index.upsert(collection, ids, vectors.tolist(),
+                         [f'doc {i}' for i in range(len(vectors))], [{} for _ in ids])
+            index.delete(collection, ids[::7])
+        return index
+
+    def test_int8_query_matches_float_top_k(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(200, 32)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        exact = self._index('none', vectors)
+        quantized = self._index('int8', vectors)
+
+        for query in rng.normal(size=(5, 32)):
+            expected = exact.query(query.tolist(), ['venues'], 5)
+            actual = quantized.query(query.tolist(), ['venues'], 5)
+            self.assertEqual([r['id'] for r in actual], [r['id'] for r in expected])
+            for a, e in zip(actual, expected):
+                self.assertAlmostEqual(a['score'], e['score'], places=4)
+            # 삭제된 행과 다른 컬렉션 행은 제외
+            self.assertTrue(all(r['collection'] == 'venues' for r in actual))
+            self.assertTrue(all(int(r['id'].split('-')[1]) % 7 for r in actual))
+
+
+class CollectionScopeTests(RAGTestMixin, SimpleTestCase):
+    def test_same_id_in_two_collections_is_managed_separately(self):
+        self.rag.ingest_documents('venues', [{'id': 'item-1', 'content': '호텔 연회장'}])
+        self.rag.ingest_documents('catering', [{'id': 'item-1', 'content': '뷔페 케이터링'}])
+
+        # 다른 컬렉션의 같은 ID를 덮어쓰거나 지우지 않음
+        self.assertEqual(self.documents('venues')['item-1']['content'], '호텔 연회장')
+        self.assertEqual(self.rag.delete_documents('catering', ids=['item-1']), 1)
+        self.assertNotIn('item-1', self.documents('catering'))
+        self.assertEqual(self.documents('venues')['item-1']['content'], '호텔 연회장')
+        self.assertEqual(self.rag.delete_documents('catering', ids=['item-1']), 0)
+
+
+class SeedTests(RAGTestMixin, SimpleTestCase):
+    def test_restart_does_not_reembed_seed_data(self):
+        self.assertTrue(self.documents('venues'))
+
+        self.build_rag()
+        self.assertEqual(self.embeddings.embedded, 0)
+
+    def test_reseed_after_lost_marker_reuses_content_hash_ids(self):
+        count = sum(len(self.documents(ct)) for ct in ('party_ideas', 'venues', 'catering'))
+        os.remove(self.rag.seed_marker_path)
+
+        self.build_rag()
+        self.assertEqual(self.embeddings.embedded, 0)
+        self.assertEqual(sum(len(self.documents(ct)) for ct in ('party_ideas', 'venues', 'catering')), count)
+
+
+class EmbeddingBatchTests(RAGTestMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.rag.embed_batch_size = 3
+        self.rag.embed_concurrency = 2
+        # 재시도 대기 없이 실행
+        no_wait = patch('tenacity.nap.time.sleep')
+        no_wait.start()
+        self.addCleanup(no_wait.stop)
+
+    def test_texts_are_embedded_in_batches_in_input_order(self):
+        self.rag.embeddings = FlakyEmbeddings()
+        texts = [f'text {i}' for i in range(8)]
+
+        vectors = self.rag._embed_texts(texts)
+
+        self.assertEqual(vectors, [FakeEmbeddings._vector(text) for text in texts])
+        self.assertEqual(sorted(self.rag.embeddings.batches), [2, 3, 3])
+
+    def test_transient_error_is_retried(self):
+        self.rag.embeddings = FlakyEmbeddings(failures=1)
+
+        vectors = self.rag._embed_texts(['a', 'b'])
+
+        self.assertEqual(vectors, [FakeEmbeddings._vector('a'), FakeEmbeddings._vector('b')])
+        self.assertEqual(self.rag.embeddings.batches, [2, 2])
+
+    def test_error_is_raised_after_max_retries(self):
+        self.rag.embed_max_retries = 2
+        self.rag.embeddings = FlakyEmbeddings(failures=5)
+
+        with self.assertRaises(ConnectionError):
+            self.rag._embed_texts(['a'])
+        self.assertEqual(len(self.rag.embeddings.batches), 2)
+
+
+class EmbeddingCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache = EmbeddingCache(os.path.join(tmp_dir.name, 'cache.sqlite3'))
+        self.inner = FakeEmbeddings()
+
+    def test_repeated_texts_are_served_from_cache(self):
+        embeddings = CachedEmbeddings(self.inner, self.cache, 'openai:model-a')
+        first = embeddings.embed_documents(['a', 'b', 'a'])
+        second = embeddings.embed_documents(['b', 'a'])
+
+        # 같은 텍스트는 한 번만 임베딩하고, 두 번째 호출은 모두 캐시 적중
+        self.assertEqual(self.inner.embedded, 2)
+        np.testing.assert_allclose(second, [first[1], first[0]], rtol=1e-6)
+        np.testing.assert_allclose(first[0], FakeEmbeddings._vector('a'), rtol=1e-6)
+
+    def test_entries_are_keyed_by_model(self):
+        CachedEmbeddings(self.inner, self.cache, 'openai:model-a').embed_documents(['a'])
+        CachedEmbeddings(self.inner, self.cache, 'local:model-b').embed_documents(['a'])
+        self.assertEqual(self.inner.embedded, 2)
+
+        CachedEmbeddings(self.inner, self.cache, 'local:model-b').embed_documents(['a'])
+        self.assertEqual(self.inner.embedded, 2)
+
+    def test_query_embedding_is_cached(self):
+        embeddings = CachedEmbeddings(self.inner, self.cache, 'openai:model-a')
+        embeddings.embed_documents(['a'])
+
+        with patch.object(self.inner, 'embed_query') as embed_query:
+            np.testing.assert_allclose(embeddings.embed_query('a'), FakeEmbeddings._vector('a'), rtol=1e-6)
+        embed_query.assert_not_called()
+
+
+class LocalEmbeddingBackendTests(RAGTestMixin, SimpleTestCase):
+    @override_settings(RAG_EMBEDDING_BACKEND='local', RAG_EMBEDDING_MODEL='')
+    def test_local_backend_loads_model_lazily(self):
+        with patch.object(LocalSentenceTransformerEmbeddings, '_get_model') as get_model:
+            embeddings, model_id = create_embeddings()
+
+        self.assertIsInstance(embeddings, LocalSentenceTransformerEmbeddings)
+        self.assertEqual(model_id, f'local:{DEFAULT_LOCAL_MODEL}')
+        get_model.assert_not_called()
+
+    def test_namespace_depends_on_backend_and_model(self):
+        local = index_namespace('local:model-a')
+
+        self.assertTrue(local.startswith('local_'))
+        self.assertNotEqual(local, index_namespace('local:model-b'))
+        self.assertNotEqual(local, index_namespace('openai:model-a'))
+
+    def test_switching_model_uses_a_separate_index(self):
+        with patch('ai_service.rag_system.create_embeddings', return_value=(self.embeddings, 'local:model-a')):
+            local_rag = PartyPlanningRAG()
+
+        self.assertNotEqual(local_rag.index.path, self.rag.index.path)
+        self.assertTrue(all(name.endswith(index_namespace('local:model-a')) for name in local_rag.collections.values()))
+        # 새 모델의 인덱스에는 시드 데이터를 다시 임베딩해 적재
+        self.assertGreater(self.embeddings.embedded, 0)
+        self.assertEqual(len(local_rag._read_seed_markers()), 2)
+
+
+class UsageLedgerTests(SimpleTestCase):
+    def _objects(self, stored=0, fail=False):
+        objects = MagicMock()
+        objects.filter.return_value.aggregate.return_value = {'prompt': stored, 'completion': 0}
+        if fail:
+            objects.bulk_create.side_effect = Exception("db down")
+        return objects
+
+    def test_used_today_keeps_running_total_between_queries(self):
+        ledger = UsageLedger(cache_ttl=60)
+        objects = self._objects(stored=100)
+        with patch('ai_service.models.AIUsageRecord.objects', objects), \
+                patch.object(ledger, '_ensure_flusher'):
+            self.assertEqual(ledger.used_today('user:1'), 100)
+            ledger.record('user:1', 'ask', 'node', 'model', 10, 5)
+            self.assertEqual(ledger.used_today('user:1'), 115)
+            ledger.flush()
+            self.assertEqual(ledger.used_today('user:1'), 115)
+
+        # DB 합계는 한 번만 조회하고, 날짜 함수 대신 범위 조건으로 인덱스를 탐
+        self.assertEqual(objects.filter.call_count, 1)
+        self.assertIn('created_at__gte', objects.filter.call_args.kwargs)
+
+    def test_used_today_requeries_after_ttl(self):
+        ledger = UsageLedger(cache_ttl=0)
+        objects = self._objects(stored=100)
+        with patch('ai_service.models.AIUsageRecord.objects', objects):
+            ledger.used_today('user:1')
+            ledger.used_today('user:1')
+        self.assertEqual(objects.filter.call_count, 2)
+
+    def test_failed_flush_drops_oldest_events_over_limit(self):
+        ledger = UsageLedger(max_pending=3)
+        with patch('ai_service.models.AIUsageRecord.objects', self._objects(fail=True)), \
+                patch.object(ledger, '_ensure_flusher'):
+            for tokens in range(1, 6):
+                ledger.record('user:1', 'ask', 'node', 'model', tokens, 0)
+            ledger.flush()
+            ledger.record('user:1', 'ask', 'node', 'model', 6, 0)
+            ledger.flush()
+
+        self.assertEqual([e.prompt_tokens for e in ledger._pending], [4, 5, 6])
+
+
+class ClientIPTests(SimpleTestCase):
+    def _request(self):
+        return RequestFactory().get('/', HTTP_X_FORWARDED_FOR='1.1.1.1, 203.0.113.7', REMOTE_ADDR='10.0.0.2')
+
+    @override_settings(AI_TRUSTED_PROXY_COUNT=0)
+    def test_forwarded_for_is_ignored_without_trusted_proxy(self):
+        self.assertEqual(get_client_ip(self._request()), '10.0.0.2')
+
+    @override_settings(AI_TRUSTED_PROXY_COUNT=1)
+    def test_uses_hop_appended_by_trusted_proxy(self):
+        # 클라이언트가 넣은 맨 앞 값(1.1.1.1)이 아니라 프록시가 추가한 값을 사용
+        self.assertEqual(get_client_ip(self._request()), '203.0.113.7')
+
+    @override_settings(AI_TRUSTED_PROXY_COUNT=3)
+    def test_falls_back_to_remote_addr_when_hops_are_missing(self):
+        self.assertEqual(get_client_ip(self._request()), '10.0.0.2')
+
+
+class RecordingMCPClient:
+    """도구 호출 인자를 기록하는 MCP 클라이언트"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, provider_name, tool_name, arguments):
+        self.calls.append((tool_name, arguments))
+        return {}
+
+
+class CountingProvider(PartyPlanningMCPProvider):
+    """도구 호출 횟수를 세고 호출마다 다른 결과를 돌려주는 프로바이더"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def call_tool(self, name, arguments):
+        self.calls += 1
+        return {'call': self.calls}
+
+
+class ToolResultCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        clock = patch('ai_service.tool_cache.time.monotonic', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.client = MCPClient(cache=ToolResultCache(ttls={'search_venues': 60}, stale_ratio=0.5))
+        self.local = CountingProvider()
+        self.client.register_provider(LOCAL_PROVIDER, self.local)
+
+    def _search(self, provider_name=LOCAL_PROVIDER, **arguments):
+        return asyncio.run(self.client.call_tool(
+            provider_name, 'search_venues', {'location': '강남', 'capacity': 10, **arguments}))
+
+    def test_entry_expires_after_ttl_and_stale_window(self):
+        self.assertEqual(self._search(), {'call': 1})
+        self.now += 59
+        self.assertEqual(self._search(), {'call': 1})
+        self.now += 60
+        # TTL * (1 + stale_ratio)가 지나면 미스로 처리
+        self.assertEqual(self._search(), {'call': 2})
+        self.assertEqual(self.local.calls, 2)
+
+    def test_stale_entry_is_returned_and_refreshed_in_background(self):
+        self._search()
+        self.now += 61
+
+        self.assertEqual(self._search(), {'call': 1})
+        # 시계를 고정했으므로 대기 횟수로 제한
+        for _ in range(500):
+            if self.client.cache_stats()['tools']['search_venues']['refreshes']:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self._search(), {'call': 2})
+        self.assertEqual(self.local.calls, 2)
+
+    def test_schema_default_and_omitted_argument_share_an_entry(self):
+        self._search()
+        self.assertEqual(self._search(sort_by='rating', limit=10), {'call': 1})
+        self.assertEqual(self._search(sort_by='price'), {'call': 2})
+
+    def test_same_named_remote_tool_is_not_cached(self):
+        remote = CountingProvider()
+        self.client.register_provider('vendor', remote)
+
+        self._search(provider_name='vendor')
+        self._search(provider_name='vendor')
+        self.assertEqual(remote.calls, 2)
+
+
+class ToolContextTests(SimpleTestCase):
+    def setUp(self):
+        self.agent = PartyPlanningAgent.__new__(PartyPlanningAgent)
+        self.agent.mcp_client = RecordingMCPClient()
+        self.state = {
+            'party_type': '생일파티', 'budget': None, 'guest_count': 12,
+            'date': datetime(2026, 11, 1), 'location': None, 'dietary_restrictions': [],
+        }
+
+    def test_request_without_location_searches_default_location(self):
+        asyncio.run(self.agent._collect_tool_context(self.state))
+
+        arguments = dict(self.agent.mcp_client.calls)['search_venues']
+        self.assertEqual(arguments['location'], DEFAULT_LOCATION)
+
+    @override_settings(AGENT_TOOL_MAX_ITERATIONS=0)
+    def test_agentic_loop_with_no_iterations_falls_back(self):
+        self.assertIsNone(asyncio.run(self.agent._collect_tool_context_agentic(self.state)))
+        self.assertEqual(self.agent.mcp_client.calls, [])
+
+
+class BudgetScenarioTests(SimpleTestCase):
+    def test_default_response_has_no_full_matrix(self):
+        result = budget_scenarios([10, 20, 30], ['생일파티', '회사파티']).to_dict(budget=800000)
+
+        self.assertNotIn('matrix', result)
+        self.assertEqual((result['shape'], result['count']), ([3, 2, 1, 1, 1], 6))
+        self.assertEqual(result['summary']['min_total']['index'], [0, 0, 0, 0, 0])
+
+    def test_pages_follow_flattened_order(self):
+        matrix = budget_scenarios([10, 20, 30], ['생일파티', '회사파티'])
+
+        last = matrix.page(2, 4, budget=800000)['scenarios']
+
+        self.assertEqual([s['index'] for s in last], [[2, 0, 0, 0, 0], [2, 1, 0, 0, 0]])
+        self.assertEqual(last[1]['breakdown'], calculate_budget(30, '회사파티')['breakdown'])
+        self.assertFalse(last[1]['within_budget'])
+        self.assertEqual(matrix.page(3, 4)['scenarios'], [])
+
+    def test_zero_cost_uses_the_guest_based_default(self):
+        # 기존 도구와 같이 0은 지정하지 않은 것으로 봄
+        default = calculate_budget(20, '생일파티')
+        self.assertEqual(calculate_budget(20, '생일파티', venue_cost=0, catering_cost=0, decoration_cost=0), default)
+        self.assertEqual(default['breakdown']['venue'], 100000)
+
+        matrix = budget_scenarios([20], venue_costs=[0, None, 300000])
+        self.assertEqual(matrix.values['venue'][0, 0, :, 0, 0].tolist(), [100000, 100000, 300000])
+
+    @override_settings(BUDGET_SCENARIO_MAX=100)
+    def test_serializer_rejects_grids_over_the_limit(self):
+        serializer = BudgetScenarioSerializer(data={'guest_counts': list(range(1, 11)), 'venue_costs': list(range(11))})
+
+        self.assertFalse(serializer.is_valid())
+
+
+class ContextCacheTests(RAGTestMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        search = patch.object(self.rag, 'search_relevant_info', wraps=self.rag.search_relevant_info)
+        self.search = search.start()
+        self.addCleanup(search.stop)
+
+    def test_requests_in_the_same_band_share_a_cached_context(self):
+        first = self.rag.get_contextual_information({'party_type': '생일파티', 'budget': 350000, 'guest_count': 12})
+        second = self.rag.get_contextual_information({'party_type': ' 생일파티 ', 'budget': 400000, 'guest_count': 15})
+
+        self.assertTrue(first)
+        self.assertEqual(second, first)
+        self.assertEqual(self.search.call_count, 1)
+
+        self.rag.get_contextual_information({'party_type': '생일파티', 'budget': 600000, 'guest_count': 12})
+        self.assertEqual(self.search.call_count, 2)
+
+    def test_bumping_generation_invalidates_cached_context(self):
+        request = {'party_type': '생일파티', 'budget': 350000}
+        self.rag.get_contextual_information(request)
+
+        self.rag._bump_generation()
+        self.assertEqual(len(self.rag._context_cache), 0)
+        self.rag.get_contextual_information(request)
+        self.assertEqual(self.search.call_count, 2)
+
+    def test_ingest_invalidates_cached_context(self):
+        request = {'party_type': '생일파티'}
+        self.rag.get_contextual_information(request)
+
+        self.rag.ingest_documents('party_ideas', [{'content': '생일파티 보물찾기 게임'}])
+        self.rag.get_contextual_information(request)
+        self.assertEqual(self.search.call_count, 2)
+
+    def test_signature_bands_budget_and_guest_count(self):
+        self.assertEqual(
+            request_signature({'party_type': 'Birthday', 'budget': 350000, 'guest_count': 250,
+                               'special_requirements': '  야외   선호 '}),
+            ('birthday', '300000-500000', '200 이상', '야외 선호'),
+        )
+        self.assertEqual(request_signature({'budget': 'unknown', 'guest_count': 0})[1:3], ('', ''))
+
+
+class RAGWarmupTests(SimpleTestCase):
+    def setUp(self):
+        for name in ('_rag_instance', '_rag_warm_thread', '_rag_failed_at'):
+            state = patch.object(rag_system, name, None)
+            state.start()
+            self.addCleanup(state.stop)
+        build = patch('ai_service.rag_system.PartyPlanningRAG')
+        self.build = build.start()
+        self.addCleanup(build.stop)
+
+    def _wait_for_warmup(self):
+        rag_system._rag_warm_thread.join(5)
+
+    def test_first_call_returns_none_and_warms_in_background(self):
+        released = threading.Event()
+        self.build.side_effect = lambda: released.wait(5) and self.build.return_value
+
+        self.assertIsNone(get_rag())
+        self.assertIsNone(get_rag())
+        released.set()
+        self._wait_for_warmup()
+
+        self.assertIs(get_rag(), self.build.return_value)
+        self.assertIs(get_rag(), self.build.return_value)
+        self.build.assert_called_once()
+
+    def test_failed_warmup_is_retried_only_after_interval(self):
+        self.build.side_effect = RuntimeError("no api key")
+        get_rag()
+        self._wait_for_warmup()
+        self.assertIsNotNone(rag_system._rag_failed_at)
+
+        self.assertIsNone(get_rag())
+        self.assertFalse(rag_system._rag_warm_thread.is_alive())
+        self.assertEqual(self.build.call_count, 1)
+
+        self.build.side_effect = None
+        rag_system._rag_failed_at -= rag_system.RAG_RETRY_INTERVAL
+        get_rag()
+        self._wait_for_warmup()
+        self.assertIs(get_rag(), self.build.return_value)
+        self.assertEqual(self.build.call_count, 2)
+
+    @override_settings(RAG_ENABLED=False)
+    def test_disabled_rag_is_never_built(self):
+        self.assertIsNone(get_rag())
+        self.assertIsNone(rag_system._rag_warm_thread)
+        self.build.assert_not_called()
+
+
+class VenueCatalogTests(SimpleTestCase):
+    SORT_KEYS = {
+        'rating': lambda v: (-np.float32(v['rating']), v['hourly_rate']),
+        'price': lambda v: (v['hourly_rate'], -np.float32(v['rating'])),
+        'capacity': lambda v: (v['capacity'], -np.float32(v['rating'])),
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.catalog = VenueCatalog.from_file(DEFAULT_CATALOG_PATH)
+
+    def _brute_force(self, location, min_capacity, max_hourly_rate, sort_by):
+        matches = [
+            v for v in self.catalog.records
+            if (not location or location in _region_names(v))
+            and v['capacity'] >= min_capacity
+            and (max_hourly_rate is None or v['hourly_rate'] <= max_hourly_rate)
+        ]
+        return [v['id'] for v in sorted(matches, key=self.SORT_KEYS[sort_by])]
+
+    def test_search_matches_brute_force_filter_and_sort(self):
+        for location in ('', '서울', '강남구', '강남', '마포구', '부산'):
+            for min_capacity in (1, 20, 80):
+                for max_hourly_rate in (None, 200000):
+                    for sort_by in self.SORT_KEYS:
+                        expected = self._brute_force(location, min_capacity, max_hourly_rate, sort_by)
+                        result = self.catalog.search(location, min_capacity=min_capacity,
+                                                     max_hourly_rate=max_hourly_rate, sort_by=sort_by,
+                                                     offset=1, limit=3)
+                        with self.subTest(location=location, min_capacity=min_capacity,
+                                          max_hourly_rate=max_hourly_rate, sort_by=sort_by):
+                            self.assertEqual(result['total'], len(expected))
+                            self.assertEqual([v['id'] for v in result['venues']], expected[1:4])
+
+    def test_multi_word_location_uses_narrowest_region(self):
+        result = self.catalog.search('서울 강남구', limit=50)
+        self.assertEqual(result['total'], len(self._brute_force('강남구', 1, None, 'rating')))
+
+    def test_unknown_location_returns_message(self):
+        result = self.catalog.search('제주', limit=5)
+        self.assertEqual((result['venues'], result['total']), ([], 0))
+        self.assertIn('제주', result['message'])
+
+    def test_unknown_sort_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.catalog.search('서울', sort_by='name')
+
+
+class CateringIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = CateringIndex([
+            {'id': 'a', 'cuisine': 'korean', 'price_per_person': 30000, 'rating': 4.5,
+             'dietary_options': ['vegetarian', 'halal']},
+            {'id': 'b', 'cuisine': 'korean', 'price_per_person': 20000, 'rating': 4.0,
+             'dietary_options': ['vegan', 'vegetarian']},
+            {'id': 'c', 'cuisine': 'western', 'price_per_person': 25000, 'rating': 4.8,
+             'dietary_options': ['halal', 'gluten_free']},
+            {'id': 'd', 'cuisine': 'korean', 'price_per_person': 10000, 'rating': 3.0,
+             'minimum_order': 50, 'dietary_options': []},
+        ])
+
+    def _ids(self, **kwargs):
+        result = self.index.search(10, **kwargs)
+        return [o['id'] for o in result['catering_options']]
+
+    def test_any_matches_options_supporting_one_restriction(self):
+        self.assertEqual(self._ids(dietary_restrictions=['vegan', 'halal']), ['b', 'c', 'a'])
+
+    def test_all_requires_every_restriction(self):
+        self.assertEqual(self._ids(dietary_restrictions=['vegetarian', 'halal'], dietary_match='all'), ['a'])
+        self.assertEqual(self._ids(dietary_restrictions=['Gluten-Free', 'HALAL'], dietary_match='all'), ['c'])
+
+    def test_unknown_restrictions(self):
+        # any: 알 수 없는 값은 무시하고, 모두 모르는 값이면 결과 없음
+        self.assertEqual(self._ids(dietary_restrictions=['kosher', 'halal']), ['c', 'a'])
+        self.assertEqual(self._ids(dietary_restrictions=['kosher']), [])
+        # all: 알 수 없는 값을 지원하는 옵션은 없음
+        self.assertEqual(self._ids(dietary_restrictions=['kosher', 'halal'], dietary_match='all'), [])
+
+    def test_minimum_order_budget_cuisine_and_sort(self):
+        self.assertEqual(self._ids(), ['b', 'c', 'a'])
+        self.assertEqual(self.index.search(60)['catering_options'][0]['id'], 'd')
+        self.assertEqual(self._ids(budget_per_person=25000), ['b', 'c'])
+        self.assertEqual(self._ids(cuisine_type='Korean', sort_by='rating'), ['a', 'b'])
+        self.assertEqual(self._ids(cuisine_type='french'), [])
+
+    def test_invalid_dietary_match_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.index.search(10, dietary_restrictions=['vegan'], dietary_match='some')
+
+
+class GridIndexTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        # 서울 주변 약 40km 범위의 점과 좌표가 없는 행
+        self.lats = 37.55 + rng.uniform(-0.2, 0.2, 300)
+        self.lngs = 126.98 + rng.uniform(-0.25, 0.25, 300)
+        self.lats[::25] = np.nan
+        self.grid = GridIndex(self.lats, self.lngs, cell_km=1.0)
+        self.points = [(37.55, 126.98), (37.70, 127.20), (37.30, 126.70), (38.5, 128.0)]
+
+    def _distances(self, lat, lng):
+        distances = haversine_km(lat, lng, self.lats, self.lngs)
+        distances[np.isnan(distances)] = np.inf
+        return distances
+
+    def test_within_matches_brute_force(self):
+        for lat, lng in self.points:
+            for radius_km in (0.5, 3.0, 12.0):
+                rows, distances = self.grid.within(lat, lng, radius_km)
+                expected = np.flatnonzero(self._distances(lat, lng) <= radius_km)
+                with self.subTest(lat=lat, lng=lng, radius_km=radius_km):
+                    self.assertEqual(sorted(rows.tolist()), expected.tolist())
+                    np.testing.assert_allclose(distances, self._distances(lat, lng)[rows])
+
+    def test_nearest_matches_brute_force(self):
+        allowed = np.arange(300) % 3 != 0
+        for lat, lng in self.points:
+            for k in (1, 7, 50):
+                for mask in (None, allowed):
+                    distances = self._distances(lat, lng)
+                    if mask is not None:
+                        distances[~mask] = np.inf
+                    expected = np.sort(distances)[:k]
+                    rows, found = self.grid.nearest(lat, lng, k, mask)
+                    with self.subTest(lat=lat, lng=lng, k=k, masked=mask is not None):
+                        np.testing.assert_allclose(found, expected)
+                        self.assertTrue(np.all(np.diff(found) >= 0))
+                        if mask is not None:
+                            self.assertTrue(allowed[rows].all())
+
+    def test_nearest_returns_every_point_when_k_is_large(self):
+        rows, _ = self.grid.nearest(37.55, 126.98, 1000)
+        self.assertEqual(len(rows), len(self.grid))
+        self.assertFalse(np.isnan(self.lats[rows]).any())
+
+
+class ReciprocalRankFusionTests(SimpleTestCase):
+    def test_results_are_merged_by_collection_and_id(self):
+        vector = [{'collection': 'venues', 'id': 'a', 'vector_score': 0.9},
+                  {'collection': 'venues', 'id': 'b', 'vector_score': 0.8}]
+        lexical = [{'collection': 'venues', 'id': 'b', 'lexical_score': 3.0},
+                   {'collection': 'catering', 'id': 'a', 'lexical_score': 2.0}]
+
+        fused = reciprocal_rank_fusion([vector, lexical], k=60)
+
+        self.assertEqual([(r['collection'], r['id']) for r in fused],
+                         [('venues', 'b'), ('venues', 'a'), ('catering', 'a')])
+        self.assertEqual((fused[0]['vector_score'], fused[0]['lexical_score']), (0.8, 3.0))
+        self.assertAlmostEqual(fused[0]['score'], 1 / 62 + 1 / 61)
+
+
+class DiversifyTests(RAGTestMixin, SimpleTestCase):
+    def test_mmr_keeps_fused_order_as_relevance(self):
+        contents = ['야외 바베큐 파티', '호텔 뷔페', '보드게임 카페']
+        self.rag.ingest_documents('party_ideas', [{'id': f'idea-{i}', 'content': c} for i, c in enumerate(contents)])
+        query_embedding = self.embeddings.embed_query(contents[2])
+        # RRF 결합 순서는 코사인 순서(idea-2가 가장 유사)와 다름
+        results = [
+            {'collection': 'party_ideas', 'id': 'idea-0', 'score': 0.032},
+            {'collection': 'party_ideas', 'id': 'idea-1', 'score': 0.031},
+            {'collection': 'party_ideas', 'id': 'idea-2', 'score': 0.016},
+        ]
+
+        fused = self.rag._diversify(results, query_embedding, 3, True, 1.0, None, fused=True)
+        cosine = self.rag._diversify(results, query_embedding, 3, True, 1.0, None)
+
+        self.assertEqual([r['id'] for r in fused], ['idea-0', 'idea-1', 'idea-2'])
+        self.assertEqual(cosine[0]['id'], 'idea-2')
+
+
+class LexicalIndexHolderTests(SimpleTestCase):
+    def _wait_for(self, holder, generation):
+        for _ in range(500):
+            index = holder.get(generation)
+            if holder._generation == generation:
+                return index
+            time.sleep(0.01)
+        self.fail(f"{generation}세대 색인이 만들어지지 않음")
+
+    def test_rebuild_runs_in_background_and_serves_stale_index(self):
+        release = threading.Event()
+        documents = [{'id': 'a', 'content': '생일 케이크', 'collection': 'party_ideas', 'metadata': {}}]
+
+        def loader():
+            release.wait(5)
+            return list(documents)
+
+        holder = LexicalIndexHolder(loader)
+        self.assertIsNone(holder.get(1))
+        release.set()
+        first = self._wait_for(holder, 1)
+        self.assertEqual(len(first), 1)
+
+        # 새 세대 색인이 만들어지는 동안에는 기존 색인을 반환
+        release.clear()
+        documents.append({'id': 'b', 'content': '풍선 장식', 'collection': 'party_ideas', 'metadata': {}})
+        self.assertIs(holder.get(2), first)
+        release.set()
+        self.assertEqual(len(self._wait_for(holder, 2)), 2)
+
+
+class RecordingExporter:
+    def __init__(self):
+        self.exported = []
+
+    def export(self, spans):
+        self.exported.append(spans)
+
+
+class TracingTests(SimpleTestCase):
+    def _trace(self, trust_remote_sampled):
+        exporter = RecordingExporter()
+        tracer = Tracer(exporter, sample_rate=0.0, slow_sample_rate=0.0,
+                        trust_remote_sampled=trust_remote_sampled)
+        remote = SpanContext(trace_id='a' * 32, span_id='b' * 16, sampled=True)
+        with tracer.span('GET /', kind='SERVER', remote_parent=remote):
+            pass
+        return exporter.exported
+
+    def test_remote_sampled_flag_is_ignored_unless_trusted(self):
+        self.assertEqual(self._trace(trust_remote_sampled=False), [])
+        self.assertEqual(len(self._trace(trust_remote_sampled=True)), 1)
+
+    def test_traceparent_flag_follows_sampling_decision(self):
+        remote = SpanContext(trace_id='a' * 32, span_id='b' * 16, sampled=True)
+        for sample_rate, trust_remote_sampled, flag in ((0.0, False, '00'), (1.0, False, '01'), (0.0, True, '01')):
+            tracer = Tracer(RecordingExporter(), sample_rate=sample_rate, slow_sample_rate=sample_rate,
+                            trust_remote_sampled=trust_remote_sampled)
+            with tracer.span('GET /', kind='SERVER', remote_parent=remote) as root:
+                with tracer.span('child') as child:
+                    pass
+            with self.subTest(sample_rate=sample_rate, trust_remote_sampled=trust_remote_sampled):
+                self.assertTrue(root.traceparent.endswith(f'-{flag}'))
+                # 진행 중인 하위 span은 미리 정해진(신뢰하는 상위) 결정만 전파
+                self.assertEqual(child.sampled, trust_remote_sampled)
+
+    def test_exporter_writes_a_file_per_process(self):
+        exporter = JsonFileSpanExporter('/var/traces/spans.jsonl')
+
+        self.assertEqual(exporter.file_path(), f'/var/traces/spans.{os.getpid()}.jsonl')
+
+
+class AcceptEncodingTests(SimpleTestCase):
+    def test_quality_values_are_respected(self):
+        self.assertTrue(accepts_gzip('gzip, deflate, br'))
+        self.assertTrue(accepts_gzip('br;q=1.0, gzip;q=0.5'))
+        self.assertFalse(accepts_gzip('gzip;q=0'))
+        self.assertFalse(accepts_gzip('gzip; q=0.0, identity'))
+        self.assertFalse(accepts_gzip('deflate, br'))
+
+    def test_wildcard_applies_only_when_gzip_is_not_listed(self):
+        self.assertTrue(accepts_gzip('*'))
+        self.assertFalse(accepts_gzip('*;q=0'))
+        self.assertFalse(accepts_gzip('gzip;q=0, *'))
+
+
+class FakeClientSession:
+    """호출마다 정해진 동작을 하는 MCP 세션"""
+
+    def __init__(self, behaviour):
+        self.behaviour = behaviour
+        self.calls = 0
+
+    async def call(self):
+        self.calls += 1
+        if self.behaviour == 'dead':
+            raise ConnectionError("server exited")
+        if self.behaviour == 'hang':
+            await asyncio.sleep(10)
+        return 'ok'
+
+
+class RemoteSessionPoolTests(SimpleTestCase):
+    def _provider(self, *behaviours):
+        provider = RemoteMCPProvider('t', command='unused', timeout=0.05, startup_timeout=0.2)
+        provider._sessions = []
+        for index, behaviour in enumerate(behaviours):
+            pooled = _PooledSession(provider, index)
+            if behaviour == 'failed':
+                pooled.start_failed = True
+            else:
+                pooled.session = FakeClientSession(behaviour)
+            provider._sessions.append(pooled)
+        return provider
+
+    def _request(self, provider):
+        async def run():
+            provider._capacity = asyncio.Semaphore(4)
+            return await provider._request(lambda session: session.call())
+        return asyncio.run(run())
+
+    def test_connection_error_is_retried_on_another_session(self):
+        provider = self._provider('dead', 'alive')
+        dead = provider._sessions[0]
+
+        self.assertEqual(self._request(provider), 'ok')
+        # 끊긴 세션은 제외되고 다시 시작 요청을 받음
+        self.assertIsNone(dead.session)
+        self.assertTrue(dead._wake.is_set())
+
+    def test_timed_out_session_is_restarted(self):
+        provider = self._provider('hang', 'alive')
+        hung = provider._sessions[0]
+
+        with self.assertRaises(TimeoutError):
+            self._request(provider)
+        self.assertIsNone(hung.session)
+        self.assertTrue(hung._wake.is_set())
+
+    def test_failed_start_fails_fast(self):
+        provider = self._provider('failed')
+
+        with self.assertRaisesRegex(ConnectionError, 'failed to start'):
+            self._request(provider)
@@ -0,0 +1,114 @@
+# ai_service/text_splitting.py
+
+import re
+from functools import lru_cache
+from typing import List
+
+import tiktoken
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# 문단 → 줄 → 문장 경계 순으로 자르고, 그래도 길면 공백 단위로 자름
+_SEGMENT_PATTERN = re.compile(r'.*?(?:\n\s*\n|\n|(?<=[.!?。])\s+|$)', re.S)
+_WORD_PATTERN = re.compile(r'\S+\s*')
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str = DEFAULT_ENCODING) -> tiktoken.Encoding:
+    """tiktoken 인코더 (프로세스당 한 번만 로드)"""
+    return tiktoken.get_encoding(name)
+
+
+class TokenTextSplitter:
+    """토큰 수 기준 텍스트 분할기
+
+    한국어는 글자 수와 토큰 수의 비율이 일정하지 않아 글자 수 기준 분할은 청크 크기가
+    들쭉날쭉합니다. 문단/문장 경계를 유지하며 chunk_tokens 이하로 묶고,
+    앞 청크의 끝 문장들을 overlap_tokens 이내에서만 다음 청크에 겹칩니다.
+    """
+
+    def __init__(self, chunk_tokens: int = 500, overlap_tokens: int = 50,
+                 encoding_name: str = DEFAULT_ENCODING):
+        if overlap_tokens >= chunk_tokens:
+            raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.encoding_name = encoding_name
+
+    @property
+    def encoding(self) -> tiktoken.Encoding:
+        # 실제로 분할할 때 처음 로드 (이후에는 lru_cache로 재사용)
+        return get_encoding(self.encoding_name)
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode_ordinary(text))
+
+    def split_text(self, text: str) -> List[str]:
+        return self.split_texts([text])[0]
+
+    def split_texts(self, texts: List[str]) -> List[List[str]]:
+        """여러 문서를 한 번에 분할 (토큰화는 배치로 수행)"""
+        counts = [len(tokens) for tokens in self.encoding.encode_ordinary_batch(texts)]
+        return [
+            ([text.strip()] if text.strip() else []) if count <= self.chunk_tokens else self._split_long(text)
+            for text, count in zip(texts, counts)
+        ]
+
+    def _segments(self, text: str) -> List[str]:
+        segments = [s for s in _SEGMENT_PATTERN.findall(text) if s]
+        lengths = [len(tokens) for tokens in self.encoding.encode_ordinary_batch(segments)]
+
+        result = []
+        for segment, length in zip(segments, lengths):
+            if length <= self.chunk_tokens:
+                result.append((segment, length))
+            else:
+                result.extend(self._split_oversized(segment))
+        return result
+
+    def _split_oversized(self, segment: str) -> List[tuple]:
+        """청크보다 긴 문장은 어절 단위로, 어절도 길면 토큰 단위로 자름"""
+        pieces = []
+        words = _WORD_PATTERN.findall(segment)
+        for word, length in zip(words, map(len, self.encoding.encode_ordinary_batch(words))):
+            if length <= self.chunk_tokens:
+                pieces.append((word, length))
+                continue
+            # 토큰 경계로 자르면 한글이 바이트 중간에서 깨질 수 있어 글자 단위로 자름
+            step = max(1, self.chunk_tokens * len(word) // length)
+            start = 0
+            while start < len(word):
+                piece = word[start:start + step]
+                piece_tokens = self.count_tokens(piece)
+                while piece_tokens > self.chunk_tokens and len(piece) > 1:
+                    piece = piece[:max(1, len(piece) * self.chunk_tokens // piece_tokens)]
+                    piece_tokens = self.count_tokens(piece)
+                pieces.append((piece, piece_tokens))
+                start += len(piece)
+        return pieces
+
+    def _split_long(self, text: str) -> List[str]:
+        chunks: List[str] = []
+        current: List[tuple] = []
+        current_tokens = 0
+
+        for segment, length in self._segments(text):
+            if current and current_tokens + length > self.chunk_tokens:
+                chunks.append(''.join(s for s, _ in current).strip())
+                # 끝 부분을 overlap_tokens 이내에서 다음 청크로 넘김
+                overlap: List[tuple] = []
+                overlap_tokens = 0
+                for piece in reversed(current):
+                    if overlap_tokens + piece[1] > self.overlap_tokens:
+                        break
+                    overlap.insert(0, piece)
+                    overlap_tokens += piece[1]
+                if overlap_tokens + length > self.chunk_tokens:
+                    overlap, overlap_tokens = [], 0
+                current, current_tokens = overlap, overlap_tokens
+            current.append((segment, length))
+            current_tokens += length
+
+        if current:
+            chunks.append(''.join(s for s, _ in current).strip())
+        return [chunk for chunk in chunks if chunk]
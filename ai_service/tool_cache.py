@@ -0,0 +1,163 @@
+# ai_service/tool_cache.py
+
+import copy
+import json
+import time
+import hashlib
+import threading
+import logging
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from cachetools import LRUCache
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 결과를 캐시하는 로컬 프로바이더 이름 (외부 MCP 서버의 도구는 캐시하지 않음)
+LOCAL_PROVIDER = 'party_planning'
+
+# 로컬 도구별 결과 유지 시간 (초). 목록에 없는 도구는 캐시하지 않음
+DEFAULT_TOOL_TTLS = {
+    'check_weather': 30 * 60,
+    'search_venues': 24 * 60 * 60,
+    'get_catering_options': 6 * 60 * 60,
+    'generate_timeline': 24 * 60 * 60,
+}
+
+FRESH = 'fresh'
+STALE = 'stale'
+
+
+@dataclass
+class _Entry:
+    value: Any
+    stored_at: float
+    ttl: float
+
+
+def canonical_arguments(arguments: Optional[Dict[str, Any]],
+                        defaults: Optional[Dict[str, Any]] = None) -> str:
+    """인자를 키 순서/공백과 무관한 JSON 문자열로 변환
+
+    None 값은 생략한 것으로 보고, 생략한 인자는 스키마 기본값으로 채워 기본값을 명시한
+    호출과 같은 문자열이 되게 합니다.
+    """
+    cleaned = dict(defaults or {})
+    cleaned.update({k: v for k, v in (arguments or {}).items() if v is not None})
+    return json.dumps(cleaned, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+class ToolResultCache:
+    """MCP 도구 호출 결과 캐시
+
+    TTL 정책은 (프로바이더, 도구) 단위이며 ttls에는 로컬 프로바이더(LOCAL_PROVIDER) 도구의
+    TTL을 지정합니다. 도구별 TTL이 지나면 stale 상태가 되고, TTL * stale_ratio 동안은 오래된 결과를
+    바로 돌려주면서 백그라운드에서 새로 가져옵니다. 그 이후에는 캐시 미스로 처리합니다.
+    항목 수는 max_entries로 제한하며 가장 오래 쓰이지 않은 항목부터 제거합니다.
+    오류 결과는 저장하지 않습니다.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttls: Optional[Dict[str, float]] = None,
+                 stale_ratio: float = 0.5, enabled: bool = True):
+        self.enabled = enabled
+        self.ttls: Dict[Tuple[str, str], float] = {
+            (LOCAL_PROVIDER, tool_name): ttl
+            for tool_name, ttl in (DEFAULT_TOOL_TTLS if ttls is None else ttls).items()
+        }
+        self.stale_ratio = stale_ratio
+        self._entries: LRUCache = LRUCache(maxsize=max_entries)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Counter] = defaultdict(Counter)
+
+    @classmethod
+    def from_settings(cls) -> 'ToolResultCache':
+        return cls(
+            max_entries=getattr(settings, 'MCP_CACHE_MAX_ENTRIES', 1024),
+            ttls={**DEFAULT_TOOL_TTLS, **getattr(settings, 'MCP_CACHE_TTLS', {})},
+            stale_ratio=getattr(settings, 'MCP_CACHE_STALE_RATIO', 0.5),
+            enabled=getattr(settings, 'MCP_CACHE_ENABLED', True),
+        )
+
+    def ttl_for(self, provider_name: str, tool_name: str) -> Optional[float]:
+        """도구의 TTL (캐시하지 않는 도구이거나 캐시가 꺼져 있으면 None)"""
+        if not self.enabled:
+            return None
+        ttl = self.ttls.get((provider_name, tool_name))
+        return ttl if ttl and ttl > 0 else None
+
+    def make_key(self, provider_name: str, tool_name: str, arguments: Optional[Dict[str, Any]],
+                 defaults: Optional[Dict[str, Any]] = None) -> Tuple[str, str, str]:
+        digest = hashlib.sha256(canonical_arguments(arguments, defaults).encode('utf-8')).hexdigest()
+        return provider_name, tool_name, digest
+
+    def lookup(self, key: Tuple[str, str, str]) -> Tuple[Any, Optional[str]]:
+        """(결과 복사본, FRESH/STALE) 또는 (None, None)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            age = now - entry.stored_at
+            if age < entry.ttl:
+                state = FRESH
+            elif age < entry.ttl * (1 + self.stale_ratio):
+                state = STALE
+            else:
+                del self._entries[key]
+                return None, None
+        # 호출하는 쪽에서 결과를 수정해도 캐시에 영향이 없도록 복사
+        return copy.deepcopy(entry.value), state
+
+    def store(self, key: Tuple[str, str, str], value: Any):
+        if isinstance(value, dict) and 'error' in value:
+            return
+        ttl = self.ttl_for(key[0], key[1])
+        if ttl is None:
+            return
+        with self._lock:
+            self._entries[key] = _Entry(copy.deepcopy(value), time.monotonic(), ttl)
+
+    def begin_refresh(self, key: Tuple[str, str, str]) -> bool:
+        """같은 항목의 백그라운드 갱신이 이미 진행 중이면 False"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: Tuple[str, str, str]):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def record(self, tool_name: str, event: str):
+        with self._lock:
+            self._stats[tool_name][event] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """도구별 적중/미스 통계"""
+        with self._lock:
+            tools = {}
+            for tool_name, counter in self._stats.items():
+                lookups = counter['hits'] + counter['stale_hits'] + counter['misses']
+                tools[tool_name] = {
+                    'hits': counter['hits'],
+                    'stale_hits': counter['stale_hits'],
+                    'misses': counter['misses'],
+                    'refreshes': counter['refreshes'],
+                    'refresh_errors': counter['refresh_errors'],
+                    'hit_rate': round((counter['hits'] + counter['stale_hits']) / lookups, 4) if lookups else 0.0,
+                    'ttl_seconds': self.ttls.get((LOCAL_PROVIDER, tool_name)),
+                }
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self._entries.maxsize,
+                'tools': tools,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,376 @@
+# ai_service/tracing.py
+
+import os
+import json
+import time
+import queue
+import random
+import inspect
+import secrets
+import threading
+import functools
+import contextvars
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kind 코드
+SPAN_KINDS = {'INTERNAL': 1, 'SERVER': 2, 'CLIENT': 3}
+
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar(
+    'ai_current_span', default=None
+)
+
+
+@dataclass
+class SpanContext:
+    """원격(상위 서비스)에서 전달받은 trace 컨텍스트"""
+    trace_id: str
+    span_id: str
+    sampled: bool = False
+
+
+@dataclass
+class Span:
+    """단일 작업 구간"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    kind: str = 'INTERNAL'
+    start_ns: int = 0
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    # 이 프로세스에서 시작된 trace의 루트인지 여부
+    is_local_root: bool = False
+    # 상위 서비스의 샘플링 결정
+    remote_sampled: bool = False
+    # 이 trace의 샘플링 여부 (신뢰하는 상위 결정이 있으면 시작 시, 아니면 로컬 루트가 끝날 때 결정)
+    sampled: bool = False
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1_000_000
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent 헤더 값 (샘플링되지 않은 trace는 sampled 플래그 00)"""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_otlp(self) -> Dict:
+        """OTLP/JSON span 표현"""
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': SPAN_KINDS.get(self.kind, 1),
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            'status': {'code': 2, 'message': self.error} if self.error else {'code': 1},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[SpanContext]:
+    """W3C traceparent 헤더 파싱 (형식이 잘못되면 None)"""
+    if not header:
+        return None
+    parts = header.strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    return SpanContext(trace_id=parts[1], span_id=parts[2], sampled=bool(flags & 0x01))
+
+
+class JsonFileSpanExporter:
+    """OTLP/JSON 형식으로 span을 파일에 한 줄씩 기록
+
+    OpenTelemetry Collector의 otlpjsonfile 리시버로 그대로 읽을 수 있습니다.
+    파일 쓰기는 백그라운드 스레드에서 처리하며, 여러 워커가 같은 파일을 교체(rotate)하지
+    않도록 프로세스마다 path에 PID를 붙인 파일(spans.<pid>.jsonl)에 기록합니다.
+    """
+
+    def __init__(self, path: str, service_name: str = 'get2-backend', max_bytes: int = 50 * 1024 * 1024):
+        self.path = path
+        self.service_name = service_name
+        self.max_bytes = max_bytes
+        self._queue: 'queue.Queue[List[Span]]' = queue.Queue(maxsize=1000)
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            logger.warning("trace 내보내기 대기열이 가득 차 span을 버립니다.")
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is not None and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._write_loop, name='ai-trace-exporter', daemon=True)
+            self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while not self._queue.empty() and len(batch) < 100:
+                batch.append(self._queue.get_nowait())
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error(f"trace 내보내기 오류: {e}")
+
+    def file_path(self) -> str:
+        """현재 프로세스가 기록하는 파일 경로 (fork 후에도 맞도록 매번 PID로 계산)"""
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{os.getpid()}{ext}"
+
+    def _write(self, batch: List[List[Span]]):
+        path = self.file_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) > self.max_bytes:
+            os.replace(path, path + '.1')
+
+        with open(path, 'a', encoding='utf-8') as f:
+            for spans in batch:
+                payload = {
+                    'resourceSpans': [{
+                        'resource': {'attributes': [_otlp_attribute('service.name', self.service_name)]},
+                        'scopeSpans': [{
+                            'scope': {'name': 'ai_service.tracing'},
+                            'spans': [span.to_otlp() for span in spans],
+                        }],
+                    }]
+                }
+                f.write(json.dumps(payload, ensure_ascii=False) + '\n')
+
+
+class Tracer:
+    """경량 분산 추적기
+
+    span은 trace 단위로 모아 두었다가 로컬 루트 span이 끝날 때 샘플링 여부를 결정합니다
+    (tail sampling). 느린 요청은 더 높은 비율로 샘플링됩니다. 요청 traceparent의 sampled
+    플래그는 클라이언트가 임의로 켤 수 있으므로 trust_remote_sampled일 때만 따릅니다.
+    """
+
+    def __init__(self, exporter: Optional[JsonFileSpanExporter], enabled: bool = True,
+                 sample_rate: float = 0.1, slow_threshold_ms: float = 5000,
+                 slow_sample_rate: float = 1.0, max_pending_traces: int = 1000,
+                 trust_remote_sampled: bool = False):
+        self.exporter = exporter
+        self.trust_remote_sampled = trust_remote_sampled
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_threshold_ms = slow_threshold_ms
+        self.slow_sample_rate = slow_sample_rate
+        self.max_pending_traces = max_pending_traces
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[Span]] = {}
+
+    @classmethod
+    def from_settings(cls) -> 'Tracer':
+        path = getattr(settings, 'TRACE_EXPORT_PATH', os.path.join(settings.BASE_DIR, 'traces', 'spans.jsonl'))
+        return cls(
+            exporter=JsonFileSpanExporter(str(path)),
+            enabled=getattr(settings, 'TRACE_ENABLED', True),
+            sample_rate=getattr(settings, 'TRACE_SAMPLE_RATE', 0.1),
+            slow_threshold_ms=getattr(settings, 'TRACE_SLOW_THRESHOLD_MS', 5000),
+            slow_sample_rate=getattr(settings, 'TRACE_SLOW_SAMPLE_RATE', 1.0),
+            trust_remote_sampled=getattr(settings, 'TRACE_TRUST_REMOTE_SAMPLED', False),
+        )
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def _new_span(self, name: str, kind: str, parent: Optional[Span],
+                  remote: Optional[SpanContext], attributes: Dict) -> Span:
+        if parent is not None:
+            return Span(name=name, trace_id=parent.trace_id, span_id=secrets.token_hex(8),
+                        parent_id=parent.span_id, kind=kind, attributes=attributes,
+                        sampled=parent.sampled)
+        if remote is not None:
+            return Span(name=name, trace_id=remote.trace_id, span_id=secrets.token_hex(8),
+                        parent_id=remote.span_id, kind=kind, attributes=attributes,
+                        is_local_root=True, remote_sampled=remote.sampled,
+                        sampled=remote.sampled and self.trust_remote_sampled)
+        return Span(name=name, trace_id=secrets.token_hex(16), span_id=secrets.token_hex(8),
+                    kind=kind, attributes=attributes, is_local_root=True)
+
+    @contextmanager
+    def span(self, name: str, kind: str = 'INTERNAL', remote_parent: Optional[SpanContext] = None,
+             **attributes):
+        """현재 컨텍스트의 하위 span을 열고 블록이 끝나면 닫음"""
+        if not self.enabled:
+            yield None
+            return
+
+        span = self._new_span(name, kind, _current_span.get(), remote_parent, attributes)
+        span.start_ns = time.time_ns()
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self._finish(span)
+
+    def record_span(self, name: str, parent: Optional[Span], start_ns: int, end_ns: int,
+                    kind: str = 'INTERNAL', error: Optional[str] = None, **attributes):
+        """이미 끝난 작업을 span으로 기록 (콜백 기반 계측용)"""
+        if not self.enabled or parent is None:
+            return
+        span = self._new_span(name, kind, parent, None, attributes)
+        span.start_ns, span.end_ns, span.error = start_ns, end_ns, error
+        self._finish(span)
+
+    def traced(self, name: Optional[str] = None, kind: str = 'INTERNAL'):
+        """함수 실행을 span으로 감싸는 데코레이터 (동기/비동기 모두 지원)"""
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name, kind=kind):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, kind=kind):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _finish(self, span: Span):
+        with self._lock:
+            spans = self._pending.setdefault(span.trace_id, [])
+            spans.append(span)
+            if not span.is_local_root:
+                # 루트가 끝나지 않은 채 남은 trace가 쌓이지 않도록 제한
+                if len(self._pending) > self.max_pending_traces:
+                    self._pending.pop(next(iter(self._pending)))
+                return
+            self._pending.pop(span.trace_id, None)
+
+        span.sampled = self._should_sample(span)
+        if span.sampled and self.exporter is not None:
+            self.exporter.export(spans)
+
+    def _should_sample(self, root: Span) -> bool:
+        if root.sampled:
+            return True
+        rate = self.slow_sample_rate if root.duration_ms >= self.slow_threshold_ms else self.sample_rate
+        return random.random() < rate
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """LangChain 모델 호출을 현재 span의 하위 span으로 기록"""
+
+    run_inline = True
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self._runs: Dict[Any, Tuple[Optional[Span], int, str]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        params = kwargs.get('invocation_params') or {}
+        model = params.get('model_name') or params.get('model') or ''
+        self._runs[run_id] = (self.tracer.current_span(), time.time_ns(), model)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        parent, start_ns, model = run
+        token_usage = (response.llm_output or {}).get('token_usage') or {}
+        self.tracer.record_span(
+            'llm.chat', parent, start_ns, time.time_ns(), kind='CLIENT',
+            **{
+                'llm.model': model,
+                'llm.prompt_tokens': token_usage.get('prompt_tokens', 0),
+                'llm.completion_tokens': token_usage.get('completion_tokens', 0),
+            }
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        parent, start_ns, model = run
+        self.tracer.record_span(
+            'llm.chat', parent, start_ns, time.time_ns(), kind='CLIENT',
+            error=f"{type(error).__name__}: {error}", **{'llm.model': model}
+        )
+
+
+class TracingMiddleware:
+    """요청 단위 루트 span 생성 및 traceparent 헤더 전파"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        remote_parent = parse_traceparent(request.META.get('HTTP_TRACEPARENT'))
+        with tracer.span(
+            f"{request.method} {request.path}",
+            kind='SERVER',
+            remote_parent=remote_parent,
+            **{'http.method': request.method, 'http.target': request.path}
+        ) as span:
+            response = self.get_response(request)
+            if span is not None:
+                match = getattr(request, 'resolver_match', None)
+                if match is not None:
+                    span.name = f"{request.method} {match.route}"
+                    span.set_attribute('http.route', match.route)
+                span.set_attribute('http.status_code', response.status_code)
+                if response.status_code >= 500:
+                    span.error = f"HTTP {response.status_code}"
+        # 샘플링은 루트 span이 끝날 때 결정되므로 그 뒤에 헤더를 붙임
+        if span is not None:
+            response['traceparent'] = span.traceparent
+        return response
+
+
+# 전역 추적기 인스턴스
+tracer = Tracer.from_settings()
+tracing_callback = TracingCallbackHandler(tracer)
@@ -13,6 +13,21 @@ urlpatterns = [
     
     # 파티 플래닝 전용 엔드포인트
     path('party/plan/', views.plan_party, name='plan_party'),
+    path('party/budget/scenarios/', views.budget_scenario_matrix, name='budget_scenario_matrix'),
+    
+    # 토큰 사용량 요약
+    path('usage/', views.usage_summary, name='usage_summary'),
+    
+    # 지식 베이스 관리 (관리자 전용)
+    path('knowledge/stats/', views.knowledge_stats, name='knowledge_stats'),
+    path('knowledge/compact/', views.knowledge_compact, name='knowledge_compact'),
+    path('knowledge/<str:collection_type>/documents/', views.knowledge_documents, name='knowledge_documents'),
+    
+    # MCP 도구 캐시 통계 (관리자 전용)
+    path('mcp/cache/stats/', views.mcp_cache_stats, name='mcp_cache_stats'),
+    
+    # MCP 카탈로그 리소스 (ETag/gzip 지원)
+    path('mcp/resources/<path:resource_path>', views.mcp_resource, name='mcp_resource'),
     
     # 서비스 상태 확인
     path('health/', views.health_check, name='health_check'),
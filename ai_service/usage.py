@@ -0,0 +1,311 @@
+# ai_service/usage.py
+
+import time
+import threading
+import contextvars
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Sum
+from django.utils import timezone
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+# 현재 요청의 사용량 귀속 대상 (subject, endpoint)
+_usage_scope: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar(
+    'ai_usage_scope', default=None
+)
+
+# 메모리에 사용량 누계를 두는 subject 수가 이보다 많아지면 만료된 항목을 정리
+MAX_CACHED_SUBJECTS = 10000
+
+
+@dataclass
+class UsageEvent:
+    """LLM 호출 1회의 토큰 사용량"""
+    subject: str
+    endpoint: str
+    node: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    created_at: datetime
+
+
+class UsageLedger:
+    """토큰 사용량 원장
+
+    DB 기록은 백그라운드 스레드에서 모아서 bulk_create 하고, 쿼터 검사는 DB 합계에
+    이 프로세스에서 아직 저장하지 않은 사용량을 더해 계산하므로 모든 워커의 사용량이 반영됩니다.
+    DB 합계는 subject별로 cache_ttl초 동안 메모리에 두고, 그동안 이 프로세스가 저장한
+    사용량은 합계에 바로 더해 요청마다 DB를 조회하지 않습니다.
+    DB 저장이 계속 실패하면 대기열은 max_pending건까지만 유지하고 오래된 기록부터 버립니다.
+    """
+
+    def __init__(self, flush_size: int = 50, flush_interval: float = 5.0,
+                 cache_ttl: float = 10.0, max_pending: int = 10000):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.cache_ttl = cache_ttl
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending: List[UsageEvent] = []
+        # subject -> (만료 시각, 하루 시작 시각, DB 저장된 사용량 누계)
+        self._stored: Dict[str, Tuple[float, datetime, int]] = {}
+        # 저장 성공 횟수 (DB 조회 중에 저장된 기록이 누계에서 빠지지 않도록 확인)
+        self._saves = 0
+        # DB에 저장하는 중인 기록 (저장이 끝날 때까지 쿼터 계산에 포함)
+        self._flushing: List[UsageEvent] = []
+        self._wakeup = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    # ---- 기록 ----
+
+    def record(self, subject: str, endpoint: str, node: str, model: str,
+               prompt_tokens: int, completion_tokens: int):
+        """사용량을 DB 기록 대기열에 추가"""
+        now = timezone.now()
+        with self._lock:
+            self._pending.append(UsageEvent(
+                subject=subject,
+                endpoint=endpoint,
+                node=node[:50],
+                model=model[:100],
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                created_at=now,
+            ))
+            self._trim_pending()
+            should_flush = len(self._pending) >= self.flush_size
+        self._ensure_flusher()
+        if should_flush:
+            self._wakeup.set()
+
+    def flush(self):
+        """대기 중인 사용량 기록을 DB에 저장"""
+        from .models import AIUsageRecord
+
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._flushing = self._flushing + pending
+        if not pending:
+            return
+        saved = False
+        try:
+            AIUsageRecord.objects.bulk_create([
+                AIUsageRecord(
+                    subject=e.subject,
+                    endpoint=e.endpoint,
+                    node=e.node,
+                    model=e.model,
+                    prompt_tokens=e.prompt_tokens,
+                    completion_tokens=e.completion_tokens,
+                    created_at=e.created_at,
+                )
+                for e in pending
+            ])
+            saved = True
+        except Exception as e:
+            logger.error(f"사용량 기록 저장 오류: {e}")
+            # 다음 주기에 재시도
+            with self._lock:
+                self._pending = pending + self._pending
+                self._trim_pending()
+        finally:
+            with self._lock:
+                self._flushing = [e for e in self._flushing if all(e is not p for p in pending)]
+                if saved:
+                    self._saves += 1
+                    self._add_to_stored(pending)
+
+    def _trim_pending(self):
+        """대기열이 max_pending을 넘으면 오래된 기록부터 버림 (self._lock 안에서 호출)"""
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            del self._pending[:overflow]
+            logger.warning(f"사용량 기록 대기열이 가득 차 오래된 기록 {overflow}건을 버렸습니다")
+
+    def _add_to_stored(self, events: List[UsageEvent]):
+        """저장된 사용량을 메모리 누계에 반영 (self._lock 안에서 호출)"""
+        for e in events:
+            cached = self._stored.get(e.subject)
+            if cached is not None and e.created_at >= cached[1]:
+                expires_at, day_start, total = cached
+                self._stored[e.subject] = (expires_at, day_start, total + e.prompt_tokens + e.completion_tokens)
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name='ai-usage-flusher', daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+    # ---- 쿼터 ----
+
+    def get_daily_limit(self, subject: str) -> int:
+        """subject의 일일 토큰 한도 (0이면 무제한)"""
+        if subject.startswith('user:'):
+            return getattr(settings, 'AI_DAILY_TOKEN_QUOTA', 0)
+        return getattr(settings, 'AI_ANON_DAILY_TOKEN_QUOTA', 0)
+
+    def used_today(self, subject: str) -> int:
+        """오늘 사용한 토큰 수 (DB 합계 + 이 프로세스에서 아직 저장되지 않은 사용량)
+
+        다른 워커의 사용량은 저장된 뒤 메모리 누계가 만료되면(최대 AI_USAGE_FLUSH_INTERVAL +
+        AI_USAGE_CACHE_TTL초) 반영됩니다.
+        """
+        day_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        with self._lock:
+            unsaved = sum(
+                e.prompt_tokens + e.completion_tokens
+                for e in self._flushing + self._pending
+                if e.subject == subject and e.created_at >= day_start
+            )
+            cached = self._stored.get(subject)
+            saves = self._saves
+        if cached is not None and cached[0] > time.monotonic() and cached[1] == day_start:
+            return cached[2] + unsaved
+
+        from .models import AIUsageRecord
+        try:
+            # created_at__date 대신 범위 조건을 써야 (subject, created_at) 인덱스를 탐
+            totals = AIUsageRecord.objects.filter(
+                subject=subject, created_at__gte=day_start
+            ).aggregate(prompt=Sum('prompt_tokens'), completion=Sum('completion_tokens'))
+        except Exception as e:
+            logger.warning(f"사용량 조회 실패 ({subject}): {e}")
+            return unsaved
+        stored = (totals['prompt'] or 0) + (totals['completion'] or 0)
+        with self._lock:
+            if self._saves == saves:
+                self._stored[subject] = (time.monotonic() + self.cache_ttl, day_start, stored)
+            if len(self._stored) > MAX_CACHED_SUBJECTS:
+                now = time.monotonic()
+                self._stored = {k: v for k, v in self._stored.items() if v[0] > now}
+        return stored + unsaved
+
+    def check_quota(self, subject: str) -> Tuple[bool, int, int]:
+        """(허용 여부, 오늘 사용량, 일일 한도) 반환"""
+        limit = self.get_daily_limit(subject)
+        used = self.used_today(subject)
+        return (limit <= 0 or used < limit), used, limit
+
+    # ---- 조회 ----
+
+    def summary(self, day: Optional[date] = None, subject: Optional[str] = None) -> List[Dict]:
+        """일자별 subject/endpoint/node 사용량 집계"""
+        from .models import AIUsageRecord
+
+        self.flush()
+        day = day or timezone.now().date()
+        queryset = AIUsageRecord.objects.filter(created_at__date=day)
+        if subject:
+            queryset = queryset.filter(subject=subject)
+
+        rows = (
+            queryset.values('subject', 'endpoint', 'node')
+            .annotate(prompt_tokens=Sum('prompt_tokens'), completion_tokens=Sum('completion_tokens'))
+            .order_by('subject', 'endpoint', 'node')
+        )
+        return [
+            {**row, 'total_tokens': row['prompt_tokens'] + row['completion_tokens']}
+            for row in rows
+        ]
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """LangChain 콜백으로 모델 호출의 토큰 사용량을 원장에 기록"""
+
+    run_inline = True
+
+    def __init__(self, ledger: UsageLedger):
+        self.ledger = ledger
+        self._nodes: Dict = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._nodes[run_id] = (metadata or {}).get('langgraph_node', '')
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._nodes.pop(run_id, None)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        node = self._nodes.pop(run_id, '')
+        scope = _usage_scope.get()
+        if scope is None:
+            return
+
+        llm_output = response.llm_output or {}
+        token_usage = llm_output.get('token_usage') or {}
+        prompt_tokens = token_usage.get('prompt_tokens', 0)
+        completion_tokens = token_usage.get('completion_tokens', 0)
+        if not prompt_tokens and not completion_tokens:
+            return
+
+        subject, endpoint = scope
+        self.ledger.record(
+            subject=subject,
+            endpoint=endpoint,
+            node=node,
+            model=llm_output.get('model_name', ''),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+        )
+
+
+@contextmanager
+def usage_scope(subject: str, endpoint: str):
+    """블록 안에서 발생한 LLM 호출을 subject/endpoint에 귀속"""
+    token = _usage_scope.set((subject, endpoint))
+    try:
+        yield
+    finally:
+        _usage_scope.reset(token)
+
+
+def get_client_ip(request) -> str:
+    """클라이언트 IP
+
+    X-Forwarded-For의 앞쪽 값은 클라이언트가 임의로 넣을 수 있으므로, 신뢰하는 프록시 수
+    (AI_TRUSTED_PROXY_COUNT)만큼 오른쪽에서 센 값(마지막 프록시가 추가한 값)만 사용합니다.
+    0이면 X-Forwarded-For를 무시하고 REMOTE_ADDR를 사용합니다.
+    """
+    proxy_count = getattr(settings, 'AI_TRUSTED_PROXY_COUNT', 0)
+    if proxy_count > 0:
+        hops = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+        if len(hops) >= proxy_count:
+            return hops[-proxy_count]
+    return request.META.get('REMOTE_ADDR', 'unknown')
+
+
+def get_usage_subject(request) -> str:
+    """요청의 사용량 귀속 대상 (로그인 사용자 또는 클라이언트 IP)"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+
+    return f"ip:{get_client_ip(request)}"
+
+
+# 전역 사용량 원장 인스턴스
+usage_ledger = UsageLedger(
+    flush_size=getattr(settings, 'AI_USAGE_FLUSH_SIZE', 50),
+    flush_interval=getattr(settings, 'AI_USAGE_FLUSH_INTERVAL', 5.0),
+    cache_ttl=getattr(settings, 'AI_USAGE_CACHE_TTL', 10.0),
+    max_pending=getattr(settings, 'AI_USAGE_MAX_PENDING', 10000),
+)
+usage_callback = UsageCallbackHandler(usage_ledger)
@@ -0,0 +1,832 @@
+# ai_service/vector_index.py
+
+import os
+import json
+import time
+import threading
+import logging
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Set
+
+import numpy as np
+from django.conf import settings
+from filelock import FileLock
+
+from .quantization import SCAN_BLOCK_ROWS, quantize_int8, search_int8, top_k_indices
+
+logger = logging.getLogger(__name__)
+
+# 문서 ID 최대 길이 (NumpyVectorIndex의 고정폭 ID 열)
+MAX_ID_BYTES = 64
+
+
+class VectorIndex(ABC):
+    """벡터 인덱스 백엔드 추상 클래스
+
+    검색 결과는 {'id', 'content', 'metadata', 'score', 'collection'} 딕셔너리 목록입니다.
+    ID로 조회/삭제/교체하는 메서드는 모두 collection_type 안의 문서에만 적용됩니다.
+    """
+
+    @abstractmethod
+    def existing_ids(self, collection_type: str, ids: List[str]) -> Set[str]:
+        """이미 저장된 문서 ID"""
+        pass
+
+    @abstractmethod
+    def upsert(self, collection_type: str, ids: List[str], embeddings: List[List[float]],
+               documents: List[str], metadatas: List[Dict]):
+        """문서 추가 또는 교체"""
+        pass
+
+    @abstractmethod
+    def update_metadata(self, collection_type: str, ids: List[str], metadatas: List[Dict]):
+        """임베딩은 그대로 두고 메타데이터만 갱신"""
+        pass
+
+    @abstractmethod
+    def delete(self, collection_type: str, ids: List[str]):
+        """문서 삭제"""
+        pass
+
+    @abstractmethod
+    def query(self, query_embedding: List[float], collection_types: List[str], top_k: int) -> List[Dict]:
+        """유사도 상위 top_k 문서 검색 (점수 내림차순)"""
+        pass
+
+    def remove_duplicates(self, collection_type: str, content: str, keep_id: str) -> int:
+        """같은 내용이 다른 ID로 저장된 문서 제거 (제거한 개수 반환)"""
+        return 0
+
+    @abstractmethod
+    def get_embeddings(self, collection_type: str, ids: List[str]) -> Dict[str, List[float]]:
+        """저장된 문서 임베딩 조회 (없는 ID는 제외)"""
+        pass
+
+    @abstractmethod
+    def get_contents(self, collection_type: str, ids: List[str]) -> Dict[str, str]:
+        """저장된 문서 본문 조회 (없는 ID는 제외)"""
+        pass
+
+    @abstractmethod
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[Dict]:
+        """저장된 모든 문서 순회 ({'id', 'content', 'metadata', 'collection'})"""
+        pass
+
+    @abstractmethod
+    def find_ids(self, collection_type: str, where: Dict) -> List[str]:
+        """메타데이터가 where의 모든 키/값과 일치하는 문서 ID"""
+        pass
+
+    @abstractmethod
+    def compact(self) -> Dict:
+        """삭제된 데이터가 차지하는 공간 회수"""
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """컬렉션별 문서 수, 삭제 표시 수(삭제 표시가 없는 백엔드는 None), 디스크 사용량"""
+        pass
+
+
+class ChromaVectorIndex(VectorIndex):
+    """ChromaDB 기반 벡터 인덱스
+
+    'unified' 모드는 모든 종류를 collection_type 메타데이터로 구분하는 단일 컬렉션에,
+    'per_collection' 모드는 종류별 컬렉션에 저장합니다.
+    """
+
+    def __init__(self, persist_dir: str, collections: Dict[str, str], unified_collection: str,
+                 mode: str = 'unified'):
+        import chromadb
+        from chromadb.config import Settings
+
+        self.persist_dir = persist_dir
+        self.client = chromadb.PersistentClient(
+            path=persist_dir,
+            settings=Settings(anonymized_telemetry=False)
+        )
+        self.collections = collections
+        self.unified_collection = unified_collection
+        self.mode = mode
+        # per_collection 모드에서 존재하지 않는 것으로 확인된 컬렉션 ({종류: 만료 시각})
+        # 다른 프로세스가 컬렉션을 만들 수 있으므로 RAG_ABSENT_COLLECTION_TTL초 뒤에 다시 확인
+        self._absent_collections: Dict[str, float] = {}
+
+    def _get_collection(self, collection_type: str):
+        """ChromaDB 컬렉션 생성 또는 가져오기 (통합 모드에서는 모든 종류가 하나의 컬렉션을 공유)"""
+        if self.mode == 'unified':
+            return self.client.get_or_create_collection(self.unified_collection)
+        self._absent_collections.pop(collection_type, None)
+        return self.client.get_or_create_collection(self.collections[collection_type])
+
+    def _type_filter(self, collection_type: str) -> Optional[Dict]:
+        """통합 모드에서 특정 종류의 문서만 고르는 where 조건"""
+        if self.mode == 'unified':
+            return {"collection_type": collection_type}
+        return None
+
+    def _with_type(self, collection_type: str, metadatas: List[Dict]) -> List[Optional[Dict]]:
+        if self.mode == 'unified':
+            return [{**(m or {}), 'collection_type': collection_type} for m in metadatas]
+        return [m or None for m in metadatas]
+
+    def existing_ids(self, collection_type: str, ids: List[str]) -> Set[str]:
+        collection = self._get_collection(collection_type)
+        return set(collection.get(ids=ids, where=self._type_filter(collection_type), include=[])['ids'])
+
+    def upsert(self, collection_type, ids, embeddings, documents, metadatas):
+        if self.mode == 'unified':
+            # 통합 컬렉션은 ID 공간을 공유하므로 다른 종류의 문서를 덮어쓰지 않도록 거부
+            taken = self._get_collection(collection_type).get(
+                ids=ids, where={'collection_type': {'$ne': collection_type}}, include=[])['ids']
+            if taken:
+                raise ValueError(f"다른 컬렉션에서 이미 사용 중인 ID입니다: {', '.join(taken[:10])}")
+        self._get_collection(collection_type).upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=documents,
+            metadatas=self._with_type(collection_type, metadatas)
+        )
+
+    def update_metadata(self, collection_type, ids, metadatas):
+        self._get_collection(collection_type).update(
+            ids=ids,
+            metadatas=self._with_type(collection_type, metadatas)
+        )
+
+    def delete(self, collection_type, ids):
+        self._get_collection(collection_type).delete(ids=ids, where=self._type_filter(collection_type))
+
+    def remove_duplicates(self, collection_type, content, keep_id):
+        collection = self._get_collection(collection_type)
+        matches = collection.get(
+            where=self._type_filter(collection_type),
+            where_document={"$contains": content},
+            include=['documents']
+        )
+        stale_ids = [
+            doc_id for doc_id, text in zip(matches['ids'], matches['documents'])
+            if text == content and doc_id != keep_id
+        ]
+        if stale_ids:
+            collection.delete(ids=stale_ids)
+        return len(stale_ids)
+
+    def get_embeddings(self, collection_type, ids):
+        if not ids:
+            return {}
+        found = self._get_collection(collection_type).get(
+            ids=ids, where=self._type_filter(collection_type), include=['embeddings'])
+        return {doc_id: list(vector) for doc_id, vector in zip(found['ids'], found['embeddings'])}
+
+    def get_contents(self, collection_type, ids):
+        if not ids:
+            return {}
+        found = self._get_collection(collection_type).get(
+            ids=ids, where=self._type_filter(collection_type), include=['documents'])
+        return dict(zip(found['ids'], found['documents']))
+
+    def iter_documents(self, batch_size=1000):
+        if self.mode == 'unified':
+            sources = [(None, self.unified_collection)]
+        else:
+            sources = list(self.collections.items())
+
+        for collection_type, name in sources:
+            try:
+                collection = self.client.get_collection(name)
+            except Exception:
+                continue
+            offset = 0
+            while True:
+                page = collection.get(include=['documents', 'metadatas'], limit=batch_size, offset=offset)
+                for doc_id, doc, metadata in zip(page['ids'], page['documents'], page['metadatas']):
+                    metadata = dict(metadata or {})
+                    doc_type = metadata.pop('collection_type', '') if collection_type is None else collection_type
+                    yield {'id': doc_id, 'content': doc, 'metadata': metadata, 'collection': doc_type}
+                if len(page['ids']) < batch_size:
+                    break
+                offset += batch_size
+
+    def find_ids(self, collection_type, where):
+        conditions = [{key: value} for key, value in where.items()]
+        if self.mode == 'unified':
+            conditions.insert(0, {'collection_type': collection_type})
+        if not conditions:
+            condition = None
+        elif len(conditions) == 1:
+            condition = conditions[0]
+        else:
+            condition = {'$and': conditions}
+        return self._get_collection(collection_type).get(where=condition, include=[])['ids']
+
+    def compact(self):
+        """SQLite VACUUM으로 삭제된 행이 차지하던 공간 회수"""
+        import sqlite3
+
+        db_path = os.path.join(self.persist_dir, 'chroma.sqlite3')
+        bytes_before = _directory_size(self.persist_dir)
+        try:
+            conn = sqlite3.connect(db_path, timeout=30)
+            try:
+                conn.execute("VACUUM")
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"ChromaDB VACUUM 실패: {e}")
+        return {'bytes_before': bytes_before, 'bytes_after': _directory_size(self.persist_dir)}
+
+    def stats(self):
+        counts = {}
+        for collection_type, name in self.collections.items():
+            try:
+                if self.mode == 'unified':
+                    collection = self.client.get_collection(self.unified_collection)
+                    counts[collection_type] = len(collection.get(
+                        where={'collection_type': collection_type}, include=[])['ids'])
+                else:
+                    counts[collection_type] = self.client.get_collection(name).count()
+            except Exception:
+                counts[collection_type] = 0
+        return {
+            'backend': 'chroma',
+            'mode': self.mode,
+            'documents': counts,
+            # ChromaDB는 삭제 시 행을 바로 지우므로 삭제 표시 수가 없음 (자동 압축 대상 아님)
+            'deleted': None,
+            'disk_bytes': _directory_size(self.persist_dir),
+        }
+
+    def query(self, query_embedding, collection_types, top_k):
+        if self.mode == 'unified':
+            return self._query_unified(query_embedding, collection_types, top_k)
+        return self._query_collections(query_embedding, collection_types, top_k)
+
+    def _query_unified(self, query_embedding: List[float], collection_types: List[str], top_k: int) -> List[Dict]:
+        """통합 컬렉션에 collection_type 필터로 한 번만 질의"""
+        try:
+            collection = self.client.get_collection(self.unified_collection)
+        except Exception:
+            return []
+
+        where = None
+        if set(collection_types) != set(self.collections):
+            where = {"collection_type": {"$in": list(collection_types)}}
+
+        results = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=top_k,
+            where=where
+        )
+
+        formatted = []
+        for i, doc in enumerate(results['documents'][0]):
+            metadata = dict(results['metadatas'][0][i] or {}) if results['metadatas'][0] else {}
+            collection_type = metadata.pop('collection_type', '')
+            formatted.append({
+                'id': results['ids'][0][i],
+                'content': doc,
+                'metadata': metadata,
+                'score': 1 - results['distances'][0][i] if results['distances'][0] else 0,
+                'collection': collection_type
+            })
+        formatted.sort(key=lambda x: x['score'], reverse=True)
+        return formatted
+
+    def _query_collections(self, query_embedding: List[float], collection_types: List[str], top_k: int) -> List[Dict]:
+        """종류별 컬렉션에 동시에 질의 (없는 컬렉션은 기억해두고 건너뜀)"""
+        now = time.monotonic()
+        targets = [t for t in collection_types if self._absent_collections.get(t, 0) <= now]
+        if not targets:
+            return []
+
+        def query_one(collection_type: str) -> List[Dict]:
+            try:
+                collection = self.client.get_collection(self.collections[collection_type])
+            except Exception:
+                # 이 프로세스에서 적재하거나 TTL이 지나기 전까지 다시 조회하지 않음
+                ttl = getattr(settings, 'RAG_ABSENT_COLLECTION_TTL', 30)
+                self._absent_collections[collection_type] = time.monotonic() + ttl
+                return []
+
+            try:
+                # 유사도 검색
+                results = collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=top_k
+                )
+            except Exception as e:
+                logger.error(f"컬렉션 검색 오류 ({collection_type}): {e}")
+                return []
+
+            # 결과 포맷팅
+            return [
+                {
+                    'id': results['ids'][0][i],
+                    'content': doc,
+                    'metadata': results['metadatas'][0][i] if results['metadatas'][0] else {},
+                    'score': 1 - results['distances'][0][i] if results['distances'][0] else 0,
+                    'collection': collection_type
+                }
+                for i, doc in enumerate(results['documents'][0])
+            ]
+
+        if len(targets) == 1:
+            merged = query_one(targets[0])
+        else:
+            with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+                merged = [result for results in executor.map(query_one, targets) for result in results]
+
+        # 점수 기준으로 정렬
+        merged.sort(key=lambda x: x['score'], reverse=True)
+        return merged[:top_k]
+
+
+class NumpyVectorIndex(VectorIndex):
+    """메모리 맵 파일 기반 인프로세스 벡터 인덱스
+
+    정규화된 float32 임베딩을 행 단위로 이어 붙인 파일을 읽기 전용 mmap으로 열기 때문에
+    여러 gunicorn 워커가 OS 페이지 캐시를 공유하고 워커별 메모리는 거의 들지 않습니다.
+    나머지 열은 별도 파일에 저장합니다.
+
+    - ids.<epoch>.bin      : 문서 ID (고정폭 S64)
+    - codes.<epoch>.u8     : 컬렉션 종류 코드
+    - deleted.<epoch>.u8   : 삭제 표시 (1이면 삭제됨)
+    - offsets.<epoch>.i64  : rows 파일의 행 시작 위치 (count + 1개)
+    - rows.<epoch>.jsonl   : 행별 {content, metadata} (검색 결과 top-k만 읽음)
+    - manifest.json        : epoch, dim, count, 컬렉션 종류 목록
+    - qvectors.<epoch>.i8 / scales.<epoch>.f32 : int8 양자화 벡터와 벡터별 배율 (quantization='int8')
+
+    쓰기는 파일 락을 잡고 각 파일 끝에 추가한 뒤 manifest의 count를 갱신합니다.
+    교체는 기존 행에 삭제 표시를 하고 새 행을 추가하며, 삭제된 행은 검색에서 제외됩니다.
+    검색은 행렬-벡터 곱 한 번과 argpartition으로 top-k를 구합니다.
+    int8 양자화를 켜면 int8 벡터만 전체 스캔하고 상위 top_k * rescore_factor개 후보만
+    float32 파일에서 읽어 다시 채점하므로, 상주 메모리와 스캔 대역폭이 약 1/4로 줄어듭니다.
+    """
+
+    ID_DTYPE = 'S64'
+
+    def __init__(self, path: str, quantization: str = 'none', rescore_factor: int = 4):
+        if quantization not in ('none', 'int8'):
+            raise ValueError(f"Unknown quantization: {quantization}")
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.manifest_path = os.path.join(path, 'manifest.json')
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self._file_lock = FileLock(os.path.join(path, 'index.lock'))
+        self._lock = threading.Lock()
+        self._manifest_mtime = None
+        self._view = None
+        if quantization == 'int8':
+            self._ensure_quantized()
+
+    # ---- 파일/manifest ----
+
+    def _file(self, name: str, epoch: int) -> str:
+        return os.path.join(self.path, f"{name}.{epoch}")
+
+    def _read_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'epoch': 0, 'dim': 0, 'count': 0, 'collection_types': []}
+
+    def _write_manifest(self, manifest: Dict):
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _load_view(self) -> Optional[Dict]:
+        """manifest가 바뀌었을 때만 mmap을 다시 연다"""
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except OSError:
+            return None
+
+        with self._lock:
+            if self._view is not None and mtime == self._manifest_mtime:
+                return self._view
+
+            manifest = self._read_manifest()
+            count, dim, epoch = manifest['count'], manifest['dim'], manifest['epoch']
+            if count == 0:
+                view = {'manifest': manifest, 'count': 0}
+            else:
+                view = {
+                    'manifest': manifest,
+                    'count': count,
+                    'vectors': np.memmap(self._file('vectors', epoch) + '.f32', dtype=np.float32,
+                                         mode='r', shape=(count, dim)),
+                    'ids': np.memmap(self._file('ids', epoch) + '.bin', dtype=self.ID_DTYPE,
+                                     mode='r', shape=(count,)),
+                    'codes': np.memmap(self._file('codes', epoch) + '.u8', dtype=np.uint8,
+                                       mode='r', shape=(count,)),
+                    'deleted': np.memmap(self._file('deleted', epoch) + '.u8', dtype=np.uint8,
+                                         mode='r', shape=(count,)),
+                    'offsets': np.memmap(self._file('offsets', epoch) + '.i64', dtype=np.int64,
+                                         mode='r', shape=(count + 1,)),
+                }
+            if count and self.quantization == 'int8' and manifest.get('quantization') == 'int8':
+                view['qvectors'] = np.memmap(self._file('qvectors', epoch) + '.i8', dtype=np.int8,
+                                             mode='r', shape=(count, dim))
+                view['scales'] = np.memmap(self._file('scales', epoch) + '.f32', dtype=np.float32,
+                                           mode='r', shape=(count,))
+            self._view = view
+            self._manifest_mtime = mtime
+            return view
+
+    def _read_rows(self, epoch: int, offsets, rows: List[int]) -> List[Dict]:
+        result = []
+        with open(self._file('rows', epoch) + '.jsonl', 'rb') as f:
+            for row in rows:
+                start, end = int(offsets[row]), int(offsets[row + 1])
+                f.seek(start)
+                result.append(json.loads(f.read(end - start)))
+        return result
+
+    # ---- 쓰기 ----
+
+    def _append(self, manifest: Dict, collection_type: str, ids: List[str],
+                vectors: np.ndarray, rows: List[Dict]):
+        """manifest의 count 뒤에 행 추가 (파일 락을 잡은 상태에서 호출)"""
+        epoch, count = manifest['epoch'], manifest['count']
+        if collection_type not in manifest['collection_types']:
+            manifest['collection_types'].append(collection_type)
+        code = manifest['collection_types'].index(collection_type)
+
+        encoded_rows = [
+            (json.dumps(row, ensure_ascii=False) + '\n').encode('utf-8') for row in rows
+        ]
+        offsets_path = self._file('offsets', epoch) + '.i64'
+        rows_path = self._file('rows', epoch) + '.jsonl'
+
+        if count == 0:
+            row_end = 0
+            with open(offsets_path, 'wb') as f:
+                f.write(np.zeros(1, dtype=np.int64).tobytes())
+        else:
+            row_end = int(np.fromfile(offsets_path, dtype=np.int64, count=1, offset=count * 8)[0])
+        new_offsets = row_end + np.cumsum([len(r) for r in encoded_rows], dtype=np.int64)
+
+        # 이전 쓰기가 중간에 실패했을 수 있으므로 manifest 기준 크기로 잘라낸 뒤 추가
+        appends = [
+            (self._file('vectors', epoch) + '.f32', count * manifest['dim'] * 4, vectors.astype(np.float32).tobytes()),
+            (self._file('ids', epoch) + '.bin', count * 64, self._encode_ids(ids).tobytes()),
+            (self._file('codes', epoch) + '.u8', count, np.full(len(ids), code, dtype=np.uint8).tobytes()),
+            (self._file('deleted', epoch) + '.u8', count, np.zeros(len(ids), dtype=np.uint8).tobytes()),
+            (offsets_path, (count + 1) * 8, new_offsets.tobytes()),
+            (rows_path, row_end, b''.join(encoded_rows)),
+        ]
+        if manifest.get('quantization') == 'int8':
+            qvectors, scales = quantize_int8(vectors)
+            appends += [
+                (self._file('qvectors', epoch) + '.i8', count * manifest['dim'], qvectors.tobytes()),
+                (self._file('scales', epoch) + '.f32', count * 4, scales.tobytes()),
+            ]
+        for file_path, expected_size, data in appends:
+            with open(file_path, 'ab') as f:
+                f.truncate(expected_size)
+                f.write(data)
+
+        manifest['count'] = count + len(ids)
+
+    def _ensure_quantized(self):
+        """기존 float32 벡터로 int8 양자화 파일 생성 (처음 켰을 때 한 번)"""
+        with self._file_lock:
+            manifest = self._read_manifest()
+            if manifest.get('quantization') == 'int8':
+                return
+            count, dim, epoch = manifest['count'], manifest['dim'], manifest['epoch']
+            if count:
+                vectors = np.memmap(self._file('vectors', epoch) + '.f32', dtype=np.float32,
+                                    mode='r', shape=(count, dim))
+                with open(self._file('qvectors', epoch) + '.i8', 'wb') as qf, \
+                        open(self._file('scales', epoch) + '.f32', 'wb') as sf:
+                    for start in range(0, count, SCAN_BLOCK_ROWS):
+                        qvectors, scales = quantize_int8(vectors[start:start + SCAN_BLOCK_ROWS])
+                        qf.write(qvectors.tobytes())
+                        sf.write(scales.tobytes())
+                del vectors
+                logger.info(f"벡터 {count}개 int8 양자화 완료: {self.path}")
+            manifest['quantization'] = 'int8'
+            self._write_manifest(manifest)
+
+    @staticmethod
+    def _code(manifest: Dict, collection_type: str) -> Optional[int]:
+        """컬렉션 종류 코드 (아직 저장된 적 없는 종류면 None)"""
+        types = manifest['collection_types']
+        return types.index(collection_type) if collection_type in types else None
+
+    def _mark_deleted(self, manifest: Dict, collection_type: str, ids: List[str]) -> int:
+        """collection_type의 살아 있는 행 중 ids에 해당하는 행을 삭제 표시 (파일 락을 잡은 상태에서 호출)"""
+        count = manifest['count']
+        code = self._code(manifest, collection_type)
+        if count == 0 or not ids or code is None:
+            return 0
+        epoch = manifest['epoch']
+        stored = np.fromfile(self._file('ids', epoch) + '.bin', dtype=self.ID_DTYPE, count=count)
+        codes = np.fromfile(self._file('codes', epoch) + '.u8', dtype=np.uint8, count=count)
+        deleted = np.memmap(self._file('deleted', epoch) + '.u8', dtype=np.uint8, mode='r+', shape=(count,))
+        rows = np.nonzero(np.isin(stored, self._encode_ids(ids)) & (codes == code) & (deleted == 0))[0]
+        if len(rows):
+            deleted[rows] = 1
+            deleted.flush()
+            manifest['deleted_count'] = manifest.get('deleted_count', 0) + len(rows)
+        del deleted
+        return len(rows)
+
+    def _encode_ids(self, ids: List[str]) -> np.ndarray:
+        return np.array([doc_id.encode('utf-8') for doc_id in ids], dtype=self.ID_DTYPE)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def upsert(self, collection_type, ids, embeddings, documents, metadatas):
+        if not ids:
+            return
+        for doc_id in ids:
+            if len(doc_id.encode('utf-8')) > MAX_ID_BYTES:
+                raise ValueError(f"Document id too long (max {MAX_ID_BYTES} bytes): {doc_id}")
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+
+        with self._file_lock:
+            manifest = self._read_manifest()
+            if manifest['count'] and manifest['dim'] != vectors.shape[1]:
+                raise ValueError(f"Embedding dimension mismatch: {vectors.shape[1]} != {manifest['dim']}")
+            manifest['dim'] = vectors.shape[1]
+            self._mark_deleted(manifest, collection_type, ids)
+            rows = [{'content': doc, 'metadata': meta or {}} for doc, meta in zip(documents, metadatas)]
+            self._append(manifest, collection_type, ids, vectors, rows)
+            self._write_manifest(manifest)
+
+    def update_metadata(self, collection_type, ids, metadatas):
+        if not ids:
+            return
+        with self._file_lock:
+            manifest = self._read_manifest()
+            count, epoch = manifest['count'], manifest['epoch']
+            code = self._code(manifest, collection_type)
+            if count == 0 or code is None:
+                return
+            stored = np.fromfile(self._file('ids', epoch) + '.bin', dtype=self.ID_DTYPE, count=count)
+            codes = np.fromfile(self._file('codes', epoch) + '.u8', dtype=np.uint8, count=count)
+            deleted = np.fromfile(self._file('deleted', epoch) + '.u8', dtype=np.uint8, count=count)
+            live_rows = {
+                stored[row].decode('utf-8'): row
+                for row in np.nonzero((deleted == 0) & (codes == code) & np.isin(stored, self._encode_ids(ids)))[0]
+            }
+            targets = [(doc_id, meta) for doc_id, meta in zip(ids, metadatas) if doc_id in live_rows]
+            if not targets:
+                return
+
+            # 기존 벡터와 본문을 그대로 복사해 새 행으로 추가
+            vectors = np.memmap(self._file('vectors', epoch) + '.f32', dtype=np.float32,
+                                mode='r', shape=(count, manifest['dim']))
+            offsets = np.fromfile(self._file('offsets', epoch) + '.i64', dtype=np.int64, count=count + 1)
+            source_rows = [live_rows[doc_id] for doc_id, _ in targets]
+            copied = np.array(vectors[source_rows])
+            old_rows = self._read_rows(epoch, offsets, source_rows)
+            del vectors
+
+            target_ids = [doc_id for doc_id, _ in targets]
+            self._mark_deleted(manifest, collection_type, target_ids)
+            rows = [{'content': old['content'], 'metadata': meta or {}} for old, (_, meta) in zip(old_rows, targets)]
+            self._append(manifest, collection_type, target_ids, copied, rows)
+            self._write_manifest(manifest)
+
+    def delete(self, collection_type, ids):
+        with self._file_lock:
+            manifest = self._read_manifest()
+            if self._mark_deleted(manifest, collection_type, ids):
+                self._write_manifest(manifest)
+
+    # ---- 읽기 ----
+
+    def _live_rows(self, view: Optional[Dict], collection_type: str, ids: List[str]) -> np.ndarray:
+        """collection_type의 살아 있는 행 중 ids에 해당하는 행 번호"""
+        if not view or view['count'] == 0 or not ids:
+            return np.zeros(0, dtype=np.int64)
+        code = self._code(view['manifest'], collection_type)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.nonzero((view['deleted'] == 0) & (view['codes'] == code)
+                          & np.isin(view['ids'], self._encode_ids(ids)))[0]
+
+    def existing_ids(self, collection_type, ids):
+        view = self._load_view()
+        return {view['ids'][row].decode('utf-8') for row in self._live_rows(view, collection_type, ids)}
+
+    def get_embeddings(self, collection_type, ids):
+        view = self._load_view()
+        return {
+            view['ids'][row].decode('utf-8'): np.array(view['vectors'][row])
+            for row in self._live_rows(view, collection_type, ids)
+        }
+
+    def get_contents(self, collection_type, ids):
+        view = self._load_view()
+        rows = self._live_rows(view, collection_type, ids).tolist()
+        if not rows:
+            return {}
+        manifest = view['manifest']
+        return {
+            view['ids'][row].decode('utf-8'): data['content']
+            for row, data in zip(rows, self._read_rows(manifest['epoch'], view['offsets'], rows))
+        }
+
+    def iter_documents(self, batch_size=1000):
+        view = self._load_view()
+        if not view or view['count'] == 0:
+            return
+        manifest = view['manifest']
+        live_rows = np.nonzero(view['deleted'] == 0)[0].tolist()
+        for start in range(0, len(live_rows), batch_size):
+            rows = live_rows[start:start + batch_size]
+            for row, data in zip(rows, self._read_rows(manifest['epoch'], view['offsets'], rows)):
+                yield {
+                    'id': view['ids'][row].decode('utf-8'),
+                    'content': data['content'],
+                    'metadata': data['metadata'],
+                    'collection': manifest['collection_types'][view['codes'][row]],
+                }
+
+    def find_ids(self, collection_type, where):
+        return [
+            doc['id'] for doc in self.iter_documents()
+            if doc['collection'] == collection_type
+            and all(doc['metadata'].get(key) == value for key, value in where.items())
+        ]
+
+    def stats(self):
+        view = self._load_view()
+        counts = {}
+        deleted = 0
+        if view and view['count']:
+            manifest = view['manifest']
+            live = view['deleted'] == 0
+            per_code = np.bincount(view['codes'][live], minlength=len(manifest['collection_types']))
+            counts = {t: int(per_code[i]) for i, t in enumerate(manifest['collection_types'])}
+            deleted = int(view['count'] - live.sum())
+        return {
+            'backend': 'numpy',
+            'quantization': self.quantization,
+            'documents': counts,
+            'deleted': deleted,
+            'disk_bytes': _directory_size(self.path),
+        }
+
+    def compact(self):
+        """살아 있는 행만 새 epoch 파일로 다시 써서 삭제된 행 정리
+
+        새 파일을 모두 쓴 뒤 manifest를 교체하므로 읽는 쪽은 항상 완전한 파일을 봅니다.
+        직전 epoch 파일은 아직 열고 있는 다른 워커를 위해 다음 압축 때 지웁니다.
+        """
+        with self._file_lock:
+            manifest = self._read_manifest()
+            count, dim, epoch = manifest['count'], manifest['dim'], manifest['epoch']
+            bytes_before = _directory_size(self.path)
+            if count == 0 or not manifest.get('deleted_count'):
+                return {'rows_before': count, 'rows_after': count,
+                        'bytes_before': bytes_before, 'bytes_after': bytes_before}
+
+            new_epoch = epoch + 1
+            quantized = manifest.get('quantization') == 'int8'
+            deleted = np.fromfile(self._file('deleted', epoch) + '.u8', dtype=np.uint8, count=count)
+            live_rows = np.nonzero(deleted == 0)[0]
+
+            sources = {
+                'vectors': np.memmap(self._file('vectors', epoch) + '.f32', dtype=np.float32,
+                                     mode='r', shape=(count, dim)),
+                'ids': np.memmap(self._file('ids', epoch) + '.bin', dtype=self.ID_DTYPE,
+                                 mode='r', shape=(count,)),
+                'codes': np.memmap(self._file('codes', epoch) + '.u8', dtype=np.uint8,
+                                   mode='r', shape=(count,)),
+            }
+            suffixes = {'vectors': '.f32', 'ids': '.bin', 'codes': '.u8'}
+            if quantized:
+                sources['qvectors'] = np.memmap(self._file('qvectors', epoch) + '.i8', dtype=np.int8,
+                                                mode='r', shape=(count, dim))
+                sources['scales'] = np.memmap(self._file('scales', epoch) + '.f32', dtype=np.float32,
+                                              mode='r', shape=(count,))
+                suffixes.update({'qvectors': '.i8', 'scales': '.f32'})
+            offsets = np.fromfile(self._file('offsets', epoch) + '.i64', dtype=np.int64, count=count + 1)
+
+            outputs = {name: open(self._file(name, new_epoch) + suffix, 'wb') for name, suffix in suffixes.items()}
+            try:
+                new_offsets = [0]
+                with open(self._file('rows', epoch) + '.jsonl', 'rb') as src, \
+                        open(self._file('rows', new_epoch) + '.jsonl', 'wb') as rows_out:
+                    for start in range(0, len(live_rows), SCAN_BLOCK_ROWS):
+                        block = live_rows[start:start + SCAN_BLOCK_ROWS]
+                        for name, source in sources.items():
+                            outputs[name].write(np.ascontiguousarray(source[block]).tobytes())
+                        for row in block.tolist():
+                            src.seek(int(offsets[row]))
+                            data = src.read(int(offsets[row + 1] - offsets[row]))
+                            rows_out.write(data)
+                            new_offsets.append(new_offsets[-1] + len(data))
+                np.zeros(len(live_rows), dtype=np.uint8).tofile(self._file('deleted', new_epoch) + '.u8')
+                np.asarray(new_offsets, dtype=np.int64).tofile(self._file('offsets', new_epoch) + '.i64')
+            finally:
+                for f in outputs.values():
+                    f.close()
+                del sources
+
+            manifest.update({'epoch': new_epoch, 'count': int(len(live_rows)), 'deleted_count': 0})
+            self._write_manifest(manifest)
+            self._remove_old_epochs(keep={epoch, new_epoch})
+
+        logger.info(f"벡터 인덱스 압축: {count} → {len(live_rows)}행 ({self.path})")
+        return {'rows_before': count, 'rows_after': int(len(live_rows)),
+                'bytes_before': bytes_before, 'bytes_after': _directory_size(self.path)}
+
+    def _remove_old_epochs(self, keep: Set[int]):
+        for name in os.listdir(self.path):
+            parts = name.split('.')
+            if len(parts) == 3 and parts[1].isdigit() and int(parts[1]) not in keep:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+
+    def query(self, query_embedding, collection_types, top_k):
+        view = self._load_view()
+        if not view or view['count'] == 0 or top_k <= 0:
+            return []
+
+        manifest = view['manifest']
+        codes = [manifest['collection_types'].index(t) for t in collection_types
+                 if t in manifest['collection_types']]
+        if not codes:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        mask = view['deleted'] == 0
+        if len(codes) < len(manifest['collection_types']):
+            mask &= np.isin(view['codes'], codes)
+        candidates = int(mask.sum())
+        if candidates == 0:
+            return []
+
+        k = min(top_k, candidates)
+        if 'qvectors' in view:
+            # int8 근사 점수로 후보를 고른 뒤 float32 벡터로 다시 채점 (벤치마크와 같은 경로)
+            top, exact = search_int8(view['qvectors'], view['scales'], view['vectors'], query,
+                                     k, self.rescore_factor, mask=mask)
+            scores = dict(zip(top.tolist(), exact.tolist()))
+        else:
+            scores = view['vectors'] @ query
+            scores[~mask] = -np.inf
+            top = top_k_indices(scores, k)
+
+        rows = self._read_rows(manifest['epoch'], view['offsets'], top.tolist())
+        return [
+            {
+                'id': view['ids'][row].decode('utf-8'),
+                'content': data['content'],
+                'metadata': data['metadata'],
+                'score': float(scores[row]),
+                'collection': manifest['collection_types'][view['codes'][row]],
+            }
+            for row, data in zip(top.tolist(), rows)
+        ]
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def create_vector_index(persist_dir: str, namespace: str, collections: Dict[str, str],
+                        unified_collection: str) -> VectorIndex:
+    """설정(RAG_VECTOR_BACKEND)에 따른 벡터 인덱스 생성"""
+    backend = getattr(settings, 'RAG_VECTOR_BACKEND', 'chroma')
+    if backend == 'numpy':
+        return NumpyVectorIndex(
+            os.path.join(persist_dir, f"numpy_{namespace}"),
+            quantization=getattr(settings, 'RAG_VECTOR_QUANTIZATION', 'none'),
+            rescore_factor=getattr(settings, 'RAG_VECTOR_RESCORE_FACTOR', 4),
+        )
+    if backend == 'chroma':
+        return ChromaVectorIndex(
+            persist_dir=persist_dir,
+            collections=collections,
+            unified_collection=unified_collection,
+            mode=getattr(settings, 'RAG_INDEX_MODE', 'unified'),
+        )
+    raise ValueError(f"Unknown vector backend: {backend}")
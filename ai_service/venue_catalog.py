@@ -0,0 +1,219 @@
+# ai_service/venue_catalog.py
+
+import os
+import json
+import hashlib
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .geo import Gazetteer, GridIndex, normalize_location, strip_region_suffix
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(__file__), 'data', 'venues.json')
+DEFAULT_GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), 'data', 'gazetteer.json')
+
+SORT_OPTIONS = ('rating', 'price', 'capacity', 'distance')
+
+
+def _region_names(venue: Dict) -> set:
+    names = set()
+    for key in ('city', 'district', 'neighborhood'):
+        value = venue.get(key)
+        if not value:
+            continue
+        name = normalize_location(value)
+        names.add(name)
+        stripped = strip_region_suffix(name)
+        if stripped:
+            names.add(stripped)
+    return names
+
+
+class VenueCatalog:
+    """열 단위 배열로 저장한 장소 카탈로그
+
+    행은 수용 인원 오름차순으로 정렬되어 있고, 지역 이름(시/구/동네)마다 행 번호 배열과
+    그 행들의 수용 인원 배열을 미리 만들어 둡니다. 최소 수용 인원은 searchsorted로
+    잘라내고, 시간당 대관료 조건은 남은 후보에 벡터 마스크로 적용합니다.
+    정렬 기준별 전체 순위를 미리 계산해 두므로 페이지에 필요한 만큼만 부분 정렬합니다.
+
+    좌표(lat/lng)는 격자 공간 인덱스에 넣어 두고, 지명은 gazetteer로 중심 좌표를 찾아
+    반경 검색(radius_km)과 가까운 순 정렬(sort_by='distance')에 사용합니다.
+    """
+
+    def __init__(self, venues: List[Dict], gazetteer: Optional[Gazetteer] = None, cell_km: float = 1.0,
+                 version: Optional[str] = None):
+        # 카탈로그 파일 내용 해시 (리소스 응답의 ETag 등에 사용)
+        self.version = version
+        self.records = sorted(venues, key=lambda v: (v['capacity'], v['id']))
+        self.capacity = np.array([v['capacity'] for v in self.records], dtype=np.int32)
+        self.hourly_rate = np.array([v['hourly_rate'] for v in self.records], dtype=np.int64)
+        self.rating = np.array([v.get('rating', 0.0) for v in self.records], dtype=np.float32)
+        self.lat = np.array([v.get('lat', np.nan) for v in self.records], dtype=np.float64)
+        self.lng = np.array([v.get('lng', np.nan) for v in self.records], dtype=np.float64)
+        self.grid = GridIndex(self.lat, self.lng, cell_km=cell_km)
+        self.gazetteer = gazetteer
+
+        groups = defaultdict(list)
+        for row, venue in enumerate(self.records):
+            for name in _region_names(venue):
+                groups[name].append(row)
+        # 행 번호가 오름차순이므로 지역별 수용 인원 배열도 정렬되어 있음
+        self._regions: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for name, rows in groups.items():
+            rows = np.array(rows, dtype=np.int32)
+            self._regions[name] = (rows, self.capacity[rows])
+        self._all = (np.arange(len(self.records), dtype=np.int32), self.capacity)
+        self._ranks = {sort_by: self._build_rank(sort_by) for sort_by in SORT_OPTIONS if sort_by != 'distance'}
+
+    @classmethod
+    def from_file(cls, path: str, gazetteer: Optional[Gazetteer] = None) -> 'VenueCatalog':
+        with open(path, 'rb') as f:
+            raw = f.read()
+        return cls(json.loads(raw)['venues'], gazetteer=gazetteer, version=hashlib.sha256(raw).hexdigest()[:16])
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def regions(self) -> List[str]:
+        return sorted(self._regions)
+
+    def _resolve_location(self, location: Optional[str]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """지역 문자열을 행 번호 배열로 변환 (비어 있으면 전체, 모르는 지역이면 None)
+
+        '서울 강남구'처럼 여러 단어이면 알려진 이름 중 가장 좁은 지역을 사용합니다.
+        """
+        if not location or not location.strip():
+            return self._all
+        key = normalize_location(location)
+        if key in self._regions:
+            return self._regions[key]
+
+        matches = []
+        for token in location.split():
+            token = normalize_location(token)
+            for name in (token, strip_region_suffix(token)):
+                if name in self._regions:
+                    matches.append(self._regions[name])
+                    break
+        if not matches:
+            return None
+        return min(matches, key=lambda region: len(region[0]))
+
+    def _build_rank(self, sort_by: str) -> np.ndarray:
+        """정렬 기준별로 각 행의 전체 순위 (작을수록 앞)"""
+        rating, price, capacity = -self.rating, self.hourly_rate, self.capacity
+        if sort_by == 'price':
+            keys = (rating, price)
+        elif sort_by == 'capacity':
+            # 필요한 인원에 가장 알맞은(작은) 장소부터
+            keys = (rating, capacity)
+        else:
+            keys = (price, rating)
+        # lexsort는 마지막 키가 1순위
+        order = np.lexsort(keys)
+        rank = np.empty(len(order), dtype=np.int32)
+        rank[order] = np.arange(len(order), dtype=np.int32)
+        return rank
+
+    def _top(self, rows: np.ndarray, sort_by: str, k: int) -> np.ndarray:
+        """순위 상위 k개 행 (전체 정렬 없이 argpartition 후 k개만 정렬)"""
+        ranks = self._ranks[sort_by][rows]
+        if k < len(rows):
+            selected = np.argpartition(ranks, k - 1)[:k]
+            rows, ranks = rows[selected], ranks[selected]
+        return rows[np.argsort(ranks)]
+
+    def search(self, location: Optional[str], min_capacity: int = 1, max_hourly_rate: Optional[float] = None,
+               sort_by: str = 'rating', offset: int = 0, limit: int = 10,
+               radius_km: Optional[float] = None) -> Dict:
+        """지역/최소 수용 인원/최대 시간당 대관료 조건 검색 (정렬 및 페이지 나눔)
+
+        radius_km를 주면 지역 이름 대신 그 지점에서 반경 안의 장소를 찾고,
+        sort_by='distance'이면 지역 경계와 관계없이 가까운 순으로 찾습니다.
+        """
+        if sort_by not in SORT_OPTIONS:
+            raise ValueError(f"sort_by must be one of {SORT_OPTIONS}")
+        if radius_km is not None or sort_by == 'distance':
+            return self._search_nearby(location, min_capacity, max_hourly_rate, sort_by, offset, limit, radius_km)
+
+        region = self._resolve_location(location)
+        if region is None:
+            return self._empty(location, sort_by, offset, limit, f"'{location}' 지역의 장소 정보가 없습니다")
+
+        rows, capacities = region
+        candidates = rows[np.searchsorted(capacities, min_capacity, side='left'):]
+        if max_hourly_rate is not None:
+            candidates = candidates[self.hourly_rate[candidates] <= max_hourly_rate]
+
+        page = self._top(candidates, sort_by, offset + limit)[offset:] if limit > 0 else candidates[:0]
+        return {
+            "venues": [dict(self.records[row]) for row in page.tolist()],
+            "total": int(len(candidates)),
+            "offset": offset,
+            "limit": limit,
+            "sort_by": sort_by,
+        }
+
+    def _search_nearby(self, location: Optional[str], min_capacity: int, max_hourly_rate: Optional[float],
+                       sort_by: str, offset: int, limit: int, radius_km: Optional[float]) -> Dict:
+        center = self.gazetteer.resolve(location) if self.gazetteer else None
+        if center is None:
+            return self._empty(location, sort_by, offset, limit, f"'{location}'의 위치를 찾을 수 없습니다")
+
+        if radius_km is not None:
+            rows, distances = self.grid.within(center[0], center[1], radius_km)
+            keep = self.capacity[rows] >= min_capacity
+            if max_hourly_rate is not None:
+                keep &= self.hourly_rate[rows] <= max_hourly_rate
+            rows, distances = rows[keep], distances[keep]
+            total = len(rows)
+            if sort_by == 'distance':
+                order = np.argsort(distances, kind='stable')[offset:offset + limit]
+                rows, distances = rows[order], distances[order]
+            else:
+                by_row = dict(zip(rows.tolist(), distances.tolist()))
+                rows = self._top(rows, sort_by, offset + limit)[offset:]
+                distances = np.array([by_row[row] for row in rows.tolist()])
+        else:
+            allowed = self.capacity >= min_capacity
+            if max_hourly_rate is not None:
+                allowed &= self.hourly_rate <= max_hourly_rate
+            total = int(np.count_nonzero(allowed & ~np.isnan(self.lat)))
+            rows, distances = self.grid.nearest(center[0], center[1], offset + limit, allowed)
+            rows, distances = rows[offset:], distances[offset:]
+
+        return {
+            "venues": [
+                {**self.records[row], "distance_km": round(distance, 2)}
+                for row, distance in zip(rows.tolist(), distances.tolist())
+            ],
+            "total": int(total),
+            "offset": offset,
+            "limit": limit,
+            "sort_by": sort_by,
+            "center": {"lat": center[0], "lng": center[1]},
+            **({"radius_km": radius_km} if radius_km is not None else {}),
+        }
+
+    @staticmethod
+    def _empty(location: Optional[str], sort_by: str, offset: int, limit: int, message: str) -> Dict:
+        return {"venues": [], "total": 0, "offset": offset, "limit": limit, "sort_by": sort_by, "message": message}
+
+
+@lru_cache(maxsize=None)
+def load_venue_catalog(path: str, gazetteer_path: Optional[str] = None) -> VenueCatalog:
+    """장소 카탈로그 로드 (경로별로 프로세스당 한 번)"""
+    gazetteer = Gazetteer.from_file(gazetteer_path) if gazetteer_path else None
+    return VenueCatalog.from_file(path, gazetteer=gazetteer)
+
+
+def get_venue_catalog() -> VenueCatalog:
+    return load_venue_catalog(
+        getattr(settings, 'MCP_VENUE_CATALOG_PATH', DEFAULT_CATALOG_PATH),
+        getattr(settings, 'MCP_GAZETTEER_PATH', DEFAULT_GAZETTEER_PATH),
+    )
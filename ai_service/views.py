@@ -3,23 +3,35 @@
 import json
 import uuid
 import asyncio
+from datetime import datetime
 from asgiref.sync import sync_to_async
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.throttling import SimpleRateThrottle
 from rest_framework import status
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.views import View
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
+from django.utils.http import parse_etags
+from django.utils import timezone
 from .serializers import (
     AIQuerySerializer, 
     AIResponseSerializer,
     PartyPlanningRequestSerializer,
-    PartyPlanResponseSerializer
+    PartyPlanResponseSerializer,
+    KnowledgeUpsertSerializer,
+    KnowledgeDeleteSerializer,
+    BudgetScenarioSerializer
 )
 from .ai_logic import get_ai_response
 from .party_planning_agent import PartyPlanningAgent
+from .usage import usage_ledger, usage_scope, get_usage_subject
+from .knowledge_service import knowledge_service, KnowledgeServiceUnavailable
+from .mcp_integration import mcp_client
+from .budget_scenarios import budget_scenarios
+from .resource_cache import accepts_gzip
 
 class BaseAIView(View):
     """AI 서비스 기본 뷰 클래스"""
@@ -28,6 +40,20 @@ class BaseAIView(View):
     def dispatch(self, request, *args, **kwargs):
         return super().dispatch(request, *args, **kwargs)
 
+def _quota_exceeded_response(subject):
+    """일일 토큰 한도 초과 여부 확인 (초과 시 429 응답 반환)"""
+    allowed, used, limit = usage_ledger.check_quota(subject)
+    if allowed:
+        return None
+    return Response(
+        {
+            'error': '일일 AI 사용량 한도를 초과했습니다. 내일 다시 시도해주세요.',
+            'used_tokens': used,
+            'daily_limit': limit
+        },
+        status=status.HTTP_429_TOO_MANY_REQUESTS
+    )
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def ask_ai(request):
@@ -39,6 +65,11 @@ def ask_ai(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    subject = get_usage_subject(request)
+    quota_response = _quota_exceeded_response(subject)
+    if quota_response:
+        return quota_response
+    
     try:
         question = serializer.validated_data['question']
         session_id = serializer.validated_data.get('session_id', str(uuid.uuid4()))
@@ -48,7 +79,8 @@ def ask_ai(request):
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         try:
-            ai_answer = loop.run_until_complete(get_ai_response(question, context))
+            with usage_scope(subject, 'ask_ai'):
+                ai_answer = loop.run_until_complete(get_ai_response(question, context))
         finally:
             loop.close()
         
@@ -81,6 +113,11 @@ def plan_party(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    subject = get_usage_subject(request)
+    quota_response = _quota_exceeded_response(subject)
+    if quota_response:
+        return quota_response
+    
     try:
         # 파티 플래닝 에이전트 인스턴스 생성
         agent = PartyPlanningAgent()
@@ -89,7 +126,8 @@ def plan_party(request):
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         try:
-            plan_result = loop.run_until_complete(agent.create_party_plan(serializer.validated_data))
+            with usage_scope(subject, 'plan_party'):
+                plan_result = loop.run_until_complete(agent.create_party_plan(serializer.validated_data))
         finally:
             loop.close()
         
@@ -105,6 +143,202 @@ def plan_party(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+class BudgetScenarioThrottle(SimpleRateThrottle):
+    """예산 시나리오 API 요청 제한 (로그인 사용자는 사용자별, 비로그인은 IP별)"""
+    scope = 'budget_scenarios'
+    
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': get_usage_subject(request)}
+
+BUDGET_SCENARIO_MAX_PAGE_SIZE = 500
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@throttle_classes([BudgetScenarioThrottle])
+def budget_scenario_matrix(request):
+    """예산 시나리오 비교 (인원/파티 종류/비용 항목 격자의 모든 조합을 한 번에 계산)
+
+    기본 응답은 축 값과 총액 요약이며, 조합별 내역은 ?page=&page_size=로 나눠 받을 수 있습니다.
+    """
+    page = page_size = None
+    try:
+        if 'page' in request.query_params or 'page_size' in request.query_params:
+            page = int(request.query_params.get('page', 1))
+            page_size = int(request.query_params.get('page_size', 100))
+            if page < 1 or not 1 <= page_size <= BUDGET_SCENARIO_MAX_PAGE_SIZE:
+                raise ValueError
+    except ValueError:
+        return Response(
+            {'error': f'page는 1 이상, page_size는 1~{BUDGET_SCENARIO_MAX_PAGE_SIZE} 사이의 정수여야 합니다.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    serializer = BudgetScenarioSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(
+            {'error': 'Invalid request data', 'details': serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    data = serializer.validated_data
+    matrix = budget_scenarios(
+        data['guest_counts'],
+        data.get('party_types'),
+        data.get('venue_costs'),
+        data.get('catering_costs'),
+        data.get('decoration_costs'),
+    )
+    budget = data.get('budget')
+    budget = float(budget) if budget is not None else None
+    response_data = matrix.to_dict(budget=budget)
+    if page is not None:
+        response_data.update(matrix.page(page, page_size, budget=budget))
+    return Response(response_data, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def usage_summary(request):
+    """AI 토큰 사용량 요약 (관리자는 전체, 일반 사용자는 본인 사용량)"""
+    day = None
+    if request.query_params.get('date'):
+        try:
+            day = datetime.strptime(request.query_params['date'], '%Y-%m-%d').date()
+        except ValueError:
+            return Response(
+                {'error': 'date는 YYYY-MM-DD 형식이어야 합니다.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+    if request.user.is_staff:
+        subject = request.query_params.get('subject')
+    else:
+        subject = get_usage_subject(request)
+    
+    response_data = {
+        'date': (day or timezone.now().date()).isoformat(),
+        'usage': usage_ledger.summary(day=day, subject=subject)
+    }
+    if subject:
+        _, used, limit = usage_ledger.check_quota(subject)
+        response_data['quota'] = {'subject': subject, 'used_tokens': used, 'daily_limit': limit}
+    
+    return Response(response_data, status=status.HTTP_200_OK)
+
+def _knowledge_unavailable_response(e):
+    return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+@api_view(['POST', 'DELETE'])
+@permission_classes([IsAdminUser])
+def knowledge_documents(request, collection_type):
+    """지식 문서 추가/교체(POST) 및 ID/메타데이터 조건 삭제(DELETE)"""
+    serializer_class = KnowledgeUpsertSerializer if request.method == 'POST' else KnowledgeDeleteSerializer
+    serializer = serializer_class(data=request.data)
+    if not serializer.is_valid():
+        return Response(
+            {'error': 'Invalid request data', 'details': serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        if request.method == 'POST':
+            result = knowledge_service.upsert(collection_type, serializer.validated_data['documents'])
+            return Response(result, status=status.HTTP_200_OK)
+        
+        deleted = knowledge_service.delete(
+            collection_type,
+            ids=serializer.validated_data.get('ids'),
+            where=serializer.validated_data.get('where')
+        )
+        return Response({'deleted': deleted}, status=status.HTTP_200_OK)
+    
+    except KnowledgeServiceUnavailable as e:
+        return _knowledge_unavailable_response(e)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response(
+            {'error': f'지식 베이스 갱신 오류: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def knowledge_compact(request):
+    """지식 베이스 압축 (기본은 백그라운드 실행, ?wait=true이면 완료까지 대기)"""
+    wait = request.query_params.get('wait', '').lower() == 'true'
+    try:
+        if knowledge_service.is_compacting():
+            return Response({'status': 'running'}, status=status.HTTP_202_ACCEPTED)
+        if wait:
+            return Response(knowledge_service.compact(background=False), status=status.HTTP_200_OK)
+        knowledge_service.compact(background=True)
+        return Response({'status': 'started'}, status=status.HTTP_202_ACCEPTED)
+    except KnowledgeServiceUnavailable as e:
+        return _knowledge_unavailable_response(e)
+    except Exception as e:
+        return Response(
+            {'error': f'지식 베이스 압축 오류: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def knowledge_stats(request):
+    """지식 베이스 통계 (컬렉션별 문서 수, 삭제 표시 수, 디스크 사용량, 압축 상태)"""
+    try:
+        return Response(knowledge_service.stats(), status=status.HTTP_200_OK)
+    except KnowledgeServiceUnavailable as e:
+        return _knowledge_unavailable_response(e)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def mcp_cache_stats(request):
+    """MCP 도구 결과 캐시 통계 (도구별 적중/미스, 백그라운드 갱신 횟수)"""
+    return Response(mcp_client.cache_stats(), status=status.HTTP_200_OK)
+
+MCP_RESOURCE_MAX_PAGE_SIZE = 500
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def mcp_resource(request, resource_path):
+    """MCP 카탈로그 리소스 조회 (party://<resource_path>)
+
+    미리 직렬화된 바이트를 그대로 반환하며, ETag/If-None-Match(304)와 gzip을 지원합니다.
+    ?page=&page_size=로 나눠 받을 수 있습니다.
+    """
+    uri = f"party://{resource_path.strip('/')}"
+    page = page_size = None
+    try:
+        if 'page' in request.query_params or 'page_size' in request.query_params:
+            page = int(request.query_params.get('page', 1))
+            page_size = int(request.query_params.get('page_size', 100))
+            if page < 1 or not 1 <= page_size <= MCP_RESOURCE_MAX_PAGE_SIZE:
+                raise ValueError
+    except ValueError:
+        return Response(
+            {'error': f'page는 1 이상, page_size는 1~{MCP_RESOURCE_MAX_PAGE_SIZE} 사이의 정수여야 합니다.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    snapshot = mcp_client.resource_snapshot('party_planning', uri, page=page, page_size=page_size)
+    if snapshot is None:
+        return Response({'error': f'리소스를 찾을 수 없습니다: {uri}'}, status=status.HTTP_404_NOT_FOUND)
+    
+    use_gzip = accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if snapshot.matches(parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))):
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = HttpResponse(
+            snapshot.gzip_body if use_gzip else snapshot.body,
+            content_type=f'{snapshot.mime_type}; charset=utf-8'
+        )
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+    response['ETag'] = snapshot.gzip_etag if use_gzip else snapshot.etag
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = 'no-cache'
+    return response
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def health_check(request):
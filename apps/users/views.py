@@ -19,6 +19,7 @@ import uuid
 
 # 3단계에서 만든 Supabase 클라이언트 인스턴스를 가져옵니다.
 from backend.supabase_client import get_supabase_client
+from ai_service.tracing import tracer
 
 
 class UserRegistrationView(generics.CreateAPIView):
@@ -62,10 +63,11 @@ class UserRegistrationView(generics.CreateAPIView):
         
         try:
             # 1. Supabase 클라이언트를 사용하여 Supabase Auth에 사용자 생성
-            auth_response = get_supabase_client().auth.sign_up({
-                "email": email,
-                "password": password,
-            })
+            with tracer.span("supabase.auth.sign_up", kind='CLIENT'):
+                auth_response = get_supabase_client().auth.sign_up({
+                    "email": email,
+                    "password": password,
+                })
             
             # Supabase Auth에서 반환된 user 객체
             supabase_user = auth_response.user
@@ -85,7 +87,8 @@ class UserRegistrationView(generics.CreateAPIView):
                 except Exception as django_error:
                     # Django 사용자 생성 실패 시 Supabase 사용자 삭제 시도
                     try:
-                        get_supabase_client().auth.admin.delete_user(str(supabase_user.id))
+                        with tracer.span("supabase.auth.admin.delete_user", kind='CLIENT'):
+                            get_supabase_client().auth.admin.delete_user(str(supabase_user.id))
                     except:
                         pass  # Supabase 삭제 실패는 무시 (수동으로 정리 필요)
                     
@@ -166,13 +169,16 @@ class UserLoginView(APIView):
             
             # 타임아웃 20초 설정
             logger.debug("Creating ThreadPoolExecutor for Supabase call")
-            with ThreadPoolExecutor(max_workers=1) as executor:
+            with tracer.span("supabase.auth.sign_in_with_password", kind='CLIENT') as span, \
+                    ThreadPoolExecutor(max_workers=1) as executor:
                 future = executor.submit(supabase_login)
                 try:
                     auth_response = future.result(timeout=20)
                     logger.info(f"Supabase auth completed for {email}")
                 except FuturesTimeoutError:
                     logger.error(f"Supabase auth timeout for {email}")
+                    if span is not None:
+                        span.error = "timeout"
                     return Response(
                         {"error": "로그인 요청 시간이 초과되었습니다. 다시 시도해주세요."}, 
                         status=status.HTTP_408_REQUEST_TIMEOUT
@@ -262,7 +268,8 @@ class UserLogoutView(APIView):
     def post(self, request):
         try:
             # Supabase 로그아웃
-            get_supabase_client().auth.sign_out()
+            with tracer.span("supabase.auth.sign_out", kind='CLIENT'):
+                get_supabase_client().auth.sign_out()
             
             # JWT 토큰 무효화 (refresh token이 있는 경우)
             refresh_token = request.data.get('refresh')
@@ -298,9 +305,10 @@ class PasswordChangeView(APIView):
         if serializer.is_valid():
             try:
                 # Supabase에서 비밀번호 변경
-                get_supabase_client().auth.update_user({
-                    "password": serializer.validated_data['new_password']
-                })
+                with tracer.span("supabase.auth.update_user", kind='CLIENT'):
+                    get_supabase_client().auth.update_user({
+                        "password": serializer.validated_data['new_password']
+                    })
                 
                 # Django에서도 업데이트 (동기화)
                 serializer.save()
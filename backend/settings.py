@@ -1,5 +1,6 @@
 import os
 import sys  # sys 모듈 임포트
+import json
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -61,6 +62,7 @@ AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'ai_service.tracing.TracingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -115,6 +117,109 @@ DATABASES = {
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 
+# AI 사용량 쿼터 설정 (일일 토큰 한도, 0이면 무제한)
+# 한도는 DB에 기록된 사용량으로 검사하므로 워커 수와 관계없이 적용되며, DB 합계는
+# subject별로 AI_USAGE_CACHE_TTL초 동안 메모리에 둡니다. 다른 워커의 사용량은 최대
+# AI_USAGE_FLUSH_INTERVAL + AI_USAGE_CACHE_TTL초 늦게 반영됩니다.
+AI_DAILY_TOKEN_QUOTA = int(os.getenv('AI_DAILY_TOKEN_QUOTA', '200000'))
+AI_ANON_DAILY_TOKEN_QUOTA = int(os.getenv('AI_ANON_DAILY_TOKEN_QUOTA', '50000'))
+AI_USAGE_FLUSH_SIZE = int(os.getenv('AI_USAGE_FLUSH_SIZE', '50'))
+AI_USAGE_FLUSH_INTERVAL = float(os.getenv('AI_USAGE_FLUSH_INTERVAL', '5'))
+AI_USAGE_CACHE_TTL = float(os.getenv('AI_USAGE_CACHE_TTL', '10'))
+# DB 저장이 계속 실패할 때 메모리에 쌓아 둘 최대 기록 수 (넘으면 오래된 기록부터 버림)
+AI_USAGE_MAX_PENDING = int(os.getenv('AI_USAGE_MAX_PENDING', '10000'))
+# 비로그인 사용자 IP를 정할 때 신뢰할 앞단 프록시 수 (0이면 X-Forwarded-For 무시, Render는 1)
+AI_TRUSTED_PROXY_COUNT = int(os.getenv('AI_TRUSTED_PROXY_COUNT', '0'))
+
+# RAG 지식 검색 사용 여부 / 워커 시작 시 백그라운드에서 미리 초기화할지
+RAG_ENABLED = os.getenv('RAG_ENABLED', 'True').lower() == 'true'
+RAG_WARM_ON_START = os.getenv('RAG_WARM_ON_START', 'True').lower() == 'true'
+# RAG 임베딩 모델 ('openai' 또는 'local' - sentence-transformers, 오프라인 동작)
+# 모델을 바꾸면 모델별로 분리된 인덱스에 자동으로 다시 적재됩니다.
+RAG_EMBEDDING_BACKEND = os.getenv('RAG_EMBEDDING_BACKEND', 'openai')
+RAG_EMBEDDING_MODEL = os.getenv('RAG_EMBEDDING_MODEL', '')
+# OpenAI 임베딩 차원 축소 (0이면 모델 기본 차원, 예: 512)
+RAG_EMBEDDING_DIMENSIONS = int(os.getenv('RAG_EMBEDDING_DIMENSIONS', '0'))
+RAG_LOCAL_EMBEDDING_THREADS = int(os.getenv('RAG_LOCAL_EMBEDDING_THREADS', '2'))
+RAG_LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv('RAG_LOCAL_EMBEDDING_BATCH_SIZE', '32'))
+
+# RAG 벡터 인덱스 ('chroma' 또는 'numpy' - 워커 간 공유되는 메모리 맵 파일 기반)
+RAG_VECTOR_BACKEND = os.getenv('RAG_VECTOR_BACKEND', 'chroma')
+# numpy 인덱스 벡터 양자화 ('none' 또는 'int8') 및 float32 재채점 후보 배수
+RAG_VECTOR_QUANTIZATION = os.getenv('RAG_VECTOR_QUANTIZATION', 'none')
+RAG_VECTOR_RESCORE_FACTOR = int(os.getenv('RAG_VECTOR_RESCORE_FACTOR', '4'))
+# 삭제 표시가 이 비율/개수를 넘으면 백그라운드에서 인덱스 압축 (numpy 백엔드 전용, chroma는 압축 API로 직접 실행)
+RAG_COMPACT_DELETED_RATIO = float(os.getenv('RAG_COMPACT_DELETED_RATIO', '0.2'))
+RAG_COMPACT_MIN_DELETED = int(os.getenv('RAG_COMPACT_MIN_DELETED', '1000'))
+# RAG 청크 크기 (토큰 단위)
+RAG_CHUNK_TOKENS = int(os.getenv('RAG_CHUNK_TOKENS', '500'))
+RAG_CHUNK_OVERLAP_TOKENS = int(os.getenv('RAG_CHUNK_OVERLAP_TOKENS', '50'))
+# RAG 검색 방식 ('hybrid': BM25 + 벡터 RRF 결합, 'vector', 'lexical': 임베딩 호출 없음)
+RAG_SEARCH_MODE = os.getenv('RAG_SEARCH_MODE', 'hybrid')
+RAG_RRF_K = int(os.getenv('RAG_RRF_K', '60'))
+# 검색 결과 다양화 (MMR 관련도 가중치, 중복으로 합칠 코사인 유사도 기준)
+RAG_MMR_LAMBDA = float(os.getenv('RAG_MMR_LAMBDA', '0.5'))
+RAG_DEDUPE_THRESHOLD = float(os.getenv('RAG_DEDUPE_THRESHOLD', '0.95'))
+# 파티 요청별 문맥 검색 결과 캐시 (항목 수, 유지 시간 초)
+RAG_CONTEXT_CACHE_SIZE = int(os.getenv('RAG_CONTEXT_CACHE_SIZE', '256'))
+RAG_CONTEXT_CACHE_TTL = int(os.getenv('RAG_CONTEXT_CACHE_TTL', '600'))
+# chroma 인덱스 구성 ('unified': 단일 컬렉션 + collection_type 필터, 'per_collection': 종류별 컬렉션)
+RAG_INDEX_MODE = os.getenv('RAG_INDEX_MODE', 'unified')
+# per_collection 모드에서 없는 컬렉션을 다시 확인하기 전까지 건너뛰는 시간(초, 다른 프로세스의 적재 반영)
+RAG_ABSENT_COLLECTION_TTL = float(os.getenv('RAG_ABSENT_COLLECTION_TTL', '30'))
+
+# RAG 임베딩 배치 설정
+RAG_EMBED_BATCH_SIZE = int(os.getenv('RAG_EMBED_BATCH_SIZE', '64'))
+RAG_EMBED_CONCURRENCY = int(os.getenv('RAG_EMBED_CONCURRENCY', '4'))
+RAG_EMBED_MAX_RETRIES = int(os.getenv('RAG_EMBED_MAX_RETRIES', '3'))
+
+# 임베딩 디스크 캐시 (SQLite, 워커 간 공유)
+RAG_EMBEDDING_CACHE_ENABLED = os.getenv('RAG_EMBEDDING_CACHE_ENABLED', 'True').lower() == 'true'
+RAG_EMBEDDING_CACHE_PATH = os.getenv('RAG_EMBEDDING_CACHE_PATH', os.path.join(BASE_DIR, 'vector_db', 'embedding_cache.sqlite3'))
+RAG_EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv('RAG_EMBEDDING_CACHE_MAX_ENTRIES', '100000'))
+
+# MCP 도구 결과 캐시 (MCP_CACHE_TTLS 예: "check_weather=1800,search_venues=86400", 0이면 캐시 안 함)
+MCP_CACHE_ENABLED = os.getenv('MCP_CACHE_ENABLED', 'True').lower() == 'true'
+MCP_CACHE_MAX_ENTRIES = int(os.getenv('MCP_CACHE_MAX_ENTRIES', '1024'))
+MCP_CACHE_STALE_RATIO = float(os.getenv('MCP_CACHE_STALE_RATIO', '0.5'))
+MCP_CACHE_TTLS = {
+    name.strip(): int(ttl)
+    for name, ttl in (item.split('=', 1) for item in os.getenv('MCP_CACHE_TTLS', '').split(',') if '=' in item)
+}
+
+# MCP 카탈로그 데이터 (기본: ai_service/data/)
+MCP_VENUE_CATALOG_PATH = os.getenv('MCP_VENUE_CATALOG_PATH', os.path.join(BASE_DIR, 'ai_service', 'data', 'venues.json'))
+MCP_CATERING_CATALOG_PATH = os.getenv('MCP_CATERING_CATALOG_PATH', os.path.join(BASE_DIR, 'ai_service', 'data', 'catering.json'))
+MCP_GAZETTEER_PATH = os.getenv('MCP_GAZETTEER_PATH', os.path.join(BASE_DIR, 'ai_service', 'data', 'gazetteer.json'))
+
+# 외부 MCP 서버 (JSON 배열, 예: [{"name": "vendor", "command": "python", "args": ["-m", "vendor_mcp"]}]
+# 또는 {"name": "...", "transport": "streamable_http", "url": "http://localhost:9000/mcp"})
+MCP_EXTERNAL_SERVERS = json.loads(os.getenv('MCP_EXTERNAL_SERVERS', '[]'))
+MCP_REMOTE_POOL_SIZE = int(os.getenv('MCP_REMOTE_POOL_SIZE', '2'))
+MCP_REMOTE_TIMEOUT = float(os.getenv('MCP_REMOTE_TIMEOUT', '30'))
+
+# 에이전트 도구 호출 방식 ('fixed': 장소/케이터링/예산 고정 호출, 'agentic': LLM이 도구를 골라 병렬 호출)
+AGENT_TOOL_MODE = os.getenv('AGENT_TOOL_MODE', 'fixed')
+# agentic 루프 최대 반복 횟수 (0 이하이면 고정 호출로 대체)
+AGENT_TOOL_MAX_ITERATIONS = int(os.getenv('AGENT_TOOL_MAX_ITERATIONS', '4'))
+AGENT_TOOL_TOKEN_BUDGET = int(os.getenv('AGENT_TOOL_TOKEN_BUDGET', '6000'))
+AGENT_TOOL_MAX_CALLS_PER_TURN = int(os.getenv('AGENT_TOOL_MAX_CALLS_PER_TURN', '6'))
+AGENT_TOOL_RESULT_MAX_CHARS = int(os.getenv('AGENT_TOOL_RESULT_MAX_CHARS', '4000'))
+
+# 예산 시나리오 비교 API 한 번에 계산할 수 있는 최대 조합 수 / 요청 제한 (비로그인 API이므로 작게 유지)
+BUDGET_SCENARIO_MAX = int(os.getenv('BUDGET_SCENARIO_MAX', '2000'))
+BUDGET_SCENARIO_THROTTLE_RATE = os.getenv('BUDGET_SCENARIO_THROTTLE_RATE', '30/min')
+
+# 분산 추적 설정 (OTLP/JSON 파일로 내보내기, 느린 요청은 더 높은 비율로 샘플링)
+TRACE_ENABLED = os.getenv('TRACE_ENABLED', 'True').lower() == 'true'
+# 실제 파일은 워커별로 PID를 붙인 이름(spans.<pid>.jsonl)
+TRACE_EXPORT_PATH = os.getenv('TRACE_EXPORT_PATH', os.path.join(BASE_DIR, 'traces', 'spans.jsonl'))
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0.1'))
+TRACE_SLOW_THRESHOLD_MS = float(os.getenv('TRACE_SLOW_THRESHOLD_MS', '5000'))
+TRACE_SLOW_SAMPLE_RATE = float(os.getenv('TRACE_SLOW_SAMPLE_RATE', '1.0'))
+# 요청 traceparent의 sampled 플래그를 따를지 (신뢰하는 게이트웨이만 요청을 보내는 환경에서만 True)
+TRACE_TRUST_REMOTE_SAMPLED = os.getenv('TRACE_TRUST_REMOTE_SAMPLED', 'False').lower() == 'true'
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -206,6 +311,10 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
+    # 요청 제한 카운터는 Django 기본 캐시(워커별 메모리)에 저장됩니다
+    'DEFAULT_THROTTLE_RATES': {
+        'budget_scenarios': BUDGET_SCENARIO_THROTTLE_RATE,
+    },
 }
 
 # JWT 설정
@@ -51,6 +51,15 @@ def worker_int(worker):
 
 def post_worker_init(worker):
     print(f"Worker {worker.pid} initialized")
+    # RAG 시스템은 요청을 막지 않도록 백그라운드에서 미리 초기화
+    from django.conf import settings
+    if getattr(settings, 'RAG_WARM_ON_START', False):
+        from ai_service.rag_system import warm_rag_in_background
+        warm_rag_in_background()
+    # 외부 MCP 서버 프로세스도 첫 요청 전에 띄워 둠
+    if getattr(settings, 'MCP_EXTERNAL_SERVERS', None):
+        from ai_service.mcp_integration import mcp_client
+        mcp_client.start_providers()
 
 # SSL (if needed)
 # keyfile = None